@@ -46,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -79,13 +80,66 @@ WSGI_APPLICATION = 'app.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
 
+# connections come from a per process pool, see core.db; CONN_MAX_AGE
+# stays 0 so every request hands its connection back to the pool
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db.backends.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
-        'PASSWORD': os.environ.get('DB_PASS')
+        'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'MIN_SIZE': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'MAX_SIZE': int(os.environ.get('DB_POOL_MAX_SIZE', 20)),
+            'TIMEOUT': 10,
+            'CHECK_AFTER': 0,
+            'MAX_IDLE': 300,
+        },
+    }
+}
+
+
+# read replicas, one alias per host in DB_REPLICA_HOSTS; safe requests on
+# the recipe, tag and ingredient views read from DATABASE_REPLICAS, see
+# core.routers. replica_1 always exists so tests can mirror it onto the
+# test database, it is only read from once listed in DATABASE_REPLICAS
+
+DB_REPLICA_HOSTS = [host for host in os.environ.get(
+    'DB_REPLICA_HOSTS', ''
+).split(',') if host]
+
+for index, host in enumerate(DB_REPLICA_HOSTS or [DATABASES['default']['HOST']],
+                             start=1):
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [f'replica_{index}'
+                     for index in range(1, len(DB_REPLICA_HOSTS) + 1)]
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# seconds a user's reads stay on the primary after they wrote, covering
+# the replication lag
+REPLICA_STICKINESS = 5
+
+
+# Caches
+# https://docs.djangoproject.com/en/3.1/topics/cache/
+# local memory by default; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# backend such as memcached in production
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
     }
 }
 
@@ -109,6 +163,36 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing
+# https://docs.djangoproject.com/en/3.1/topics/auth/passwords/
+# hashes are computed on a process pool of WORKERS processes, see
+# core.hashers; Argon2 is preferred when argon2-cffi is installed and older
+# hashes are upgraded to the first hasher on login. Django verifies with the
+# last hasher of an algorithm, so the stock PBKDF2 and Argon2 hashers, whose
+# formats the pooled ones read, must not be listed
+
+PASSWORD_HASHING = {
+    'WORKERS': int(os.environ.get('PASSWORD_HASHING_WORKERS', 2)),
+    'ARGON2_TIME_COST': 2,
+    'ARGON2_MEMORY_COST': 19456,
+    'ARGON2_PARALLELISM': 1,
+}
+
+PASSWORD_HASHERS = [
+    'core.hashers.PooledPBKDF2PasswordHasher',
+    'core.hashers.PooledArgon2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
+try:
+    import argon2  # noqa: F401
+except ImportError:
+    pass
+else:
+    PASSWORD_HASHERS.insert(0, PASSWORD_HASHERS.pop(1))
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/3.0/topics/i18n/
 
@@ -128,4 +212,98 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+# uploaded recipe images, stored under content addressed names that can be
+# served with a far future Cache-Control, see core.images
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', '/vol/web/media')
+
+IMAGE_UPLOAD = {
+    'MAX_SIZE': 10 * 1024 * 1024,
+    'THUMBNAIL_SIZE': (300, 300),
+}
+
 AUTH_USER_MODEL = 'core.User'
+
+REST_FRAMEWORK = {
+    'PAGE_SIZE': 50,
+}
+
+# text search configuration used for Recipe.search_vector, see core.search
+SEARCH_CONFIG = 'english'
+
+# threads running database work for the async read views, which also caps
+# the database connections held by one ASGI worker
+ASYNC_DB_THREADS = int(os.environ.get('ASYNC_DB_THREADS', 16))
+
+# per user cache of list responses, see core.response_cache; ETags are only
+# sent when ALIAS is shared between processes, not local memory, see
+# core.etags
+RESPONSE_CACHE = {
+    'ALIAS': 'default',
+    'TIMEOUT': 300,
+}
+
+# largest JSON array accepted by the bulk endpoints in recipe.views
+BULK_MAX_ITEMS = 10000
+
+# recipes read per server side cursor fetch by the streaming export
+EXPORT_CHUNK_SIZE = 500
+
+# token -> user lookups cached by core.authentication.CachedTokenAuthentication,
+# SHARED_CACHE names an alias in CACHES to share entries between processes
+AUTH_TOKEN_CACHE = {
+    'MAX_SIZE': 10000,
+    'TTL': 60,
+    'SHARED_CACHE': None,
+}
+
+# per route request metrics, see core.middleware; SERVER_TIMING adds a
+# Server-Timing header with database and serializer time to every response.
+# /metrics/ is served to staff users and to scrapers sending TOKEN as a
+# bearer token, an empty TOKEN leaves it to staff only
+METRICS = {
+    'ENABLED': os.environ.get('METRICS_ENABLED', '1') == '1',
+    'SERVER_TIMING': os.environ.get('METRICS_SERVER_TIMING', '0') == '1',
+    'TOKEN': os.environ.get('METRICS_TOKEN', ''),
+}
+
+# sliding window rate limits per scope, see core.throttling; rates are
+# 'requests/period' per client IP and per user, SHARED_CACHE names an alias
+# in CACHES to enforce them across processes instead of per process
+THROTTLE = {
+    'RATES': {
+        'token': {'ip': '60/min', 'user': '10/min'},
+        'signup': {'ip': '30/hour'},
+        'recipe_write': {'user': '600/min'},
+    },
+    'MAX_KEYS': 100000,
+    'SHARED_CACHE': None,
+}
+
+# runs the tests with empty THROTTLE['RATES']
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
+# background tasks queued in the database, see core.tasks: failed tasks
+# are retried after RETRY_BACKOFF seconds, doubled per attempt up to
+# MAX_BACKOFF, a worker holds a task for LEASE seconds before another may
+# take it over, and EAGER runs tasks inline when queued instead of through
+# manage.py run_tasks
+TASKS = {
+    'EAGER': os.environ.get('TASKS_EAGER', '0') == '1',
+    'MAX_ATTEMPTS': 5,
+    'RETRY_BACKOFF': 2,
+    'MAX_BACKOFF': 600,
+    'LEASE': 300,
+    'POLL_INTERVAL': 1,
+    'WORKER_THREADS': 4,
+}
+
+# outgoing mail, printed to the console unless a backend is configured
+EMAIL_BACKEND = os.environ.get(
+    'EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend'
+)
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL',
+                                    'recipes@localhost')
+
+# pagination classes are set per viewset, see recipe.pagination
+SILENCED_SYSTEM_CHECKS = ['rest_framework.W001']
@@ -13,11 +13,17 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 
+from core.views import metrics_view, serve_immutable
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/user/', include('user.urls')),
-    path('api/recipe/', include('recipe.urls'))
-]
+    path('api/recipe/', include('recipe.urls')),
+    path('metrics/', metrics_view, name='metrics'),
+] + static(settings.MEDIA_URL, view=serve_immutable,
+           document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,11 @@
+"""
+Benchmarks for the recipe API
+
+Each module is runnable from the app directory, for example:
+
+    python -m benchmarks.bench_recipe_filters --recipes 100000
+
+They build their fixtures in a throwaway test database created from the
+configured settings, so DJANGO_SETTINGS_MODULE may point at a local
+PostgreSQL or SQLite configuration.
+"""
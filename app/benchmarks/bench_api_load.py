@@ -0,0 +1,295 @@
+"""
+Load test of the whole API: logins, recipe lists, details, creates and
+filtered lists made by many users at once
+
+    python -m benchmarks.bench_api_load --users 50 --recipes 200 \
+        --concurrency 16 --requests 50
+
+A seeded generator gives each of --users users --recipes recipes over
+--tags tags and --ingredients ingredients. Every scenario then runs
+--concurrency client threads through the in-process WSGI application,
+each making --requests requests as the users in turn, and reports the
+throughput, latency percentiles and database queries per request, read
+back from the Server-Timing header. The same --seed gives the same data
+and the same requests.
+
+Throttling is switched off so every request is handled, and
+--no-response-cache measures the views rather than the response cache.
+SQLite takes one writer at a time, so the create scenario is best run
+against a local PostgreSQL or with --concurrency 1.
+"""
+import io
+import json
+import random
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fixtures import ADJECTIVES, DISHES
+from benchmarks.utils import (base_parser, report, setup_django, summarize,
+                              test_database)
+
+PASSWORD = 'bench-password1'
+SERVER_TIMING_QUERIES = re.compile(r'db;desc="(\d+) queries"')
+# share of each scenario in the mixed run
+MIXED_WEIGHTS = {'login': 2, 'list': 45, 'detail': 25, 'create': 8,
+                 'filter': 20}
+
+
+def wsgi_request(app, method, path, token=None, query='', body=None):
+    """
+    Make one request through the WSGI application, return its status and
+    the number of queries it ran
+    """
+    payload = json.dumps(body).encode() if body is not None else b''
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(payload)),
+        'REMOTE_ADDR': '127.0.0.1',
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'testserver',
+        'wsgi.input': io.BytesIO(payload),
+        'wsgi.errors': sys.stderr,
+        'wsgi.url_scheme': 'http',
+    }
+    if token:
+        environ['HTTP_AUTHORIZATION'] = f'Token {token}'
+    started = []
+    result = app(environ,
+                 lambda code, headers: started.append((code, headers)))
+    try:
+        b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    code, headers = started[0]
+    timing = dict(headers).get('Server-Timing', '')
+    match = SERVER_TIMING_QUERIES.search(timing)
+    return int(code.split()[0]), int(match.group(1)) if match else None
+
+
+def login(user, rng, urls):
+    """
+    Exchange the user's credentials for a token
+    """
+    return ('POST', urls['token'], None, '',
+            {'email': user['email'], 'password': PASSWORD}, 200)
+
+
+def list_recipes(user, rng, urls):
+    """
+    Read the first page of the user's recipes
+    """
+    return 'GET', urls['recipes'], user['token'], '', None, 200
+
+
+def recipe_detail(user, rng, urls):
+    """
+    Read one of the user's recipes
+    """
+    path = urls['detail'].format(rng.choice(user['recipes']))
+    return 'GET', path, user['token'], '', None, 200
+
+
+def create_recipe(user, rng, urls):
+    """
+    Create a recipe with two of the user's tags and ingredients
+    """
+    body = {
+        'title': f'{rng.choice(ADJECTIVES)} {rng.choice(DISHES)}',
+        'time_minutes': rng.randint(5, 180),
+        'price': f'{rng.randint(100, 99999) / 100:.2f}',
+        'currency': rng.choice(('USD', 'NGN', 'GBP')),
+        'tags': rng.sample(user['tags'], min(2, len(user['tags']))),
+        'ingredients': rng.sample(user['ingredients'],
+                                  min(2, len(user['ingredients']))),
+    }
+    return 'POST', urls['recipes'], user['token'], '', body, 201
+
+
+def filter_recipes(user, rng, urls):
+    """
+    List the user's recipes having any of two tags under a price
+    """
+    tags = rng.sample(user['tags'], min(2, len(user['tags'])))
+    query = (f'tags={",".join(str(pk) for pk in tags)}'
+             f'&max_price={rng.randint(10, 1000)}')
+    return 'GET', urls['recipes'], user['token'], query, None, 200
+
+
+SCENARIOS = {
+    'login': login,
+    'list': list_recipes,
+    'detail': recipe_detail,
+    'create': create_recipe,
+    'filter': filter_recipes,
+}
+
+
+def mixed(user, rng, urls):
+    """
+    Pick a scenario by MIXED_WEIGHTS
+    """
+    name = rng.choices(list(MIXED_WEIGHTS), list(MIXED_WEIGHTS.values()))[0]
+    return SCENARIOS[name](user, rng, urls)
+
+
+def run_scenario(app, name, users, urls, args):
+    """
+    Run --concurrency clients, each making --requests requests of the
+    scenario as the users in turn
+    """
+    from django.db import connections
+
+    scenario = mixed if name == 'mixed' else SCENARIOS[name]
+
+    def client(index):
+        rng = random.Random(f'{args.seed}:{name}:{index}')
+        results = []
+        try:
+            for count in range(args.requests):
+                user = users[(index * args.requests + count) % len(users)]
+                method, path, token, query, body, expected = scenario(
+                    user, rng, urls
+                )
+                start = time.perf_counter()
+                code, queries = wsgi_request(app, method, path, token,
+                                             query, body)
+                results.append((time.perf_counter() - start,
+                                code == expected, queries))
+        finally:
+            connections.close_all()
+        return results
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = [pool.submit(client, index)
+                   for index in range(args.concurrency)]
+        results = [r for future in futures for r in future.result()]
+    elapsed = time.perf_counter() - start
+
+    queries = [q for _latency, _ok, q in results if q is not None]
+    return dict(
+        summarize([latency for latency, _ok, _queries in results]),
+        requests_per_second=round(len(results) / elapsed, 1),
+        errors=sum(1 for _latency, ok, _queries in results if not ok),
+        queries_per_request={
+            'mean': round(sum(queries) / len(queries), 2) if queries else None,
+            'max': max(queries, default=None),
+        },
+    )
+
+
+def seed_users(args):
+    """
+    Create the users and their recipe books, return what the scenarios
+    need to know about each user
+    """
+    from benchmarks.fixtures import create_recipe_book, create_users
+    from core.counters import counted_models, rebuild_counts
+    from core.models import Recipe
+
+    users = create_users(args.users, PASSWORD)
+    books = {}
+    for offset, user in enumerate(users):
+        books[user.pk] = create_recipe_book(
+            user, args.recipes, tags=args.tags,
+            ingredients=args.ingredients, seed=args.seed + offset
+        )
+    # bulk inserts send no signals
+    for model in counted_models():
+        rebuild_counts(model)
+
+    recipes = {}
+    for pk, user_id in Recipe.objects.order_by('id').values_list(
+            'id', 'user_id').iterator():
+        recipes.setdefault(user_id, []).append(pk)
+    return [{
+        'email': user.email,
+        'token': user.auth_token.key,
+        'recipes': recipes.get(user.pk, []),
+        'tags': books[user.pk][0],
+        'ingredients': books[user.pk][1],
+    } for user in users]
+
+
+def main():
+    """
+    Seed the users and run every scenario against the WSGI application
+    """
+    parser = base_parser(__doc__)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--recipes', type=int, default=100,
+                        help='recipes per user')
+    parser.add_argument('--tags', type=int, default=20,
+                        help='tags per user')
+    parser.add_argument('--ingredients', type=int, default=50,
+                        help='ingredients per user')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=25,
+                        help='requests per client and scenario')
+    parser.add_argument('--scenarios', default=','.join(
+        list(SCENARIOS) + ['mixed']
+    ), help='comma separated scenarios to run, in order')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-response-cache', action='store_true')
+    args = parser.parse_args()
+
+    names = args.scenarios.split(',')
+    unknown = set(names) - set(SCENARIOS) - {'mixed'}
+    if unknown:
+        parser.error(f'unknown scenarios: {", ".join(sorted(unknown))}')
+
+    setup_django()
+    from django.conf import settings
+    from django.core.wsgi import get_wsgi_application
+    from django.db import connection
+    from django.test.utils import override_settings
+    from django.urls import reverse
+
+    overrides = {
+        'THROTTLE': dict(settings.THROTTLE, RATES={}),
+        'METRICS': dict(settings.METRICS, ENABLED=True, SERVER_TIMING=True),
+    }
+    if args.no_response_cache:
+        overrides['CACHES'] = dict(settings.CACHES, bench_dummy={
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache'
+        })
+        overrides['RESPONSE_CACHE'] = {'ALIAS': 'bench_dummy', 'TIMEOUT': 0}
+
+    with test_database(), override_settings(**overrides):
+        users = seed_users(args)
+        urls = {
+            'token': reverse('user:token'),
+            'recipes': reverse('recipe:recipe-list'),
+            'detail': reverse('recipe:recipe-detail', args=[0]).replace(
+                '/0/', '/{}/'
+            ),
+        }
+        # the middleware reads METRICS when the application is built
+        app = get_wsgi_application()
+        wsgi_request(app, *list_recipes(users[0], None, urls)[:3])
+
+        results = {
+            'vendor': connection.vendor,
+            'users': args.users,
+            'recipes_per_user': args.recipes,
+            'concurrency': args.concurrency,
+            'requests_per_client': args.requests,
+            'seed': args.seed,
+            'response_cache': not args.no_response_cache,
+        }
+        for name in names:
+            results[name] = run_scenario(app, name, users, urls, args)
+
+    report('api_load', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
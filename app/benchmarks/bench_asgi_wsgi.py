@@ -0,0 +1,201 @@
+"""
+Throughput and latency of the WSGI endpoints against the async read path
+served by the ASGI application, with many concurrent slow clients
+
+    python -m benchmarks.bench_asgi_wsgi --clients 500 --client-delay-ms 50
+
+Both applications are driven in process, so the numbers compare request
+handling only. WSGI gets --wsgi-threads workers, like a threaded server,
+and each worker is held for --client-delay-ms while it reads the slow
+client's request. Under ASGI that delay is spent in the event loop and
+only the database work takes a pool thread.
+"""
+import asyncio
+import io
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.utils import (base_parser, report, setup_django, summarize,
+                              test_database)
+
+
+def wsgi_get(app, path, token, client_delay):
+    """
+    Make one GET through the WSGI application, return its status
+    """
+    time.sleep(client_delay)
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'testserver',
+        'HTTP_AUTHORIZATION': f'Token {token}',
+        'wsgi.input': io.BytesIO(b''),
+        'wsgi.errors': sys.stderr,
+        'wsgi.url_scheme': 'http',
+    }
+    status = []
+    result = app(environ, lambda code, headers: status.append(code))
+    try:
+        b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return int(status[0].split()[0])
+
+
+async def asgi_get(app, path, token, client_delay):
+    """
+    Make one GET through the ASGI application, return its status
+    """
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', b'testserver'),
+                    (b'authorization', f'Token {token}'.encode())],
+        'client': ('127.0.0.1', 50000),
+        'server': ('testserver', 80),
+    }
+    status = []
+
+    async def receive():
+        await asyncio.sleep(client_delay)
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+def run_wsgi(app, path, token, args):
+    """
+    Run every client as a thread, each request waiting for one of the
+    --wsgi-threads server workers before it is handled
+    """
+    workers = threading.BoundedSemaphore(args.wsgi_threads)
+
+    def client():
+        results = []
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            with workers:
+                code = wsgi_get(app, path, token,
+                                args.client_delay_ms / 1000)
+            results.append((time.perf_counter() - start, code))
+        return results
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        futures = [pool.submit(client) for _ in range(args.clients)]
+        results = [r for future in futures for r in future.result()]
+    return time.perf_counter() - start, results
+
+
+def run_asgi(app, path, token, args):
+    """
+    Run every client as a coroutine against the ASGI application
+    """
+    async def client():
+        results = []
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            code = await asgi_get(app, path, token,
+                                  args.client_delay_ms / 1000)
+            results.append((time.perf_counter() - start, code))
+        return results
+
+    async def main():
+        return await asyncio.gather(*(client() for _ in range(args.clients)))
+
+    start = time.perf_counter()
+    results = [r for client_results in asyncio.run(main())
+               for r in client_results]
+    return time.perf_counter() - start, results
+
+
+def summarize_run(elapsed, results):
+    """
+    Summarize one run's latencies, throughput and failures
+    """
+    return dict(
+        summarize([latency for latency, _code in results]),
+        requests_per_second=round(len(results) / elapsed, 1),
+        errors=sum(1 for _latency, code in results if code != 200),
+    )
+
+
+def main():
+    """
+    Seed a user and time both applications on the same endpoints
+    """
+    parser = base_parser(__doc__)
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=5,
+                        help='requests per client')
+    parser.add_argument('--client-delay-ms', type=float, default=20)
+    parser.add_argument('--wsgi-threads', type=int, default=16)
+    parser.add_argument('--recipes', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.asgi import get_asgi_application
+    from django.core.wsgi import get_wsgi_application
+    from django.contrib.auth import get_user_model
+    from django.test.utils import override_settings
+    from django.urls import reverse
+    from rest_framework.authtoken.models import Token
+
+    from benchmarks.fixtures import create_recipe_book
+
+    # measure the views rather than the response cache
+    bench_caches = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'
+        },
+        'bench_dummy': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache'
+        },
+    }
+    with test_database(), override_settings(
+            CACHES=bench_caches,
+            RESPONSE_CACHE={'ALIAS': 'bench_dummy', 'TIMEOUT': 0}):
+        user = get_user_model().objects.create_user('bench@example.com',
+                                                    'password1')
+        token = Token.objects.create(user=user).key
+        create_recipe_book(user, args.recipes)
+
+        wsgi_app = get_wsgi_application()
+        asgi_app = get_asgi_application()
+        results = {'clients': args.clients, 'requests': args.requests,
+                   'client_delay_ms': args.client_delay_ms,
+                   'wsgi_threads': args.wsgi_threads}
+        for name in ('recipe-list', 'tag-list', 'ingredient-list'):
+            results[name] = {
+                'wsgi': summarize_run(*run_wsgi(
+                    wsgi_app, reverse(f'recipe:{name}'), token, args
+                )),
+                'asgi': summarize_run(*run_asgi(
+                    asgi_app, reverse(f'recipe:async-{name}'), token, args
+                )),
+            }
+
+    report('asgi_wsgi', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Password checks per second, inline and on the hashing pool
+
+    python -m benchmarks.bench_password_hashing --workers 1 2 4
+
+Every case verifies --repeat passwords from --threads concurrent request
+threads. Inline, hashing takes as many cores as there are threads; pooled,
+it takes at most the pool's workers, and logins/sec/core is the figure to
+compare between hashers.
+"""
+import os
+import threading
+import time
+
+from benchmarks.utils import base_parser, report, setup_django
+
+HASHERS = ('core.hashers.PooledPBKDF2PasswordHasher',
+           'core.hashers.PooledArgon2PasswordHasher')
+
+
+def check_many(encoded: str, checks: int, threads: int) -> float:
+    """
+    Verify a password checks times from threads threads, return seconds
+    """
+    from django.contrib.auth.hashers import check_password
+
+    remaining = iter(range(checks))
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            assert check_password('password1', encoded)
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return time.perf_counter() - start
+
+
+def main():
+    """
+    Time password checks for every available hasher and pool size
+    """
+    parser = base_parser(__doc__)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 1, 2],
+                        help='pool sizes to try, 0 hashes inline')
+    parser.add_argument('--threads', type=int, default=8,
+                        help='concurrent request threads')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.test import override_settings
+    from django.utils.module_loading import import_string
+
+    from core import hashers
+
+    results = {'threads': args.threads, 'cpus': os.cpu_count()}
+    for path in HASHERS:
+        hasher = import_string(path)()
+        if hasher.library:
+            try:
+                hasher._load_library()
+            except ValueError:
+                results[hasher.algorithm] = 'library not installed'
+                continue
+
+        for workers in args.workers:
+            config = {**settings.PASSWORD_HASHING, 'WORKERS': workers}
+            with override_settings(PASSWORD_HASHERS=[path],
+                                   PASSWORD_HASHING=config):
+                encoded = hasher.encode('password1', hasher.salt())
+                # start every pool process before timing
+                check_many(encoded, workers * 2, args.threads)
+                elapsed = check_many(encoded, args.repeat, args.threads)
+                hashers.shutdown_executor()
+
+            cores = workers or min(args.threads, os.cpu_count())
+            rate = args.repeat / elapsed
+            results[f'{hasher.algorithm}:workers={workers}'] = {
+                'logins_per_sec': round(rate, 1),
+                'logins_per_sec_per_core': round(rate / cores, 1),
+            }
+
+    report('password_hashing', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Latency of the recipe list filters on a large recipe book
+
+    python -m benchmarks.bench_recipe_filters --recipes 1000000
+"""
+from benchmarks.utils import (base_parser, report, setup_django, summarize,
+                              test_database, time_calls)
+
+
+def main():
+    """
+    Build the fixture and time each filter
+    """
+    parser = base_parser(__doc__)
+    parser.add_argument('--recipes', type=int, default=1000000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext, override_settings
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    from benchmarks.fixtures import create_recipe_book
+
+    # measure the SQL filters rather than the response cache
+    bench_caches = dict(settings.CACHES, bench_dummy={
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache'
+    })
+    with test_database(), override_settings(
+            CACHES=bench_caches,
+            RESPONSE_CACHE={'ALIAS': 'bench_dummy', 'TIMEOUT': 0}):
+        user = get_user_model().objects.create_user('bench@example.com',
+                                                    'password1')
+        tag_ids, ingredient_ids = create_recipe_book(user, args.recipes)
+        client = APIClient()
+        client.force_authenticate(user)
+        url = reverse('recipe:recipe-list')
+
+        cases = {
+            'unfiltered': {},
+            'one_tag': {'tags': tag_ids[0]},
+            'any_of_three_tags': {'tags': ','.join(map(str, tag_ids[:3]))},
+            'all_of_two_tags': {'tags': ','.join(map(str, tag_ids[:2])),
+                                'match': 'all'},
+            'tag_and_ingredient': {'tags': tag_ids[0],
+                                   'ingredients': ingredient_ids[0]},
+            'max_time': {'max_time': 20},
+            'max_price': {'max_price': '10.00'},
+        }
+        results = {'recipes': args.recipes}
+        for name, params in cases.items():
+            samples = time_calls(lambda: client.get(url, params), args.repeat)
+            with CaptureQueriesContext(connection) as queries:
+                client.get(url, params)
+            results[name] = dict(summarize(samples),
+                                 queries=len(queries.captured_queries))
+
+    report('recipe_filters', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Full-text recipe search against the icontains scan it replaces
+
+    python -m benchmarks.bench_recipe_search --recipes 200000
+"""
+from benchmarks.utils import (base_parser, report, setup_django, summarize,
+                              test_database, time_calls)
+
+SEARCH_TERMS = ('spicy', 'soup', 'tag 7', 'ingredient 42')
+
+
+def main():
+    """
+    Build and index the fixture, then time both search strategies
+    """
+    parser = base_parser(__doc__)
+    parser.add_argument('--recipes', type=int, default=200000)
+    parser.add_argument('--page-size', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.db.models import Q
+
+    from benchmarks.fixtures import create_recipe_book, index_recipe_book
+    from core.models import Recipe
+    from core.search import search_recipes, uses_postgres_search
+
+    with test_database():
+        user = get_user_model().objects.create_user('bench@example.com',
+                                                    'password1')
+        create_recipe_book(user, args.recipes)
+        index_recipe_book(user)
+        recipes = Recipe.objects.filter(user=user).defer('search_vector')
+
+        def full_text(term):
+            return list(search_recipes(recipes, term).order_by(
+                '-rank', '-id'
+            )[:args.page_size])
+
+        def icontains(term):
+            return list(recipes.filter(
+                Q(title__icontains=term) |
+                Q(tags__name__icontains=term) |
+                Q(ingredients__name__icontains=term)
+            ).distinct().order_by('-id')[:args.page_size])
+
+        results = {'recipes': args.recipes,
+                   'postgres_search': uses_postgres_search()}
+        for term in SEARCH_TERMS:
+            results[term] = {
+                'full_text': summarize(time_calls(
+                    lambda: full_text(term), args.repeat
+                )),
+                'icontains': summarize(time_calls(
+                    lambda: icontains(term), args.repeat
+                )),
+            }
+
+    report('recipe_search', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
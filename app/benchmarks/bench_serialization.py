@@ -0,0 +1,83 @@
+"""
+Serializing and rendering recipes, DRF's generic path against .values()
+rows rendered with orjson
+
+    python -m benchmarks.bench_serialization --recipes 10000
+
+Each case reads every recipe from the database, builds its representation
+and renders it to JSON. The DRF path prefetches the relations like the
+views used to; both outputs are checked to be byte for byte identical.
+"""
+from benchmarks.utils import (base_parser, report, setup_django, summarize,
+                              test_database, time_calls)
+
+
+def main():
+    """
+    Build the fixture and time both paths for the list and detail
+    serializers
+    """
+    parser = base_parser(__doc__)
+    parser.set_defaults(repeat=10)
+    parser.add_argument('--recipes', type=int, default=10000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.db.models import Prefetch
+    from rest_framework.renderers import JSONRenderer
+
+    from benchmarks.fixtures import create_recipe_book
+    from core.models import Ingredient, Recipe, Tag
+    from core.renderers import FastJSONRenderer, orjson
+    from recipe.serializers import RecipeDetailSerializer, RecipeSerializer
+
+    with test_database():
+        user = get_user_model().objects.create_user('bench@example.com',
+                                                    'password1')
+        create_recipe_book(user, args.recipes)
+        queryset = Recipe.objects.filter(user=user).defer(
+            'search_vector'
+        ).order_by('-id')
+
+        def related(model, *fields):
+            return model.objects.only(*fields).order_by('id')
+
+        cases = {
+            'list': (RecipeSerializer, queryset.prefetch_related(
+                Prefetch('tags', queryset=related(Tag, 'id')),
+                Prefetch('ingredients', queryset=related(Ingredient, 'id')),
+            )),
+            'detail': (RecipeDetailSerializer, queryset.prefetch_related(
+                Prefetch('tags', queryset=related(Tag)),
+                Prefetch('ingredients', queryset=related(Ingredient)),
+            )),
+        }
+        results = {'recipes': args.recipes, 'orjson': orjson is not None}
+        for name, (serializer_class, prefetched) in cases.items():
+            def drf():
+                return JSONRenderer().render(
+                    serializer_class(prefetched.all(), many=True).data
+                )
+
+            def values():
+                return FastJSONRenderer().render(
+                    serializer_class().values_data(queryset.all())
+                )
+
+            drf_samples = time_calls(drf, args.repeat)
+            values_samples = time_calls(values, args.repeat)
+            drf_mean = sum(drf_samples) / len(drf_samples)
+            values_mean = sum(values_samples) / len(values_samples)
+            results[name] = {
+                'drf': summarize(drf_samples),
+                'values': summarize(values_samples),
+                'speedup': round(drf_mean / values_mean, 2),
+                'identical': drf() == values(),
+            }
+
+    report('serialization', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Cost of one rate limit check, allowed and rejected
+
+    python -m benchmarks.bench_throttling --keys 100000
+
+Times the counter stores on their own and the full throttle as DRF runs
+it, against DRF's own timestamp-list throttle for reference.
+"""
+import time
+
+from benchmarks.utils import base_parser, report, setup_django
+
+
+def per_call_ns(func, calls: int) -> float:
+    """
+    Return the mean duration of func in nanoseconds
+    """
+    start = time.perf_counter_ns()
+    for _ in range(calls):
+        func()
+    return round((time.perf_counter_ns() - start) / calls, 1)
+
+
+def main():
+    """
+    Time allowed and rejected checks for every limiter
+    """
+    parser = base_parser(__doc__)
+    parser.set_defaults(repeat=100000)
+    parser.add_argument('--keys', type=int, default=10000,
+                        help='distinct clients already tracked')
+    parser.add_argument('--limit', type=int, default=1000,
+                        help='requests allowed per minute and client')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.cache import cache
+    from django.test import RequestFactory, override_settings
+    from rest_framework.request import Request
+    from rest_framework.throttling import AnonRateThrottle
+
+    from core.throttling import (CacheWindowStore, LocalWindowStore,
+                                 SignupRateThrottle, get_throttle_store)
+
+    results = {'calls': args.repeat, 'keys': args.keys, 'limit': args.limit}
+    for name, store in (('local', LocalWindowStore()),
+                        ('cache', CacheWindowStore('default'))):
+        for key in range(args.keys):
+            store.hit(f'client:{key}', args.limit, 60)
+        results[f'{name}_store'] = {
+            'allowed_ns': per_call_ns(
+                lambda: store.hit('client:0', 10 ** 9, 60), args.repeat
+            ),
+            'rejected_ns': per_call_ns(
+                lambda: store.hit('client:1', 0, 60), args.repeat
+            ),
+        }
+
+    request = Request(RequestFactory().post('/api/user/create/'))
+    rate = f'{args.limit}/min'
+    throttle = {'RATES': {'signup': {'ip': rate}}, 'MAX_KEYS': args.keys * 2,
+                'SHARED_CACHE': None}
+    with override_settings(THROTTLE=throttle):
+        get_throttle_store().clear()
+        sliding = SignupRateThrottle()
+        for _ in range(args.limit):
+            sliding.allow_request(request, None)
+        results['sliding_window_throttle_rejected_ns'] = per_call_ns(
+            lambda: sliding.allow_request(request, None), args.repeat
+        )
+
+    cache.clear()
+    AnonRateThrottle.rate = rate
+    drf = AnonRateThrottle()
+    for _ in range(args.limit):
+        drf.allow_request(request, None)
+    results['drf_throttle_rejected_ns'] = per_call_ns(
+        lambda: drf.allow_request(request, None), args.repeat
+    )
+
+    report('throttling', results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Bulk fixture builders for the benchmarks
+"""
+import random
+from decimal import Decimal
+
+ADJECTIVES = ('Spicy', 'Smoky', 'Sweet', 'Crispy', 'Creamy', 'Tangy',
+              'Roasted', 'Grilled', 'Fried', 'Steamed', 'Baked', 'Fresh')
+DISHES = ('Jollof rice', 'Egusi soup', 'Pancakes', 'Chicken curry',
+          'Plantain', 'Pepper soup', 'Salad', 'Noodles', 'Suya', 'Stew',
+          'Moi moi', 'Cheesecake')
+
+
+def create_recipe_book(user, recipes: int, tags: int = 50,
+                       ingredients: int = 200, per_recipe: int = 3,
+                       batch_size: int = 5000, seed: int = 0):
+    """
+    Create tags, ingredients and recipes for a user with bulk inserts,
+    each recipe getting `per_recipe` random tags and ingredients
+    Args:
+        user: owner of every row
+        recipes: number of recipes to create
+        tags: number of tags to create
+        ingredients: number of ingredients to create
+        per_recipe: tags and ingredients attached to each recipe
+        batch_size: rows per INSERT
+        seed: random seed, so runs are reproducible
+
+    Returns:
+        (tag ids, ingredient ids)
+    """
+    from django.core.management.color import no_style
+    from django.db import connection
+
+    from core.models import Ingredient, Recipe, Tag
+
+    rng = random.Random(seed)
+    tag_ids = _create_named(Tag, user, 'Tag', tags, batch_size)
+    ingredient_ids = _create_named(Ingredient, user, 'Ingredient',
+                                   ingredients, batch_size)
+
+    next_id = (Recipe.objects.order_by('-id').values_list(
+        'id', flat=True).first() or 0) + 1
+    tag_through = Recipe.tags.through
+    ingredient_through = Recipe.ingredients.through
+    for start in range(0, recipes, batch_size):
+        count = min(batch_size, recipes - start)
+        ids = range(next_id + start, next_id + start + count)
+        Recipe.objects.bulk_create([
+            Recipe(id=pk, user=user,
+                   title=f'{rng.choice(ADJECTIVES)} {rng.choice(DISHES)}',
+                   time_minutes=rng.randint(5, 180),
+                   price=Decimal(rng.randint(100, 99999)) / 100,
+                   currency=rng.choice(('USD', 'NGN', 'GBP')))
+            for pk in ids
+        ])
+        tag_through.objects.bulk_create([
+            tag_through(recipe_id=pk, tag_id=tag_id)
+            for pk in ids
+            for tag_id in rng.sample(tag_ids, min(per_recipe, len(tag_ids)))
+        ], batch_size=batch_size)
+        ingredient_through.objects.bulk_create([
+            ingredient_through(recipe_id=pk, ingredient_id=ingredient_id)
+            for pk in ids
+            for ingredient_id in rng.sample(
+                ingredient_ids, min(per_recipe, len(ingredient_ids))
+            )
+        ], batch_size=batch_size)
+
+    # the explicit ids leave PostgreSQL's sequence behind, move it past them
+    # so rows created later by the API get fresh ids
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [Recipe]):
+            cursor.execute(sql)
+
+    return tag_ids, ingredient_ids
+
+
+def create_users(count: int, password: str, batch_size: int = 5000):
+    """
+    Create `count` users sharing one password, hashed once, and a token
+    for each
+    Args:
+        count: number of users to create
+        password: the password every user logs in with
+        batch_size: rows per INSERT
+
+    Returns:
+        the users, ordered by id
+    """
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+    from rest_framework.authtoken.models import Token
+
+    user_model = get_user_model()
+    hashed = make_password(password)
+    user_model.objects.bulk_create([
+        user_model(email=f'bench{i}@example.com', name=f'Bench {i}',
+                   password=hashed)
+        for i in range(count)
+    ], batch_size=batch_size)
+    users = list(user_model.objects.filter(
+        email__startswith='bench', email__endswith='@example.com'
+    ).order_by('id'))
+    # keys are generated by save(), which bulk_create skips
+    Token.objects.bulk_create([
+        Token(key=Token.generate_key(None), user=user) for user in users
+    ], batch_size=batch_size)
+    return users
+
+
+def index_recipe_book(user, batch_size: int = 5000):
+    """
+    Build the search documents of every recipe of a user
+    """
+    from core.models import Recipe
+    from core.search import update_search_vectors
+
+    ids = list(Recipe.objects.filter(user=user).values_list('id', flat=True))
+    for start in range(0, len(ids), batch_size):
+        update_search_vectors(ids[start:start + batch_size])
+
+
+def _create_named(model, user, prefix: str, count: int, batch_size: int):
+    """
+    Create `count` named rows of a tag-like model and return their ids
+    """
+    model.objects.bulk_create([
+        model(user=user, name=f'{prefix} {i}') for i in range(count)
+    ], batch_size=batch_size)
+    return list(model.objects.filter(
+        user=user, name__startswith=prefix
+    ).values_list('id', flat=True))
@@ -0,0 +1,95 @@
+"""
+Shared helpers for the benchmark scripts
+"""
+import argparse
+import contextlib
+import json
+import os
+import time
+from typing import Callable, Dict, List
+
+
+def setup_django():
+    """
+    Configure Django, defaulting to the project settings
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+    import django
+    django.setup()
+
+
+@contextlib.contextmanager
+def test_database():
+    """
+    Create the test databases for the duration of a benchmark
+    """
+    from django.test.utils import (setup_databases, setup_test_environment,
+                                   teardown_databases,
+                                   teardown_test_environment)
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """
+    Return the pct percentile of the samples, nearest rank
+    """
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1,
+                       int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(samples: List[float]) -> Dict:
+    """
+    Summarize timings in seconds as milliseconds
+    """
+    return {
+        'count': len(samples),
+        'mean_ms': round(sum(samples) / len(samples) * 1000, 3),
+        'p50_ms': round(percentile(samples, 50) * 1000, 3),
+        'p95_ms': round(percentile(samples, 95) * 1000, 3),
+        'p99_ms': round(percentile(samples, 99) * 1000, 3),
+    }
+
+
+def time_calls(func: Callable, repeat: int, warmup: int = 1) -> List[float]:
+    """
+    Call func repeatedly and return the duration of each call in seconds
+    """
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def base_parser(description: str) -> argparse.ArgumentParser:
+    """
+    Return an argument parser with the options every benchmark shares
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--repeat', type=int, default=50,
+                        help='timed iterations per case')
+    parser.add_argument('--output', help='also write the JSON report here')
+    return parser
+
+
+def report(name: str, results: Dict, output: str = None):
+    """
+    Print the results as JSON, and write them to output if given
+    """
+    document = json.dumps({'benchmark': name, 'results': results}, indent=2)
+    print(document)
+    if output:
+        with open(output, 'w') as f:
+            f.write(document)
@@ -0,0 +1,57 @@
+"""
+Bounded thread pool running blocking database work for async views
+
+Every thread in the pool keeps at most one connection per database, so
+the pool size also caps the connections a single ASGI worker opens no
+matter how many clients it is holding open.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Return the process wide pool, sized by settings.ASYNC_DB_THREADS
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.ASYNC_DB_THREADS,
+                    thread_name_prefix='async-db',
+                )
+    return _executor
+
+
+def _run_with_connections(func, *args, **kwargs):
+    """
+    Run func the way a request thread would, recycling connections that
+    are past CONN_MAX_AGE or broken before and after it
+    """
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_in_db_pool(func, *args, **kwargs):
+    """
+    Await a blocking call made on the database pool, in a copy of the
+    caller's context so request metrics keep counting
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(), functools.partial(
+        context.run, _run_with_connections, func, *args, **kwargs
+    ))
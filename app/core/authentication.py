@@ -0,0 +1,185 @@
+"""
+Token authentication backed by an in-process token cache
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication
+
+SHARED_KEY_PREFIX = 'auth_token'
+
+
+class TokenCache:
+    """
+    Bounded LRU mapping token keys to resolved tokens, with a TTL and an
+    optional shared cache tier behind it
+    """
+
+    def __init__(self, max_size: int, ttl: float, shared_alias: str = None):
+        """
+        Args:
+            max_size: maximum number of tokens kept in process
+            ttl: seconds a resolved token is trusted before a new lookup
+            shared_alias: alias in settings.CACHES used as a second tier
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.shared_alias = shared_alias
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+
+    @property
+    def shared(self):
+        """
+        Return the shared cache backend, or None if not configured
+        """
+        if not self.shared_alias:
+            return None
+        return caches[self.shared_alias]
+
+    def get(self, key: str):
+        """
+        Return the cached token for a key, or None on a miss
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                token, expires = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    return token
+                self._evict(key)
+
+        shared = self.shared
+        if shared is not None:
+            token = shared.get(f'{SHARED_KEY_PREFIX}:{key}')
+            if token is not None:
+                self._set_local(key, token)
+                return token
+        return None
+
+    def set(self, key: str, token):
+        """
+        Cache a resolved token, which must have its user loaded
+        """
+        self._set_local(key, token)
+        shared = self.shared
+        if shared is not None:
+            shared.set_many({
+                f'{SHARED_KEY_PREFIX}:{key}': token,
+                f'{SHARED_KEY_PREFIX}_user:{token.user_id}': key,
+            }, timeout=self.ttl)
+
+    def delete(self, key: str):
+        """
+        Drop a token from every tier
+        """
+        with self._lock:
+            self._evict(key)
+        shared = self.shared
+        if shared is not None:
+            shared.delete(f'{SHARED_KEY_PREFIX}:{key}')
+
+    def delete_user(self, user_id: int):
+        """
+        Drop the tokens belonging to a user from every tier
+        """
+        with self._lock:
+            keys = list(self._keys_by_user.get(user_id, ()))
+            for key in keys:
+                self._evict(key)
+
+        shared = self.shared
+        if shared is not None:
+            user_key = f'{SHARED_KEY_PREFIX}_user:{user_id}'
+            key = shared.get(user_key)
+            if key is not None:
+                shared.delete_many([f'{SHARED_KEY_PREFIX}:{key}', user_key])
+
+    def clear(self):
+        """
+        Empty the in-process tier
+        """
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _set_local(self, key: str, token):
+        """
+        Store a token in process, evicting the least recently used entry
+        when full
+        """
+        with self._lock:
+            self._evict(key)
+            self._entries[key] = (token, time.monotonic() + self.ttl)
+            self._keys_by_user.setdefault(token.user_id, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._evict(next(iter(self._entries)))
+
+    def _evict(self, key: str):
+        """
+        Remove a key from the in-process tier, the lock must be held
+        """
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        user_id = entry[0].user_id
+        keys = self._keys_by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[user_id]
+
+
+_token_cache = None
+_token_cache_lock = threading.Lock()
+
+
+def get_token_cache() -> TokenCache:
+    """
+    Return the process wide token cache, configured from
+    settings.AUTH_TOKEN_CACHE
+    """
+    global _token_cache
+    if _token_cache is None:
+        with _token_cache_lock:
+            if _token_cache is None:
+                config = getattr(settings, 'AUTH_TOKEN_CACHE', {})
+                _token_cache = TokenCache(
+                    max_size=config.get('MAX_SIZE', 10000),
+                    ttl=config.get('TTL', 60),
+                    shared_alias=config.get('SHARED_CACHE'),
+                )
+    return _token_cache
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Drop-in replacement for TokenAuthentication that skips the token/user
+    lookup while the token is cached.
+
+    Entries are invalidated by core.signals when a token is deleted or its
+    user is saved; other processes only see that through the shared tier,
+    otherwise their copy expires after the TTL.
+    """
+
+    def authenticate_credentials(self, key):
+        """
+        Resolve a token key to (user, token), from the cache when possible
+        """
+        cache = get_token_cache()
+        token = cache.get(key)
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(key, token)
+
+        # every request gets its own copy so in place changes to
+        # request.user never leak into the cache
+        token = copy.deepcopy(token)
+        return (token.user, token)
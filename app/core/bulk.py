@@ -0,0 +1,112 @@
+"""
+Helpers for writing rows in bulk
+"""
+import contextvars
+from typing import Dict, Iterable, List
+
+from django.db import connections, router
+from django.db.models.functions import Lower
+
+from core.counters import adjust_counts, deleted_recipe_deltas
+from core.models import Ingredient, Recipe, Tag
+from core.search import recipe_ids_using, update_search_vectors
+
+_deleting_in_bulk = contextvars.ContextVar('deleting_in_bulk',
+                                           default=False)
+
+
+def bulk_insert(model, objs: List, batch_size: int = None) -> List:
+    """
+    Insert objects with bulk_create, making sure every object comes back
+    with its primary key set
+    Args:
+        model: model class of the objects
+        objs: unsaved model instances
+        batch_size: rows per INSERT, the backend default if None
+
+    Returns:
+        the saved objects
+    """
+    db = router.db_for_write(model)
+    if connections[db].features.can_return_rows_from_bulk_insert:
+        return model.objects.using(db).bulk_create(objs, batch_size)
+
+    # backends that cannot return ids from a multi row INSERT (SQLite on
+    # this Django version) fall back to one INSERT per object
+    for obj in objs:
+        obj.save(force_insert=True, using=db)
+    return objs
+
+
+def name_key(name: str) -> str:
+    """
+    Return the key tag and ingredient names are unique by per user, as
+    LOWER(name) computes it on PostgreSQL (SQLite only folds ASCII)
+    """
+    return name.lower()
+
+
+def resolve_names(model, user, names: Iterable[str]) -> Dict[str, int]:
+    """
+    Return the ids of a user's tags or ingredients with the given names,
+    matched case-insensitively, creating the missing ones
+
+    The rows are inserted with INSERT ... ON CONFLICT DO NOTHING against
+    the unique (user, LOWER(name)) index, so concurrent callers resolving
+    the same new name end up with the same row.
+    Args:
+        model: Tag or Ingredient
+        user: owner of the objects
+        names: names to resolve, the first spelling of a new name is kept
+
+    Returns:
+        {name_key(name): id}
+    """
+    wanted = {}
+    for name in names:
+        wanted.setdefault(name_key(name), name)
+    if not wanted:
+        return {}
+
+    manager = model.objects.db_manager(router.db_for_write(model))
+    manager.bulk_create([model(user=user, name=name)
+                         for name in wanted.values()], ignore_conflicts=True)
+    return dict(manager.filter(user=user).annotate(
+        key=Lower('name')
+    ).filter(key__in=list(wanted)).values_list('key', 'id'))
+
+
+def deleting_in_bulk() -> bool:
+    """
+    Return whether bulk_delete is running, so the per-object delete
+    receivers leave their work to it
+    """
+    return _deleting_in_bulk.get()
+
+
+def bulk_delete(queryset, ids: Iterable[int]):
+    """
+    Delete the objects with the given ids, keeping the recipe counts and
+    search documents right with grouped queries over all of them instead
+    of the per-object receivers in core.signals, which cost queries for
+    every object
+    Args:
+        queryset: the objects the ids may be picked from
+        ids: ids of the objects to delete
+    """
+    ids = list(ids)
+    deltas, reindexed = {}, []
+    if queryset.model is Recipe:
+        deltas = deleted_recipe_deltas(ids)
+    elif queryset.model in (Tag, Ingredient):
+        reindexed = list(recipe_ids_using(queryset.model, ids))
+
+    token = _deleting_in_bulk.set(True)
+    try:
+        queryset.filter(id__in=ids).delete()
+    finally:
+        _deleting_in_bulk.reset(token)
+
+    for model, changes in deltas.items():
+        adjust_counts(model, changes)
+    update_search_vectors(reindexed)
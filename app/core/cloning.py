@@ -0,0 +1,116 @@
+"""
+Copying recipes in set-based SQL
+
+A clone is one INSERT ... SELECT for the recipe row and one per relation
+for its through rows, so the copy never travels through Python however
+many tags and ingredients it has. Copies made for another user are linked
+to that user's own tags and ingredients, resolved by name in bulk. Image
+files are content addressed and simply shared by the copy. Raw SQL sends
+no signals, so the recipe counts, search document and cached responses
+are maintained here.
+"""
+from django.db import connections, router, transaction
+
+from core.bulk import resolve_names
+from core.counters import adjust_counts, related_counts
+from core.models import Recipe, User
+from core.response_cache import bump_generation
+from core.search import update_search_vectors
+
+CLONED_RELATIONS = ('tags', 'ingredients')
+
+
+def clone_recipe(source: Recipe, user: User, title: str = None) -> int:
+    """
+    Copy a recipe, with its tags and ingredients, to a user and return the
+    id of the copy; when the user does not own the source its tags and
+    ingredients are replaced by the user's own of the same name, created
+    as needed
+    Args:
+        source: the recipe to copy
+        user: owner of the copy
+        title: title of the copy, the source's when None
+
+    Returns:
+        id of the new recipe
+    """
+    db = router.db_for_write(Recipe)
+    with transaction.atomic(using=db):
+        pk = _insert_recipe(connections[db], source.pk, user.pk, title)
+        for relation in CLONED_RELATIONS:
+            if source.user_id == user.pk:
+                _copy_links(connections[db], relation, source.pk, pk)
+            else:
+                _map_links(relation, source.pk, pk, user)
+            model = Recipe._meta.get_field(relation).related_model
+            adjust_counts(model, related_counts(model, [pk]))
+        adjust_counts(User, {user.pk: 1})
+        if title is not None or source.user_id != user.pk:
+            update_search_vectors([pk])
+        transaction.on_commit(lambda: bump_generation(user.pk), using=db)
+    return pk
+
+
+def _insert_recipe(connection, source_id: int, user_id: int,
+                   title: str = None) -> int:
+    """
+    Copy the recipe row, every column but the id, owner and title kept
+    """
+    qn = connection.ops.quote_name
+    meta = Recipe._meta
+    owner = meta.get_field('user').column
+    title_column = meta.get_field('title').column
+    columns = [field.column for field in meta.concrete_fields
+               if not field.primary_key and
+               field.column not in (owner, title_column)]
+    copied = ', '.join(qn(column) for column in columns)
+    sql = (
+        f'INSERT INTO {qn(meta.db_table)} '
+        f'({qn(owner)}, {qn(title_column)}, {copied}) '
+        f'SELECT %s, COALESCE(%s, {qn(title_column)}), {copied} '
+        f'FROM {qn(meta.db_table)} WHERE {qn(meta.pk.column)} = %s'
+    )
+    params = [user_id, title, source_id]
+    with connection.cursor() as cursor:
+        if connection.features.can_return_columns_from_insert:
+            cursor.execute(f'{sql} RETURNING {qn(meta.pk.column)}', params)
+            return cursor.fetchone()[0]
+        cursor.execute(sql, params)
+        return connection.ops.last_insert_id(cursor, meta.db_table,
+                                             meta.pk.column)
+
+
+def _copy_links(connection, relation: str, source_id: int, target_id: int):
+    """
+    Copy a recipe's through rows of one relation to another recipe
+    """
+    qn = connection.ops.quote_name
+    field = Recipe._meta.get_field(relation)
+    table = qn(field.remote_field.through._meta.db_table)
+    recipe = qn(field.m2m_column_name())
+    related = qn(field.m2m_reverse_name())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ({recipe}, {related}) '
+            f'SELECT %s, {related} FROM {table} WHERE {recipe} = %s',
+            [target_id, source_id]
+        )
+
+
+def _map_links(relation: str, source_id: int, target_id: int, user: User):
+    """
+    Link a recipe to the user's tags or ingredients named like those of
+    the source recipe, creating the missing ones
+    """
+    field = Recipe._meta.get_field(relation)
+    model = field.related_model
+    through = field.remote_field.through
+    ids = resolve_names(model, user, model.objects.filter(
+        recipe=source_id
+    ).values_list('name', flat=True))
+    # names differing only in case resolve to the same object
+    through.objects.bulk_create([
+        through(**{field.m2m_column_name(): target_id,
+                   field.m2m_reverse_name(): pk})
+        for pk in sorted(set(ids.values()))
+    ])
@@ -0,0 +1,136 @@
+"""
+Denormalized recipe counts
+
+Tags and ingredients keep the number of recipes using them, and users the
+number of recipes they own, in a recipe_count column so lists can show
+them without a join. The signal receivers in core.signals adjust the
+columns with relative UPDATEs whenever the ORM changes a relation; writes
+that bypass signals (bulk inserts, raw SQL) must call adjust_counts
+themselves, or recompute the affected rows with rebuild_counts, which the
+rebuild_counters management command runs over whole tables.
+"""
+from collections import Counter
+from typing import Dict, Iterable
+
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from core.models import Recipe, User
+
+COUNTED_RELATIONS = ('tags', 'ingredients')
+
+
+def relation_field(model):
+    """
+    Return the Recipe many to many field pointing at a tag or ingredient
+    model
+    """
+    for field in Recipe._meta.many_to_many:
+        if field.related_model is model:
+            return field
+    raise LookupError(f'Recipe has no relation to {model.__name__}')
+
+
+def counted_models():
+    """
+    Return every model with a maintained recipe_count
+    """
+    return [User] + [Recipe._meta.get_field(relation).related_model
+                     for relation in COUNTED_RELATIONS]
+
+
+def adjust_counts(model, deltas: Dict[int, int]):
+    """
+    Add each delta to the recipe_count of the object with that id, with one
+    UPDATE per distinct delta; counts never drop below zero
+    """
+    by_delta = {}
+    for pk, delta in deltas.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(pk)
+
+    for delta, ids in by_delta.items():
+        value = F('recipe_count') + delta
+        if delta < 0:
+            value = Greatest(value, 0)
+        model.objects.filter(pk__in=ids).update(recipe_count=value)
+
+
+def related_counts(model, recipe_ids: Iterable[int]) -> Counter:
+    """
+    Return how many of the given recipes use each tag or ingredient
+    """
+    field = relation_field(model)
+    column = field.m2m_reverse_name()
+    return Counter(dict(field.remote_field.through.objects.filter(
+        recipe_id__in=list(recipe_ids)
+    ).order_by().values(column).annotate(
+        count=Count('*')
+    ).values_list(column, 'count')))
+
+
+def deleted_recipe_deltas(recipe_ids: Iterable[int]) -> Dict:
+    """
+    Return the count changes deleting the given recipes makes, as
+    {model: deltas} with one grouped query per counted model
+    """
+    recipe_ids = list(recipe_ids)
+    owners = Counter(dict(Recipe.objects.filter(
+        id__in=recipe_ids
+    ).order_by().values('user_id').annotate(
+        count=Count('*')
+    ).values_list('user_id', 'count')))
+    deltas = {User: negated(owners)}
+    for relation in COUNTED_RELATIONS:
+        model = Recipe._meta.get_field(relation).related_model
+        deltas[model] = negated(related_counts(model, recipe_ids))
+    return deltas
+
+
+def negated(counts: Dict[int, int]) -> Dict[int, int]:
+    """
+    Return the deltas undoing the given counts
+    """
+    return {pk: -count for pk, count in counts.items()}
+
+
+def expected_count(model):
+    """
+    Return an expression computing an object's recipe_count from scratch
+    """
+    if model is User:
+        rows = Recipe.objects.filter(user=OuterRef('pk'))
+        column = 'user'
+    else:
+        field = relation_field(model)
+        rows = field.remote_field.through.objects.filter(**{
+            field.m2m_reverse_name(): OuterRef('pk')
+        })
+        column = field.m2m_reverse_name()
+    return Coalesce(Subquery(
+        rows.order_by().values(column).annotate(
+            count=Count('*')
+        ).values('count'),
+        output_field=IntegerField(),
+    ), 0)
+
+
+def count_mismatches(model):
+    """
+    Return a queryset of the objects whose recipe_count is wrong, annotated
+    with the expected value
+    """
+    return model.objects.annotate(
+        expected_count=expected_count(model)
+    ).exclude(recipe_count=F('expected_count'))
+
+
+def rebuild_counts(model, ids: Iterable[int] = None) -> int:
+    """
+    Recompute the recipe_count of the objects with the given ids, or of
+    every object, with a single UPDATE and return the number of rows written
+    """
+    queryset = model.objects.all()
+    if ids is not None:
+        queryset = queryset.filter(pk__in=list(ids))
+    return queryset.update(recipe_count=expected_count(model))
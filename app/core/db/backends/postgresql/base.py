@@ -0,0 +1,130 @@
+"""
+PostgreSQL backend drawing its connections from a per process pool
+
+Django opens a connection per thread and, with CONN_MAX_AGE = 0, closes
+it when the request finishes. With this backend closing hands the
+connection back to the pool instead, and the next request on any thread
+reuses it. Configure the pool with a POOL entry next to ENGINE:
+
+    'POOL': {'MIN_SIZE': 2, 'MAX_SIZE': 20, 'TIMEOUT': 10,
+             'CHECK_AFTER': 0, 'MAX_IDLE': 300}
+"""
+import os
+import threading
+from functools import partial
+
+import psycopg2
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+from core import metrics
+from core.db.backends.postgresql.creation import DatabaseCreation
+from core.db.pool import ConnectionPool
+
+_pools = {}
+_pools_pid = None
+_pools_lock = threading.Lock()
+
+
+def check_connection(connection):
+    """
+    Round trip to the server before a pooled connection is handed out
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+    if not connection.autocommit:
+        connection.rollback()
+
+
+def reset_connection(connection):
+    """
+    Roll back whatever a returned connection left open, failing for
+    connections that are closed or broken
+    """
+    if connection.closed:
+        raise psycopg2.InterfaceError('connection already closed')
+    status = connection.get_transaction_status()
+    if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+        raise psycopg2.InterfaceError('connection is broken')
+    if status != extensions.TRANSACTION_STATUS_IDLE:
+        connection.rollback()
+
+
+def get_pool(settings_dict: dict, conn_params: dict,
+             connect) -> ConnectionPool:
+    """
+    Return this process's pool for a set of connection parameters, opening
+    new connections with connect()
+    """
+    global _pools_pid
+    key = tuple(sorted((name, str(value))
+                       for name, value in conn_params.items()))
+    with _pools_lock:
+        if _pools_pid != os.getpid():
+            # connections inherited through fork share their sockets with
+            # the parent, leave them alone and start over
+            _pools.clear()
+            _pools_pid = os.getpid()
+        pool = _pools.get(key)
+        if pool is None:
+            config = settings_dict.get('POOL', {})
+            pool = _pools[key] = ConnectionPool(
+                connect=connect,
+                check=check_connection,
+                reset=reset_connection,
+                min_size=config.get('MIN_SIZE', 0),
+                max_size=config.get('MAX_SIZE', 20),
+                timeout=config.get('TIMEOUT', 10),
+                check_after=config.get('CHECK_AFTER', 0),
+                max_idle=config.get('MAX_IDLE', 300),
+            )
+    return pool
+
+
+def close_pools():
+    """
+    Close the idle connections of every pool of this process
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_all()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Django's PostgreSQL backend with pooled connections
+    """
+    creation_class = DatabaseCreation
+
+    def get_new_connection(self, conn_params):
+        """
+        Check a connection out of the pool, counting the wait towards the
+        current request's metrics
+        """
+        # Django's own connect also sets the isolation level and the
+        # jsonb loads JSONField relies on
+        self.pool = get_pool(self.settings_dict, conn_params, partial(
+            super().get_new_connection, conn_params
+        ))
+        if self.pool.min_size and not self.pool.size:
+            self.pool.fill()
+        connection, waited = self.pool.acquire()
+
+        stats = metrics.current_stats()
+        if stats is not None:
+            stats.pool_wait += waited
+        self.isolation_level = self.settings_dict['OPTIONS'].get(
+            'isolation_level', connection.isolation_level
+        )
+        return connection
+
+    def _close(self):
+        """
+        Hand the connection back to the pool; one closed inside an atomic
+        block is mid transaction and is closed for real
+        """
+        if self.connection is None:
+            return
+        with self.wrap_database_errors:
+            self.pool.release(self.connection, discard=self.in_atomic_block)
@@ -0,0 +1,21 @@
+"""
+Test database creation for the pooled PostgreSQL backend
+"""
+from django.db.backends.postgresql import creation
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    """
+    Close pooled connections before test databases are cloned or dropped,
+    PostgreSQL refuses both while anyone is connected
+    """
+
+    def _clone_test_db(self, suffix, verbosity, keepdb=False):
+        from core.db.backends.postgresql.base import close_pools
+        close_pools()
+        super()._clone_test_db(suffix, verbosity, keepdb)
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        from core.db.backends.postgresql.base import close_pools
+        close_pools()
+        super()._destroy_test_db(test_database_name, verbosity)
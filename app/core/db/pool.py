@@ -0,0 +1,207 @@
+"""
+A thread safe pool of DB-API connections
+
+The pool knows nothing about Django or PostgreSQL: it is given functions
+to open, check and reset a connection, which keeps it testable against
+sqlite3. core.db.backends.postgresql plugs it into Django.
+"""
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+
+class PoolTimeout(Exception):
+    """
+    Raised when no connection became free within the pool's timeout
+    """
+
+
+class ConnectionPool:
+    """
+    Keep between min_size and max_size open connections, handing out idle
+    ones first and making callers wait once max_size are checked out
+    """
+
+    def __init__(self, connect: Callable, check: Callable = None,
+                 reset: Callable = None, min_size: int = 0,
+                 max_size: int = 10, timeout: float = 30,
+                 check_after: float = 0, max_idle: float = 300):
+        """
+        Args:
+            connect: returns a new connection
+            check: raises or returns False if a connection is dead, run
+                on checkout
+            reset: prepares a returned connection for its next user,
+                raises if it cannot be reused
+            min_size: connections kept open even when idle
+            max_size: connections open at most, idle or checked out
+            timeout: seconds acquire waits for a free connection
+            check_after: seconds a connection may sit idle before it is
+                checked on checkout, 0 checks every checkout
+            max_idle: seconds an idle connection above min_size is kept
+        """
+        self.connect = connect
+        self.check = check
+        self.reset = reset
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.check_after = check_after
+        self.max_idle = max_idle
+        self._idle = deque()
+        self._size = 0
+        self._condition = threading.Condition()
+
+    @property
+    def size(self) -> int:
+        """
+        Number of open connections, idle or checked out
+        """
+        return self._size
+
+    @property
+    def idle(self) -> int:
+        """
+        Number of connections waiting in the pool
+        """
+        return len(self._idle)
+
+    def acquire(self):
+        """
+        Check a connection out of the pool
+
+        Returns:
+            (connection, seconds spent waiting for and opening it)
+        """
+        start = time.monotonic()
+        deadline = start + self.timeout
+        while True:
+            with self._condition:
+                connection, returned = self._take_idle(deadline)
+
+            if connection is None:
+                # a slot was reserved, connect without holding the lock
+                try:
+                    connection = self.connect()
+                except BaseException:
+                    self._discard_slot()
+                    raise
+                return connection, time.monotonic() - start
+
+            if self._alive(connection, returned):
+                return connection, time.monotonic() - start
+            self._close(connection)
+
+    def release(self, connection, discard: bool = False):
+        """
+        Return a connection to the pool, closing it if it is broken or the
+        caller says it should not be reused
+        """
+        if not discard and self.reset is not None:
+            try:
+                self.reset(connection)
+            except Exception:
+                discard = True
+        if discard:
+            self._close(connection)
+            return
+        with self._condition:
+            self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    def fill(self):
+        """
+        Open connections until min_size exist
+        """
+        while True:
+            with self._condition:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                connection = self.connect()
+            except BaseException:
+                self._discard_slot()
+                raise
+            self.release(connection)
+
+    def close_all(self):
+        """
+        Close every idle connection; checked out ones are closed when they
+        come back
+        """
+        with self._condition:
+            idle = list(self._idle)
+            self._idle.clear()
+        for connection, _returned in idle:
+            self._close(connection)
+
+    def _take_idle(self, deadline: float):
+        """
+        Pop the most recently returned idle connection, or reserve a slot
+        for a new one (returning None), waiting until deadline while the
+        pool is full; the condition must be held
+        """
+        self._close_expired()
+        while True:
+            if self._idle:
+                return self._idle.pop()
+            if self._size < self.max_size:
+                self._size += 1
+                return None, None
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise PoolTimeout(
+                    f'No connection free within {self.timeout}s, '
+                    f'all {self.max_size} are in use'
+                )
+            self._condition.wait(remaining)
+
+    def _close_expired(self):
+        """
+        Close the oldest idle connections past max_idle while more than
+        min_size are open; the condition must be held
+        """
+        limit = time.monotonic() - self.max_idle
+        while (self._idle and self._idle[0][1] < limit and
+               self._size > self.min_size):
+            connection, _returned = self._idle.popleft()
+            self._size -= 1
+            try:
+                connection.close()
+            except Exception:
+                pass
+
+    def _alive(self, connection, returned) -> bool:
+        """
+        Return whether a connection can be handed out; connections that
+        were idle for less than check_after are trusted
+        """
+        if self.check is None:
+            return True
+        if self.check_after and \
+                time.monotonic() - returned < self.check_after:
+            return True
+        try:
+            return self.check(connection) is not False
+        except Exception:
+            return False
+
+    def _close(self, connection):
+        """
+        Close a connection and free its slot
+        """
+        try:
+            connection.close()
+        except Exception:
+            pass
+        self._discard_slot()
+
+    def _discard_slot(self):
+        """
+        Free a slot and wake one waiter
+        """
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
@@ -0,0 +1,97 @@
+"""
+Conditional GET support
+
+ETags are derived from data that is already at hand, never from the
+rendered body: for the user's recipes, tags and ingredients that is the
+per user generation kept by core.response_cache, which every write bumps.
+A matching If-None-Match is answered with 304 before any queryset is
+evaluated or serializer runs.
+
+Generations kept in a per process cache are only bumped by the writes that
+process serves, so another process would keep confirming a stale copy;
+those views send no ETags unless RESPONSE_CACHE names a shared cache.
+"""
+import hashlib
+from urllib.parse import urlencode
+
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.response_cache import get_generation, is_shared
+
+
+class NotModified(Exception):
+    """
+    Raised once the client's cached representation is known to be current
+    """
+
+
+def make_etag(*parts) -> str:
+    """
+    Return a strong ETag hashed from the given parts
+    """
+    digest = hashlib.sha1('|'.join(map(str, parts)).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+class ConditionalGetMixin:
+    """
+    Add ETags to GET responses and answer matching If-None-Match requests
+    with 304 Not Modified
+    """
+    etag_actions = ('list', 'retrieve')
+
+    def get_etag(self, request):
+        """
+        Return the ETag of the current request's response, None to skip
+        """
+        if (getattr(self, 'action', None) not in self.etag_actions or
+                not is_shared()):
+            return None
+        return make_etag(
+            type(self).__name__,
+            request.user.pk,
+            self.action,
+            self.kwargs.get(self.lookup_field, ''),
+            request.accepted_renderer.format,
+            urlencode(sorted(request.query_params.lists()), doseq=True),
+            get_generation(request.user.pk),
+        )
+
+    def initial(self, request, *args, **kwargs):
+        """
+        Once authenticated, stop a GET whose representation the client
+        already has
+        """
+        super().initial(request, *args, **kwargs)
+        self.etag = None
+        if request.method not in ('GET', 'HEAD'):
+            return
+
+        self.etag = self.get_etag(request)
+        if self.etag is None:
+            return
+        etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if '*' in etags or self.etag in etags:
+            raise NotModified()
+
+    def handle_exception(self, exc):
+        """
+        Turn NotModified into an empty 304 response
+        """
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED,
+                            headers={'ETag': self.etag})
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """
+        Attach the ETag to successful responses
+        """
+        response = super().finalize_response(request, response, *args,
+                                             **kwargs)
+        etag = getattr(self, 'etag', None)
+        if etag and response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
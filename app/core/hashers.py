@@ -0,0 +1,137 @@
+"""
+Password hashers running in a dedicated process pool
+
+Hashing is deliberately expensive. Run in the request workers, a burst of
+signups or logins takes every core and stalls unrelated requests. The
+pooled hashers keep the algorithms and stored formats of Django's own
+hashers but hand every encode and verify to a small process pool, which
+bounds the CPU spent on passwords to settings.PASSWORD_HASHING['WORKERS']
+cores. With WORKERS set to 0 hashing runs inline.
+
+Because the pooled PBKDF2 hasher keeps the pbkdf2_sha256 algorithm name,
+existing hashes keep verifying, and Django rehashes them with the preferred
+hasher on the user's next successful login.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.contrib.auth.hashers import (Argon2PasswordHasher,
+                                         PBKDF2PasswordHasher)
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+_in_worker = False
+
+
+def _init_worker():
+    """
+    Mark a pool process, whose hashers then run inline
+    """
+    global _in_worker
+    _in_worker = True
+
+
+def get_executor():
+    """
+    Return this process's hashing pool, or None when hashing runs inline
+    """
+    global _executor, _executor_pid
+    workers = settings.PASSWORD_HASHING['WORKERS']
+    if _in_worker or not workers:
+        return None
+
+    # a pool inherited through fork belongs to the parent, start our own
+    if _executor is None or _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor is None or _executor_pid != os.getpid():
+                _executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                )
+                _executor_pid = os.getpid()
+    return _executor
+
+
+def shutdown_executor():
+    """
+    Stop the hashing pool, a new one is started on the next hash
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is not None and _executor_pid == os.getpid():
+            _executor.shutdown()
+        _executor = None
+
+
+def _call_hasher(hasher_class, method: str, args: tuple):
+    """
+    Run a method of the hasher PooledHasherMixin wraps, in this process
+    """
+    hasher = super(PooledHasherMixin, hasher_class())
+    return getattr(hasher, method)(*args)
+
+
+def run_hasher(hasher_class, method: str, *args):
+    """
+    Run a hasher method on the pool and wait for its result
+    """
+    executor = get_executor()
+    if executor is None:
+        return _call_hasher(hasher_class, method, args)
+    try:
+        return executor.submit(_call_hasher, hasher_class, method,
+                               args).result()
+    except BrokenProcessPool:
+        # a worker died, replace the pool and answer this call inline
+        shutdown_executor()
+        return _call_hasher(hasher_class, method, args)
+
+
+class PooledHasherMixin:
+    """
+    Send the expensive calls of a Django password hasher to the pool
+    """
+
+    def encode(self, password, salt, *args):
+        """
+        Hash a password on the pool
+        """
+        return run_hasher(type(self), 'encode', password, salt, *args)
+
+    def verify(self, password, encoded):
+        """
+        Check a password against its hash on the pool
+        """
+        return run_hasher(type(self), 'verify', password, encoded)
+
+
+class PooledPBKDF2PasswordHasher(PooledHasherMixin, PBKDF2PasswordHasher):
+    """
+    PBKDF2 SHA256, hashed on the pool
+    """
+
+
+class PooledArgon2PasswordHasher(PooledHasherMixin, Argon2PasswordHasher):
+    """
+    Argon2, hashed on the pool with the cost parameters in
+    settings.PASSWORD_HASHING; hashes made with other parameters are
+    upgraded on login
+    """
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_HASHING['ARGON2_TIME_COST']
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_HASHING['ARGON2_MEMORY_COST']
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_HASHING['ARGON2_PARALLELISM']
@@ -0,0 +1,190 @@
+"""
+Content addressed recipe images
+
+Uploads are streamed to a temporary file on disk while being hashed, then
+stored under their SHA-256, so an image URL never changes
+meaning and can be cached forever, and identical uploads share one file.
+Thumbnails are named after the original's hash and made by a background
+task once the upload has been stored, outside the request; they need
+Pillow.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import (SkipFile,
+                                             TemporaryFileUploadHandler)
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+from core.models import Recipe
+from core.response_cache import bump_generation
+from core.tasks import task
+
+IMAGE_DIR = 'recipes'
+THUMBNAIL_DIR = 'recipes/thumbs'
+
+# leading bytes of the accepted formats, the client's content type and
+# file name are never trusted
+SIGNATURES = (
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'\x89PNG\r\n\x1a\n', '.png'),
+    (b'GIF87a', '.gif'),
+    (b'GIF89a', '.gif'),
+)
+
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    """
+    Stream every upload to a temporary file, whatever its size, hashing it
+    on the way and skipping files over IMAGE_UPLOAD['MAX_SIZE']
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.size += len(raw_data)
+        if self.size > settings.IMAGE_UPLOAD['MAX_SIZE']:
+            raise SkipFile()
+        self.sha256.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.sha256 = self.sha256.hexdigest()
+        return file
+
+
+def image_extension(file):
+    """
+    Return the extension matching an image's content, None if it is not a
+    supported image
+    """
+    file.seek(0)
+    head = file.read(16)
+    file.seek(0)
+    for signature, extension in SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return '.webp'
+    return None
+
+
+def image_name(digest: str, extension: str) -> str:
+    """
+    Return the storage name of an image with the given SHA-256
+    """
+    return f'{IMAGE_DIR}/{digest[:2]}/{digest}{extension}'
+
+
+def thumbnail_name(image: str) -> str:
+    """
+    Return the storage name of an image's thumbnail
+    """
+    digest = os.path.splitext(os.path.basename(image))[0]
+    width, height = settings.IMAGE_UPLOAD['THUMBNAIL_SIZE']
+    return f'{THUMBNAIL_DIR}/{digest[:2]}/{digest}_{width}x{height}.jpg'
+
+
+def store_image(file) -> str:
+    """
+    Store an uploaded image under its content address and return the name,
+    an image already stored is not written again
+    """
+    digest = getattr(file, 'sha256', None)
+    if digest is None:
+        sha256 = hashlib.sha256()
+        for chunk in file.chunks():
+            sha256.update(chunk)
+        digest = sha256.hexdigest()
+
+    return save_once(image_name(digest, image_extension(file)), file)
+
+
+def save_once(name: str, content) -> str:
+    """
+    Store content under a content addressed name unless it is stored
+    already and return the name. Whoever wins a race to write the same name
+    writes the same bytes, so on a local filesystem the file is written
+    beside its final path and hard linked into place, which fails rather
+    than overwrites when another writer got there first, and readers never
+    see it half written
+    """
+    try:
+        path = default_storage.path(name)
+    except NotImplementedError:
+        if not default_storage.exists(name):
+            name = default_storage.save(name, content)
+        return name
+    if os.path.exists(path):
+        return name
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as temp:
+            for chunk in content.chunks():
+                temp.write(chunk)
+        os.chmod(temp_path, default_storage.file_permissions_mode or 0o644)
+        try:
+            os.link(temp_path, path)
+        except FileExistsError:
+            pass
+    finally:
+        os.unlink(temp_path)
+    return name
+
+
+def make_thumbnail(image: str) -> str:
+    """
+    Create the thumbnail of a stored image unless it exists and return its
+    name
+    """
+    name = thumbnail_name(image)
+    if default_storage.exists(name):
+        return name
+
+    with default_storage.open(image) as source:
+        picture = Image.open(source)
+        picture.thumbnail(settings.IMAGE_UPLOAD['THUMBNAIL_SIZE'])
+        content = ContentFile(b'')
+        picture.convert('RGB').save(content, 'JPEG', quality=85)
+    return save_once(name, content)
+
+
+@task
+def generate_thumbnail(recipe_id: int, image: str):
+    """
+    Make a recipe's thumbnail and record it, unless the recipe's image has
+    been replaced in the meantime
+    """
+    name = make_thumbnail(image)
+    updated = Recipe.objects.filter(pk=recipe_id, image=image).update(
+        thumbnail=name
+    )
+    if updated:
+        # update() sends no signals, drop the user's cached responses
+        bump_generation(Recipe.objects.values_list(
+            'user_id', flat=True
+        ).get(pk=recipe_id))
+
+
+def schedule_thumbnail(recipe: Recipe):
+    """
+    Queue the thumbnail of a recipe's image, which workers see once the
+    current transaction commits; skipped when Pillow is not installed
+    """
+    if Image is None:
+        return
+    generate_thumbnail.delay(recipe.pk, recipe.image.name)
@@ -0,0 +1,275 @@
+"""
+Loading recipe catalogs in bulk
+
+Records come from CSV, in the layout the recipe export writes, or from
+NDJSON, and are loaded a chunk at a time. Tag and ingredient names are
+looked up in an in-memory map of the user's ids, the new ones created with
+core.bulk.resolve_names. Recipe ids are reserved up front, so the recipe
+rows and both through tables are written with COPY on PostgreSQL and with
+batched bulk_create elsewhere. Neither sends signals, so the recipe
+counts, search documents and cached responses are maintained here. The
+records loaded so far are counted on a RecipeImport row in the same
+transaction as each chunk, so an interrupted import resumes exactly after
+the last committed chunk.
+"""
+import csv
+import io
+import json
+from collections import Counter
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Tuple
+
+from django.db import connections, router, transaction
+from django.db.models import F
+
+from core.bulk import name_key, resolve_names
+from core.counters import adjust_counts
+from core.models import Ingredient, Recipe, RecipeImport, Tag, User
+from core.response_cache import bump_generation
+from core.search import update_search_vectors
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+# tags and ingredients of a CSV record, as recipe.export joins them
+LIST_SEPARATOR = '|'
+IMPORTED_RELATIONS = (('tags', Tag), ('ingredients', Ingredient))
+RECIPE_COLUMNS = ('id', 'user', 'title', 'time_minutes', 'price',
+                  'currency', 'link', 'image', 'thumbnail')
+# Recipe.price is a DecimalField(max_digits=6, decimal_places=2)
+CENTS = Decimal('0.01')
+MAX_PRICE = 10000
+# Recipe.time_minutes is an IntegerField, a 4 byte integer column
+MIN_INTEGER = -2 ** 31
+MAX_INTEGER = 2 ** 31 - 1
+
+
+class RecordError(Exception):
+    """
+    A record of the imported file is invalid
+    """
+
+    def __init__(self, line: int, message: str):
+        super().__init__(f'line {line}: {message}')
+        self.line = line
+
+
+class RecipeRecord(NamedTuple):
+    """
+    A validated recipe to import, tags and ingredients by name
+    """
+    line: int
+    title: str
+    time_minutes: int
+    price: Decimal
+    currency: str
+    link: str
+    tags: Tuple[str, ...]
+    ingredients: Tuple[str, ...]
+
+
+def read_records(stream, file_format: str) -> Iterator[Tuple[int, Dict]]:
+    """
+    Yield (line number, raw record) for every record of a text stream
+    """
+    if file_format == 'csv':
+        reader = csv.DictReader(stream)
+        for data in reader:
+            yield reader.line_num, data
+        return
+
+    for line, text in enumerate(stream, 1):
+        if not text.strip():
+            continue
+        try:
+            data = json.loads(text)
+        except ValueError as exc:
+            raise RecordError(line, f'invalid JSON, {exc}')
+        if not isinstance(data, dict):
+            raise RecordError(line, 'expected a JSON object')
+        yield line, data
+
+
+def parse_record(line: int, data: Dict) -> RecipeRecord:
+    """
+    Validate a raw record like RecipeSerializer would, cheaply
+    """
+    title = _text(line, data, 'title', 255, required=True)
+    try:
+        time_minutes = int(data.get('time_minutes'))
+    except (TypeError, ValueError):
+        raise RecordError(line, 'time_minutes must be an integer')
+    if not MIN_INTEGER <= time_minutes <= MAX_INTEGER:
+        raise RecordError(line, 'time_minutes is out of range')
+    try:
+        price = Decimal(str(data.get('price')))
+    except InvalidOperation:
+        raise RecordError(line, 'price must be a number')
+    if not price.is_finite() or price != price.quantize(CENTS) or \
+            abs(price) >= MAX_PRICE:
+        raise RecordError(line, f'price must be below {MAX_PRICE} with at '
+                                f'most 2 decimal places')
+    return RecipeRecord(
+        line=line,
+        title=title,
+        time_minutes=time_minutes,
+        price=price.quantize(CENTS),
+        currency=_text(line, data, 'currency', 10, required=True),
+        link=_text(line, data, 'link', 255),
+        tags=_names(line, data, 'tags'),
+        ingredients=_names(line, data, 'ingredients'),
+    )
+
+
+def _text(line: int, data: Dict, key: str, max_length: int,
+          required: bool = False) -> str:
+    """
+    Return a stripped text value of a record
+    """
+    value = data.get(key)
+    value = '' if value is None else str(value).strip()
+    if required and not value:
+        raise RecordError(line, f'{key} is required')
+    if len(value) > max_length:
+        raise RecordError(line, f'{key} is longer than {max_length} '
+                                f'characters')
+    return value
+
+
+def _names(line: int, data: Dict, key: str) -> Tuple[str, ...]:
+    """
+    Return the tag or ingredient names of a record, given as a separated
+    string, a list of names or a list of objects with a name
+    """
+    value = data.get(key) or []
+    if isinstance(value, str):
+        value = value.split(LIST_SEPARATOR)
+    if not isinstance(value, list):
+        raise RecordError(line, f'{key} must be a list of names')
+    names = []
+    for item in value:
+        if isinstance(item, dict):
+            item = item.get('name')
+        if not isinstance(item, str):
+            raise RecordError(line, f'{key} must be a list of names')
+        item = item.strip()
+        if len(item) > 255:
+            raise RecordError(line, f'{key} names are limited to 255 '
+                                    f'characters')
+        if item:
+            names.append(item)
+    return tuple(names)
+
+
+class RecipeLoader:
+    """
+    Load chunks of records for one user, keeping the ids of the user's
+    tags and ingredients by name between chunks
+    """
+
+    def __init__(self, user: User):
+        self.user = user
+        self.db = router.db_for_write(Recipe)
+        self.connection = connections[self.db]
+        self.names = {}
+        for relation, model in IMPORTED_RELATIONS:
+            self.names[relation] = {
+                name_key(name): pk for pk, name in model.objects.using(
+                    self.db
+                ).filter(user=user).values_list('id', 'name').iterator()
+            }
+
+    def load(self, records: List[RecipeRecord],
+             progress: RecipeImport = None) -> List[int]:
+        """
+        Insert the recipes and their links in one transaction, counting
+        them on the progress row if given, and return their ids
+        """
+        with transaction.atomic(using=self.db):
+            ids = self.reserve_ids(len(records))
+            self.write(Recipe, RECIPE_COLUMNS, (
+                (pk, self.user.pk, record.title, record.time_minutes,
+                 record.price, record.currency, record.link, '', '')
+                for pk, record in zip(ids, records)
+            ))
+            for relation, model in IMPORTED_RELATIONS:
+                links = self.links(relation, ids, records)
+                field = Recipe._meta.get_field(relation)
+                self.write(field.remote_field.through,
+                           (field.m2m_field_name(),
+                            field.m2m_reverse_field_name()), links)
+                adjust_counts(model, Counter(pk for _recipe, pk in links))
+            adjust_counts(User, {self.user.pk: len(ids)})
+            update_search_vectors(ids)
+            if progress is not None:
+                RecipeImport.objects.using(self.db).filter(
+                    pk=progress.pk
+                ).update(records=F('records') + len(ids))
+            transaction.on_commit(lambda: bump_generation(self.user.pk),
+                                  using=self.db)
+        return ids
+
+    def links(self, relation: str, ids: List[int],
+              records: List[RecipeRecord]) -> List[Tuple[int, int]]:
+        """
+        Return the (recipe id, related id) rows of a relation, creating
+        the names the user does not have yet
+        """
+        known = self.names[relation]
+        missing = [name for record in records
+                   for name in getattr(record, relation)
+                   if name_key(name) not in known]
+        if missing:
+            model = Recipe._meta.get_field(relation).related_model
+            known.update(resolve_names(model, self.user, missing))
+
+        links = []
+        for pk, record in zip(ids, records):
+            # names differing only in case link the same object once
+            related = {known[name_key(name)]
+                       for name in getattr(record, relation)}
+            links.extend((pk, related_id) for related_id in sorted(related))
+        return links
+
+    def reserve_ids(self, count: int) -> List[int]:
+        """
+        Take ids for new recipes, from the sequence on PostgreSQL, after
+        the largest id elsewhere, the transaction keeping SQLite's writers
+        out
+        """
+        table = Recipe._meta.db_table
+        column = Recipe._meta.pk.column
+        with self.connection.cursor() as cursor:
+            if self.connection.vendor == 'postgresql':
+                cursor.execute(
+                    'SELECT nextval(pg_get_serial_sequence(%s, %s)) '
+                    'FROM generate_series(1, %s)', [table, column, count]
+                )
+                return [pk for pk, in cursor.fetchall()]
+        last = Recipe.objects.using(self.db).order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        return list(range(last + 1, last + 1 + count))
+
+    def write(self, model, fields: Iterable[str], rows: Iterable[Tuple]):
+        """
+        Insert rows of field values, with COPY on PostgreSQL
+        """
+        fields = [model._meta.get_field(name) for name in fields]
+        if self.connection.vendor != 'postgresql':
+            attnames = [field.attname for field in fields]
+            # batched to the backend's limit on query parameters
+            model.objects.using(self.db).bulk_create([
+                model(**dict(zip(attnames, row))) for row in rows
+            ])
+            return
+
+        buffer = io.StringIO()
+        # quoting every value keeps empty strings apart from NULL
+        csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows(rows)
+        buffer.seek(0)
+        qn = self.connection.ops.quote_name
+        columns = ', '.join(qn(field.column) for field in fields)
+        with self.connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {qn(model._meta.db_table)} ({columns}) '
+                f'FROM STDIN WITH (FORMAT csv)', buffer
+            )
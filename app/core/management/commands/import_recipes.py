@@ -0,0 +1,104 @@
+"""
+Import recipes command
+"""
+import itertools
+import os
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importing import (IMPORT_FORMATS, RecipeLoader, RecordError,
+                            parse_record, read_records)
+from core.models import RecipeImport
+
+
+class Command(BaseCommand):
+    """
+    Load a CSV or NDJSON catalog of recipes for a user, a chunk per
+    transaction, recording the progress in a RecipeImport row so an
+    interrupted import can be resumed
+    """
+    help = 'Bulk import recipes from a CSV or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or NDJSON file to import')
+        parser.add_argument('--user', required=True,
+                            help='Email of the user owning the recipes')
+        parser.add_argument(
+            '--format', choices=IMPORT_FORMATS,
+            help='Format of the file, guessed from its extension if omitted',
+        )
+        parser.add_argument('--chunk-size', type=int, default=10000,
+                            help='Recipes loaded per transaction')
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Skip the recipes a previous run of this file committed',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Parse and load the file chunk by chunk
+        """
+        path = options['path']
+        file_format = options['format'] or self.guess_format(path)
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive')
+        try:
+            user = get_user_model().objects.get(email=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user with email {options["user"]}')
+
+        progress, _created = RecipeImport.objects.get_or_create(
+            user=user, source=os.path.abspath(path)
+        )
+        if not options['resume'] and progress.records:
+            progress.records = 0
+            progress.save(update_fields=['records', 'updated_at'])
+        done = progress.records
+        if done:
+            self.stdout.write(f'Resuming after {done} recipes')
+
+        loader = RecipeLoader(user)
+        start = time.perf_counter()
+        imported = 0
+        try:
+            with open(path, newline='', encoding='utf-8') as stream:
+                records = itertools.islice(
+                    read_records(stream, file_format), done, None
+                )
+                while True:
+                    chunk = [parse_record(line, data) for line, data in
+                             itertools.islice(records, options['chunk_size'])]
+                    if not chunk:
+                        break
+                    loader.load(chunk, progress)
+                    imported += len(chunk)
+                    rate = imported / (time.perf_counter() - start)
+                    self.stdout.write(f'{done + imported} recipes imported '
+                                      f'({rate:.0f}/s)')
+        except OSError as exc:
+            raise CommandError(f'Cannot read {path}: {exc}')
+        except RecordError as exc:
+            raise CommandError(
+                f'{exc}; {done + imported} recipes were imported, fix the '
+                f'record and rerun with --resume'
+            )
+
+        progress.delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} recipes for {user.email}'
+        ))
+
+    @staticmethod
+    def guess_format(path: str) -> str:
+        """
+        Return the format named by the file extension
+        """
+        extension = os.path.splitext(path)[1].lstrip('.').lower()
+        if extension == 'jsonl':
+            extension = 'ndjson'
+        if extension not in IMPORT_FORMATS:
+            raise CommandError(f'Cannot tell the format of {path}, pass '
+                               f'--format')
+        return extension
@@ -0,0 +1,53 @@
+"""
+Rebuild counters command
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.counters import count_mismatches, counted_models, rebuild_counts
+
+
+class Command(BaseCommand):
+    """
+    Recompute the denormalized recipe counts of users, tags and
+    ingredients, or only report the wrong ones with --check
+    """
+    help = 'Rebuild or check the recipe_count columns'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Report wrong counts and exit non-zero instead of fixing '
+                 'them',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Check or rebuild each counted model in turn
+        """
+        if options['check']:
+            self.check_counts()
+            return
+
+        for model in counted_models():
+            with transaction.atomic():
+                rows = rebuild_counts(model)
+            self.stdout.write(f'{model.__name__}: {rows} counts rebuilt')
+        self.stdout.write(self.style.SUCCESS('Counters rebuilt'))
+
+    def check_counts(self):
+        """
+        List every object whose count differs from its relations
+        """
+        wrong = 0
+        for model in counted_models():
+            mismatches = count_mismatches(model).values_list(
+                'pk', 'recipe_count', 'expected_count'
+            )
+            for pk, count, expected in mismatches.iterator():
+                wrong += 1
+                self.stdout.write(f'{model.__name__} {pk}: recipe_count is '
+                                  f'{count}, expected {expected}')
+        if wrong:
+            raise CommandError(f'{wrong} wrong counts, run rebuild_counters')
+        self.stdout.write(self.style.SUCCESS('Counters are correct'))
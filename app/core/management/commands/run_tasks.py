@@ -0,0 +1,117 @@
+"""
+Run tasks command
+"""
+import signal
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections, router
+
+from core.models import Task
+from core.tasks import claim_tasks, run_in_worker, run_task
+
+
+class Command(BaseCommand):
+    """
+    Work through the background task queue with a pool of threads, until
+    stopped or, with --burst, until no task is due; run more of these
+    processes to scale out
+    """
+    help = 'Run queued background tasks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int,
+            default=settings.TASKS['WORKER_THREADS'],
+            help='Tasks run at the same time by this worker, 1 runs them '
+                 'on the main thread',
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Exit once no task is due instead of waiting for more',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Run tasks until stopped by SIGTERM, Ctrl-C or an empty queue
+        """
+        threads = max(1, options['threads'])
+        features = connections[router.db_for_write(Task)].features
+        if threads > 1 and not features.has_select_for_update_skip_locked:
+            # claims would deadlock with the threads' writes on a database
+            # that locks as a whole, like SQLite
+            self.stdout.write('The database cannot skip locked rows, '
+                              'running tasks on one thread')
+            threads = 1
+        self.burst = options['burst']
+        self.poll_interval = settings.TASKS['POLL_INTERVAL']
+        self.stop = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda *_args: self.stop.set())
+
+        self.stdout.write(f'Running tasks on {threads} threads')
+        self.done = self.failed = 0
+        if threads == 1:
+            self.work_inline()
+        else:
+            self.work_in_pool(threads)
+        self.stdout.write(self.style.SUCCESS(
+            f'Ran {self.done} tasks, {self.failed} failed'
+        ))
+
+    def count(self, succeeded: bool):
+        """
+        Record the outcome of a task
+        """
+        self.done += 1
+        self.failed += not succeeded
+
+    def work_inline(self):
+        """
+        Claim and run one task at a time on this thread
+        """
+        try:
+            while not self.stop.is_set():
+                claimed = claim_tasks(1)
+                if claimed:
+                    self.count(run_task(claimed[0]))
+                elif self.burst:
+                    break
+                else:
+                    self.stop.wait(self.poll_interval)
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped')
+
+    def work_in_pool(self, threads: int):
+        """
+        Claim tasks while threads are free and wait for them to finish
+        """
+        running = set()
+        with ThreadPoolExecutor(max_workers=threads,
+                                thread_name_prefix='task') as pool:
+            try:
+                while not self.stop.is_set():
+                    free = threads - len(running)
+                    claimed = claim_tasks(free) if free else []
+                    running.update(pool.submit(run_in_worker, task)
+                                   for task in claimed)
+                    if not running:
+                        if self.burst:
+                            break
+                        self.stop.wait(self.poll_interval)
+                        continue
+                    # with threads to spare the queue is drained, poll it
+                    # again later; otherwise claim as soon as one frees up
+                    finished, running = wait(
+                        running, return_when=FIRST_COMPLETED,
+                        timeout=(self.poll_interval
+                                 if len(running) < threads else None)
+                    )
+                    for future in finished:
+                        self.count(future.result())
+            except KeyboardInterrupt:
+                self.stdout.write('Stopping after the running tasks...')
+            for future in wait(running).done:
+                self.count(future.result())
@@ -17,10 +17,14 @@ class Command(BaseCommand):
         Override to write our custom command
         """
         self.stdout.write('Waiting for database...')
-        db_conn = None
-        while not db_conn:
+        db_conn = connections['default']
+        while True:
             try:
-                db_conn = connections['default']
+                # getting the connection handler never connects, a query
+                # has to reach the server
+                with db_conn.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                break
             except OperationalError:
                 self.stdout.write('Database unavailable. waiting 1 '
                                   'second...')
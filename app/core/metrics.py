@@ -0,0 +1,240 @@
+"""
+In-process request metrics
+
+RequestMetricsMiddleware opens a RequestStats for every request in a
+context variable. Queries are timed by a wrapper installed on every
+database connection when it is created, serializer time by
+TimedSerializerMixin and pool waits by the pooled database backend, and
+they only record while a RequestStats is open.
+Per route histograms are rendered in the Prometheus text format.
+"""
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Tuple
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from core import response_cache
+
+METRIC_PREFIX = 'recipe_api'
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                    0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_current = contextvars.ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    """
+    What one request spent its time on
+    """
+    __slots__ = ('queries', 'db_time', 'serializer_time', 'pool_wait',
+                 'in_serializer')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.pool_wait = 0.0
+        self.in_serializer = False
+
+
+def current_stats():
+    """
+    Return the RequestStats of the request being handled, if any
+    """
+    return _current.get()
+
+
+def start_request() -> Tuple[RequestStats, contextvars.Token]:
+    """
+    Open the stats of a new request
+    """
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def end_request(token: contextvars.Token):
+    """
+    Close the stats opened by start_request
+    """
+    _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper timing every query of an open request
+    """
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_time += time.perf_counter() - start
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    Time the queries of every new connection, from any thread
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class Histogram:
+    """
+    Fixed bucket histogram, rendered with cumulative Prometheus buckets
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """
+        Record one value, the registry lock must be held
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name: str, route: str):
+        """
+        Yield the Prometheus sample lines of this histogram
+        """
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{route="{route}",le="{bound}"}} ' \
+                  f'{cumulative}'
+        yield f'{name}_sum{{route="{route}"}} {self.sum}'
+        yield f'{name}_count{{route="{route}"}} {self.count}'
+
+
+METRICS = {
+    'request_duration_seconds': ('Wall time of a request', DURATION_BUCKETS),
+    'db_duration_seconds': ('Time spent in SQL queries', DURATION_BUCKETS),
+    'serializer_duration_seconds': ('Time spent serializing responses',
+                                    DURATION_BUCKETS),
+    'db_pool_wait_seconds': ('Time spent checking out pooled connections',
+                             DURATION_BUCKETS),
+    'db_queries': ('SQL queries run by a request', QUERY_BUCKETS),
+}
+
+
+class Registry:
+    """
+    Per route histograms of every metric in METRICS
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[str, Dict[str, Histogram]] = {}
+
+    def observe(self, route: str, wall_time: float, stats: RequestStats):
+        """
+        Record a finished request
+        """
+        values = {
+            'request_duration_seconds': wall_time,
+            'db_duration_seconds': stats.db_time,
+            'serializer_duration_seconds': stats.serializer_time,
+            'db_pool_wait_seconds': stats.pool_wait,
+            'db_queries': stats.queries,
+        }
+        with self._lock:
+            histograms = self._routes.get(route)
+            if histograms is None:
+                histograms = self._routes[route] = {
+                    name: Histogram(buckets)
+                    for name, (_help, buckets) in METRICS.items()
+                }
+            for name, value in values.items():
+                histograms[name].observe(value)
+
+    def snapshot(self, route: str) -> Dict[str, Tuple[int, float]]:
+        """
+        Return (count, sum) of every metric of a route
+        """
+        with self._lock:
+            return {name: (histogram.count, histogram.sum)
+                    for name, histogram in self._routes.get(route, {}).items()}
+
+    def reset(self):
+        """
+        Forget every recorded request
+        """
+        with self._lock:
+            self._routes.clear()
+
+    def render(self) -> str:
+        """
+        Return every metric in the Prometheus text exposition format
+        """
+        lines = []
+        with self._lock:
+            for metric, (help_text, _buckets) in METRICS.items():
+                name = f'{METRIC_PREFIX}_{metric}'
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for route, histograms in sorted(self._routes.items()):
+                    lines.extend(histograms[metric].render(name, route))
+
+        cache_stats = response_cache.stats.snapshot()
+        for counter in ('hits', 'misses'):
+            name = f'{METRIC_PREFIX}_response_cache_{counter}_total'
+            lines.append(f'# HELP {name} Response cache {counter}')
+            lines.append(f'# TYPE {name} counter')
+            lines.append(f'{name} {cache_stats[counter]}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class TimedSerializerMixin:
+    """
+    Count the time a serializer spends building its representation
+    towards the current request, nested serializers included once
+    """
+
+    def to_representation(self, instance):
+        """
+        Time the outermost to_representation call
+        """
+        return self._timed(super().to_representation, instance)
+
+    def rows_representation(self, rows):
+        """
+        Time the outermost rows_representation call, for serializers with
+        core.values.ValuesSerializerMixin
+        """
+        return self._timed(super().rows_representation, rows)
+
+    @staticmethod
+    def _timed(method, argument):
+        """
+        Call method, timing it unless an outer call already is
+        """
+        stats = _current.get()
+        if stats is None or stats.in_serializer:
+            return method(argument)
+
+        stats.in_serializer = True
+        start = time.perf_counter()
+        try:
+            return method(argument)
+        finally:
+            stats.serializer_time += time.perf_counter() - start
+            stats.in_serializer = False
@@ -0,0 +1,90 @@
+"""
+Request level instrumentation
+"""
+import asyncio
+import time
+
+from django.conf import settings
+
+from core import metrics
+
+UNRESOLVED_ROUTE = 'unresolved'
+
+
+def route_name(request) -> str:
+    """
+    Return the namespaced URL name a request resolved to, such as
+    recipe:recipe-list, so metrics never grow one series per object id
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None or not match.url_name:
+        return UNRESOLVED_ROUTE
+    return match.view_name
+
+
+class RequestMetricsMiddleware:
+    """
+    Record wall time, query count, database time, connection pool wait and
+    serializer time of every request per route, see core.metrics
+
+    It runs in sync or async mode, like the handler calling it, so under
+    ASGI the async views are not funnelled through the thread sensitive
+    sync adapter.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        config = settings.METRICS
+        self.enabled = config['ENABLED']
+        self.server_timing = config['SERVER_TIMING']
+        if asyncio.iscoroutinefunction(get_response):
+            # tells the handler to await __call__, as MiddlewareMixin does
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        stats, token = metrics.start_request()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        return self.record(request, response, stats,
+                           time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        """
+        Async version of __call__
+        """
+        if not self.enabled:
+            return await self.get_response(request)
+
+        stats, token = metrics.start_request()
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        return self.record(request, response, stats,
+                           time.perf_counter() - start)
+
+    def record(self, request, response, stats, wall_time: float):
+        """
+        Add a finished request to the route's metrics
+        """
+        metrics.registry.observe(route_name(request), wall_time, stats)
+        if self.server_timing:
+            response['Server-Timing'] = ', '.join((
+                f'db;desc="{stats.queries} queries";'
+                f'dur={stats.db_time * 1000:.2f}',
+                f'pool;dur={stats.pool_wait * 1000:.2f}',
+                f'serializer;dur={stats.serializer_time * 1000:.2f}',
+                f'total;dur={wall_time * 1000:.2f}',
+            ))
+        return response
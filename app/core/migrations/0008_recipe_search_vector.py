@@ -0,0 +1,65 @@
+# Generated by Django 3.1 on 2026-10-18 03:10
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_INDEX = 'core_recipe_search_idx'
+
+
+def create_search_index(apps, schema_editor):
+    """
+    GIN indexes only exist on PostgreSQL, other backends go without
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX {SEARCH_INDEX} ON core_recipe '
+        f'USING gin (search_vector)'
+    )
+    schema_editor.execute(
+        "UPDATE core_recipe r SET search_vector = "
+        "setweight(to_tsvector('english', r.title), 'A') || "
+        "setweight(to_tsvector('english', coalesce(("
+        "SELECT string_agg(t.name, ' ') FROM core_tag t "
+        "JOIN core_recipe_tags rt ON rt.tag_id = t.id "
+        "WHERE rt.recipe_id = r.id), '')), 'B') || "
+        "setweight(to_tsvector('english', coalesce(("
+        "SELECT string_agg(i.name, ' ') FROM core_ingredient i "
+        "JOIN core_recipe_ingredients ri ON ri.ingredient_id = i.id "
+        "WHERE ri.recipe_id = r.id), '')), 'B')"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    """
+    Reverse create_search_index
+    """
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX {SEARCH_INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_recipe_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='recipe',
+                    index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name=SEARCH_INDEX),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_index, drop_search_index),
+            ],
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 3.1 on 2026-10-18 03:24
+
+from django.db import migrations, models
+
+BACKFILL = (
+    'UPDATE core_tag SET recipe_count = ('
+    'SELECT count(*) FROM core_recipe_tags rt '
+    'WHERE rt.tag_id = core_tag.id)',
+    'UPDATE core_ingredient SET recipe_count = ('
+    'SELECT count(*) FROM core_recipe_ingredients ri '
+    'WHERE ri.ingredient_id = core_ingredient.id)',
+    'UPDATE core_user SET recipe_count = ('
+    'SELECT count(*) FROM core_recipe r WHERE r.user_id = core_user.id)',
+)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_recipe_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='recipe_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(BACKFILL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 3.1 on 2026-10-18 03:38
+
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Lower
+
+
+def merge_duplicates(apps, schema_editor):
+    """
+    Keep the oldest of the tags or ingredients a user has under the same
+    case-insensitive name, moving the recipes of the others onto it
+    """
+    Recipe = apps.get_model('core', 'Recipe')
+    for relation in ('tags', 'ingredients'):
+        field = Recipe._meta.get_field(relation)
+        model = field.related_model
+        through = field.remote_field.through
+        column = field.m2m_reverse_name()
+
+        kept = {}
+        merged = {}
+        for pk, user_id, key in model.objects.annotate(
+            key=Lower('name')
+        ).order_by('id').values_list('id', 'user_id', 'key').iterator():
+            merged_into = kept.setdefault((user_id, key), pk)
+            if merged_into != pk:
+                merged[pk] = merged_into
+        if not merged:
+            continue
+
+        linked = set(through.objects.filter(**{
+            f'{column}__in': set(merged.values())
+        }).values_list('recipe_id', column))
+        moves = {}
+        for pk, recipe_id, old in through.objects.filter(**{
+            f'{column}__in': list(merged)
+        }).values_list('id', 'recipe_id', column).iterator():
+            if (recipe_id, merged[old]) not in linked:
+                linked.add((recipe_id, merged[old]))
+                moves.setdefault(merged[old], []).append(pk)
+        for target, ids in moves.items():
+            through.objects.filter(id__in=ids).update(**{column: target})
+        # links left on the merged rows duplicate existing ones
+        model.objects.filter(id__in=list(merged)).delete()
+
+        model.objects.filter(id__in=set(merged.values())).update(
+            recipe_count=Coalesce(Subquery(
+                through.objects.filter(**{
+                    column: OuterRef('pk')
+                }).order_by().values(column).annotate(
+                    count=Count('*')
+                ).values('count')
+            ), 0)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_recipe_counts'),
+    ]
+
+    # the unique indexes come in the next migration, so a merge that fails
+    # leaves none of them behind
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+    ]
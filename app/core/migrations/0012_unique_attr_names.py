@@ -0,0 +1,22 @@
+# Generated by Django 3.1 on 2026-10-18 03:39
+
+from django.db import migrations
+
+UNIQUE_INDEXES = (
+    ('core_tag', 'core_tag_user_lower_name_uniq'),
+    ('core_ingredient', 'core_ingr_user_lower_name_uniq'),
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_merge_duplicate_attr_names'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            f'CREATE UNIQUE INDEX {name} ON {table} (user_id, LOWER(name))',
+            f'DROP INDEX {name}',
+        ) for table, name in UNIQUE_INDEXES
+    ]
@@ -7,7 +7,10 @@ from typing import Dict
 
 # third party library
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import (AbstractBaseUser,
                                         BaseUserManager,
                                         PermissionsMixin)
@@ -69,6 +72,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # maintained by core.counters
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
 
     objects = UserManager()
 
@@ -84,6 +89,17 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    # recipes using it, maintained by core.counters
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        # names are also unique per user ignoring case, through a unique
+        # (user_id, LOWER(name)) index created by migration
+        # 0012_unique_attr_names
+        indexes = [
+            models.Index(fields=['user', 'name', 'id'],
+                         name='core_tag_user_name_id_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -99,6 +115,17 @@ class Ingredient(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    # recipes using it, maintained by core.counters
+    recipe_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        # names are also unique per user ignoring case, through a unique
+        # (user_id, LOWER(name)) index created by migration
+        # 0012_unique_attr_names
+        indexes = [
+            models.Index(fields=['user', 'name', 'id'],
+                         name='core_ingr_user_name_id_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -119,6 +146,83 @@ class Recipe(models.Model):
     link = models.CharField(max_length=255, blank=True)
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
+    # content addressed names, set by core.images
+    image = models.FileField(blank=True, max_length=255)
+    thumbnail = models.FileField(blank=True, max_length=255, editable=False)
+    # maintained by core.search from the title, tag and ingredient names
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'],
+                     name='core_recipe_search_idx'),
+            models.Index(fields=['user', 'id'],
+                         name='core_recipe_user_id_idx'),
+            models.Index(fields=['user', 'time_minutes'],
+                         name='core_recipe_user_time_idx'),
+            models.Index(fields=['user', 'price'],
+                         name='core_recipe_user_price_idx'),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class Task(models.Model):
+    """
+    A queued call of a function registered with core.tasks.task
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    )
+
+    name = models.CharField(max_length=255)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES,
+                              default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    # when a queued task may run, or when a running task's lease expires
+    run_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # workers only look for queued or running tasks that are due
+            models.Index(fields=['run_at', 'id'], name='core_task_due_idx',
+                         condition=models.Q(status__in=('queued',
+                                                        'running'))),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.status})'
+
+
+class RecipeImport(models.Model):
+    """
+    How many records of a file an import_recipes run committed, advanced
+    in the transaction of every chunk so a resumed import never repeats one
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    # absolute path of the imported file
+    source = models.CharField(max_length=1024)
+    records = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'source'],
+                                    name='core_recipeimport_source_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.source} ({self.records} records)'
@@ -0,0 +1,69 @@
+"""
+JSON rendering with orjson
+
+orjson encodes the str, int, bool, None, list and dict values our
+serializers produce byte for byte like the standard library does with
+DRF's default settings (unicode, compact, strict), several times faster.
+Anything else goes through DRF's JSONEncoder as orjson's default hook, and
+whatever orjson refuses (integers over 64 bits, non-string keys) is
+encoded by the standard library instead. orjson is optional: it has no
+wheels for every platform, and without it everything is encoded by the
+standard library.
+
+Floats are the exception, orjson writes exponents as 1e16 where Python
+writes 1e+16, so only use this for payloads without floats.
+"""
+import json
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# datetimes and dataclasses are left to DRF's encoder, which formats them
+# differently from orjson
+ORJSON_OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME |
+                  orjson.OPT_PASSTHROUGH_DATACLASS) if orjson else 0
+
+_encoder = JSONEncoder()
+
+
+def dumps(data) -> bytes:
+    """
+    Encode data as compact UTF-8 JSON, the way DRF's JSONRenderer does
+    before escaping line separators
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, default=_encoder.default,
+                                option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False,
+                      allow_nan=False, separators=(',', ':')).encode()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer encoding with orjson when it is installed, falling back to
+    JSONRenderer itself for indented output or non default JSON settings
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """
+        Render data into JSON, returning a bytestring
+        """
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if (data is None or indent is not None or self.ensure_ascii or
+                not self.compact or not self.strict):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+
+        # like JSONRenderer, escape the characters that end a line in
+        # JavaScript but not in JSON
+        return dumps(data).replace(
+            b'\xe2\x80\xa8', b'\\u2028'
+        ).replace(b'\xe2\x80\xa9', b'\\u2029')
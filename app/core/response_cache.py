@@ -0,0 +1,173 @@
+"""
+Per user response cache for the list and summary endpoints
+
+Cached responses are keyed by user, view, host and query string, plus a
+per user generation counter. Any write by or for a user bumps the counter,
+which orphans every cached response of that user at once; the orphans then
+simply expire.
+"""
+import threading
+import time
+from functools import partial
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+GENERATION_KEY = 'resp_gen:{user_id}'
+RESPONSE_KEY = 'resp:{user_id}:{generation}:{view}:{host}:{query}'
+
+# backends whose entries no other server process sees
+PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+class CacheStats:
+    """
+    Thread safe hit and miss counters
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def hit(self):
+        """
+        Count a response served from the cache
+        """
+        with self._lock:
+            self.hits += 1
+
+    def miss(self):
+        """
+        Count a response that had to be computed
+        """
+        with self._lock:
+            self.misses += 1
+
+    def snapshot(self) -> dict:
+        """
+        Return the current counters
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+    def reset(self):
+        """
+        Set the counters back to zero
+        """
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+stats = CacheStats()
+
+
+def get_cache():
+    """
+    Return the cache backend holding responses and generations
+    """
+    return caches[settings.RESPONSE_CACHE['ALIAS']]
+
+
+def is_shared() -> bool:
+    """
+    Return whether every server process sees the same generations
+    """
+    return not isinstance(get_cache(), PROCESS_LOCAL_BACKENDS)
+
+
+def get_generation(user_id: int) -> int:
+    """
+    Return the current generation of a user's cached responses
+    """
+    cache = get_cache()
+    key = GENERATION_KEY.format(user_id=user_id)
+    generation = cache.get(key)
+    if generation is None:
+        # start from the clock so a generation lost to eviction or a
+        # restart never comes back with an old value
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(user_id: int):
+    """
+    Invalidate every cached response of a user
+    """
+    cache = get_cache()
+    key = GENERATION_KEY.format(user_id=user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, int(time.time() * 1000), timeout=None)
+
+
+def response_key(request, view_name: str) -> str:
+    """
+    Return the cache key of a request's response
+    """
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    return RESPONSE_KEY.format(
+        user_id=request.user.pk,
+        generation=get_generation(request.user.pk),
+        view=view_name,
+        host=request.get_host(),
+        query=query,
+    )
+
+
+def cached_response(request, view_name: str, get_response) -> Response:
+    """
+    Return the cached response data of a request, or call get_response on
+    a miss and cache its data when it succeeds
+    """
+    cache = get_cache()
+    key = response_key(request, view_name)
+    data = cache.get(key)
+    if data is not None:
+        stats.hit()
+        return Response(data, headers={'X-Cache': 'HIT'})
+
+    stats.miss()
+    response = get_response()
+    if response.status_code == 200:
+        cache.set(key, response.data,
+                  timeout=settings.RESPONSE_CACHE['TIMEOUT'])
+    response['X-Cache'] = 'MISS'
+    return response
+
+
+class CachedListMixin:
+    """
+    Serve `list` from the per user response cache and invalidate it on
+    every write made through the view; writes made elsewhere are caught by
+    the signal receivers in core.signals
+    """
+
+    def list(self, request, *args, **kwargs):
+        """
+        Return the cached list response, computing it on a miss
+        """
+        return cached_response(request, type(self).__name__, partial(
+            super().list, request, *args, **kwargs
+        ))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """
+        Invalidate the user's cached responses after any successful write
+        made through the view, bulk actions included
+        """
+        response = super().finalize_response(request, response, *args,
+                                             **kwargs)
+        if (request.method not in SAFE_METHODS and
+                request.user.is_authenticated and
+                response.status_code < 400):
+            bump_generation(request.user.pk)
+        return response
@@ -0,0 +1,110 @@
+"""
+Read replica routing
+
+Reads go to the primary unless a view opted in with ReplicaReadMixin for
+the request being handled, so admin, management commands, signals and
+writes never see replication lag. A user who just wrote through the API
+is pinned to the primary for settings.REPLICA_STICKINESS seconds, long
+enough for the replicas to catch up, so they always read their own writes.
+"""
+import contextvars
+import random
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.permissions import SAFE_METHODS
+
+PIN_KEY = 'replica_pin:{user_id}'
+
+_use_replica = contextvars.ContextVar('use_replica', default=False)
+
+
+class ReplicaRouter:
+    """
+    Send reads to a random replica from settings.DATABASE_REPLICAS while
+    replica reads are enabled, everything else to the default database
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if replicas and _use_replica.get():
+            return random.choice(replicas)
+        return None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """
+        Replicas hold the same rows as the primary
+        """
+        return True
+
+
+def get_pin_cache():
+    """
+    Return the cache holding the per user primary pins
+    """
+    return caches[settings.RESPONSE_CACHE['ALIAS']]
+
+
+def pin_to_primary(user_id: int):
+    """
+    Send a user's reads to the primary until the replicas have their
+    latest write
+    """
+    get_pin_cache().set(PIN_KEY.format(user_id=user_id), True,
+                        timeout=settings.REPLICA_STICKINESS)
+
+
+def is_pinned(user_id: int) -> bool:
+    """
+    Return whether a user wrote recently enough to read from the primary
+    """
+    return bool(get_pin_cache().get(PIN_KEY.format(user_id=user_id)))
+
+
+def replica_reads(iterable):
+    """
+    Iterate in replica read mode, for response content produced after the
+    view has returned such as streaming responses
+    """
+    token = _use_replica.set(True)
+    try:
+        yield from iterable
+    finally:
+        _use_replica.reset(token)
+
+
+class ReplicaReadMixin:
+    """
+    Serve the safe requests of a view from the replicas, unless the user
+    is pinned to the primary, and pin users after their writes
+    """
+
+    def initial(self, request, *args, **kwargs):
+        """
+        Decide once the user is authenticated, which reads the primary
+        """
+        super().initial(request, *args, **kwargs)
+        self.use_replica = (
+            bool(settings.DATABASE_REPLICAS) and
+            request.method in SAFE_METHODS and
+            not is_pinned(request.user.pk)
+        )
+        if self.use_replica:
+            self._replica_token = _use_replica.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """
+        Leave replica read mode, and pin the user after a successful write
+        """
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            _use_replica.reset(token)
+            self._replica_token = None
+        if (request.method not in SAFE_METHODS and
+                request.user.is_authenticated and
+                response.status_code < 400):
+            pin_to_primary(request.user.pk)
+        return super().finalize_response(request, response, *args, **kwargs)
@@ -0,0 +1,148 @@
+"""
+Full-text search over recipes
+
+On PostgreSQL every recipe keeps a weighted tsvector of its title (A) and
+of its tag and ingredient names (B), searched through a GIN index. Other
+backends, which only run the test suite, store the same words as plain
+lower-cased text and fall back to substring matching.
+"""
+import contextvars
+from contextlib import contextmanager
+from typing import Iterable
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connections, router
+from django.db.models import (ExpressionWrapper, F, FloatField,
+                              IntegerField, OuterRef, Subquery, Value)
+from django.db.models.functions import Cast, Coalesce
+
+from core.models import Recipe
+
+SEARCH_RELATIONS = ('tags', 'ingredients')
+
+# ranks are scaled to integers so cursor pagination compares them exactly
+RANK_SCALE = 1000000
+
+_pending_reindex = contextvars.ContextVar('pending_reindex', default=None)
+
+
+def uses_postgres_search(model=Recipe) -> bool:
+    """
+    Return whether the database holding the model supports tsvector search
+    """
+    return connections[router.db_for_write(model)].vendor == 'postgresql'
+
+
+def related_names(relation: str):
+    """
+    Return an expression aggregating the names of a recipe's tags or
+    ingredients into one space separated string
+    """
+    model = Recipe._meta.get_field(relation).related_model
+    return Coalesce(Subquery(
+        model.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            names=StringAgg('name', ' ')
+        ).values('names')
+    ), Value(''))
+
+
+def recipe_ids_using(model, ids: Iterable[int]):
+    """
+    Return the ids of recipes related to the given tags or ingredients
+    """
+    relation = {field.related_model: field.name
+                for field in Recipe._meta.many_to_many}[model]
+    field = Recipe._meta.get_field(relation)
+    return field.remote_field.through.objects.filter(**{
+        f'{field.m2m_reverse_name()}__in': list(ids)
+    }).values_list('recipe_id', flat=True).distinct()
+
+
+def update_search_vectors(recipe_ids: Iterable[int]):
+    """
+    Recompute the search document of the given recipes
+    """
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+
+    if uses_postgres_search():
+        config = settings.SEARCH_CONFIG
+        vector = SearchVector('title', weight='A', config=config)
+        for relation in SEARCH_RELATIONS:
+            vector += SearchVector(related_names(relation), weight='B',
+                                   config=config)
+        Recipe.objects.filter(id__in=recipe_ids).update(search_vector=vector)
+        return
+
+    documents = {pk: [title] for pk, title in Recipe.objects.filter(
+        id__in=recipe_ids
+    ).values_list('id', 'title')}
+    for relation in SEARCH_RELATIONS:
+        rows = Recipe.objects.filter(
+            id__in=recipe_ids, **{f'{relation}__isnull': False}
+        ).values_list('id', f'{relation}__name')
+        for pk, name in rows:
+            documents[pk].append(name)
+    for pk, words in documents.items():
+        Recipe.objects.filter(id=pk).update(
+            search_vector=' '.join(words).lower()
+        )
+
+
+@contextmanager
+def reindexing_once():
+    """
+    Collect the recipes the signal receivers reindex inside the block and
+    reindex each of them once when it exits, so a recipe saved and then
+    given tags and ingredients is not reindexed after every step; used
+    inside the write's transaction, the documents commit with the data
+    """
+    if _pending_reindex.get() is not None:
+        yield
+        return
+
+    pending = set()
+    token = _pending_reindex.set(pending)
+    try:
+        yield
+    finally:
+        _pending_reindex.reset(token)
+    update_search_vectors(pending)
+
+
+def reindex(recipe_ids: Iterable[int]):
+    """
+    Recompute the search document of the given recipes now, or at the end
+    of the enclosing reindexing_once() block
+    """
+    pending = _pending_reindex.get()
+    if pending is None:
+        update_search_vectors(recipe_ids)
+    else:
+        pending.update(recipe_ids)
+
+
+def search_recipes(queryset, text: str):
+    """
+    Filter a recipe queryset by a search string and annotate each recipe
+    with an integer `rank`, higher is more relevant
+    """
+    if uses_postgres_search():
+        query = SearchQuery(text, config=settings.SEARCH_CONFIG)
+        return queryset.filter(search_vector=query).annotate(rank=Cast(
+            ExpressionWrapper(
+                SearchRank(F('search_vector'), query) * RANK_SCALE,
+                output_field=FloatField()
+            ),
+            IntegerField()
+        ))
+
+    for word in text.lower().split():
+        queryset = queryset.filter(search_vector__contains=word)
+    return queryset.annotate(rank=Value(0, output_field=IntegerField()))
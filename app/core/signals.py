@@ -0,0 +1,205 @@
+"""
+Signal receivers for the core models
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from core.authentication import get_token_cache
+from core.bulk import deleting_in_bulk
+from core.counters import (COUNTED_RELATIONS, adjust_counts, negated,
+                           related_counts, relation_field)
+from core.models import Ingredient, Recipe, Tag, User
+from core.response_cache import bump_generation
+from core.search import recipe_ids_using, reindex
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    """
+    Stop authenticating with a token as soon as it is deleted
+    """
+    get_token_cache().delete(instance.key)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    """
+    Drop cached tokens when a user changes, so deactivation takes effect
+    and request.user is never stale
+    """
+    if not created:
+        get_token_cache().delete_user(instance.pk)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def start_user_response_cache(sender, instance, created, **kwargs):
+    """
+    Give a new user a fresh response cache generation, so nothing cached
+    under a reused id can be served to them
+    """
+    if created:
+        bump_generation(instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_user_responses(sender, instance, **kwargs):
+    """
+    Invalidate the owner's cached responses whenever their recipes, tags
+    or ingredients change, however the change was made
+    """
+    if kwargs.get('action', 'post_').startswith('post_'):
+        bump_generation(instance.user_id)
+
+
+@receiver(post_save, sender=Recipe)
+def reindex_saved_recipe(sender, instance, update_fields=None, **kwargs):
+    """
+    Keep the search document in step with the recipe title
+    """
+    if update_fields is None or 'title' in update_fields:
+        reindex([instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def reindex_recipe_relations(sender, instance, action, reverse, pk_set,
+                             **kwargs):
+    """
+    Reindex the recipes whose tags or ingredients were added, removed or
+    cleared, from either side of the relation
+    """
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            reindex([instance.pk])
+        return
+
+    if action == 'pre_clear':
+        instance._search_recipe_ids = list(
+            recipe_ids_using(type(instance), [instance.pk])
+        )
+    elif action == 'post_clear':
+        reindex(getattr(instance, '_search_recipe_ids', ()))
+    elif action in ('post_add', 'post_remove'):
+        reindex(pk_set)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def reindex_renamed_attr(sender, instance, created, **kwargs):
+    """
+    Reindex the recipes using a tag or ingredient when it is renamed
+    """
+    if not created:
+        reindex(recipe_ids_using(sender, [instance.pk]))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def collect_deleted_attr_recipes(sender, instance, **kwargs):
+    """
+    Remember which recipes use a tag or ingredient about to be deleted
+    """
+    if deleting_in_bulk():
+        return
+    instance._search_recipe_ids = list(
+        recipe_ids_using(sender, [instance.pk])
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def reindex_deleted_attr_recipes(sender, instance, **kwargs):
+    """
+    Reindex the recipes that lost a deleted tag or ingredient
+    """
+    reindex(getattr(instance, '_search_recipe_ids', ()))
+
+
+@receiver(post_save, sender=Recipe)
+def count_created_recipe(sender, instance, created, **kwargs):
+    """
+    Count a new recipe against its owner
+    """
+    if created:
+        adjust_counts(User, {instance.user_id: 1})
+
+
+@receiver(pre_delete, sender=Recipe)
+def collect_deleted_recipe_counts(sender, instance, **kwargs):
+    """
+    Remember the tags and ingredients of a recipe about to be deleted, its
+    through rows are deleted without an m2m_changed signal
+    """
+    if deleting_in_bulk():
+        return
+    instance._counted_relations = {
+        relation: related_counts(
+            Recipe._meta.get_field(relation).related_model, [instance.pk]
+        ) for relation in COUNTED_RELATIONS
+    }
+
+
+@receiver(post_delete, sender=Recipe)
+def uncount_deleted_recipe(sender, instance, **kwargs):
+    """
+    Take a deleted recipe off its owner, tags and ingredients
+    """
+    if deleting_in_bulk():
+        return
+    adjust_counts(User, {instance.user_id: -1})
+    for relation, counts in getattr(instance, '_counted_relations',
+                                    {}).items():
+        adjust_counts(Recipe._meta.get_field(relation).related_model,
+                      negated(counts))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def count_recipe_relations(sender, instance, action, reverse, model, pk_set,
+                           **kwargs):
+    """
+    Keep the recipe counts of tags and ingredients in step with their
+    relations, changed from either side
+    """
+    counted = type(instance) if reverse else model
+    field = relation_field(counted)
+    rows = sender.objects.filter(**{
+        field.m2m_reverse_name() if reverse else 'recipe_id': instance.pk
+    })
+
+    if action == 'post_add':
+        # pk_set only holds the ids that were actually added
+        deltas = ({instance.pk: len(pk_set)} if reverse else
+                  dict.fromkeys(pk_set, 1))
+    elif action in ('pre_remove', 'pre_clear'):
+        # removing an unrelated id is a no-op, so count what exists
+        if action == 'pre_remove':
+            rows = rows.filter(**{
+                'recipe_id__in' if reverse else
+                f'{field.m2m_reverse_name()}__in': pk_set
+            })
+        if reverse:
+            deltas = {instance.pk: -rows.count()}
+        else:
+            deltas = negated(Counter(rows.values_list(
+                field.m2m_reverse_name(), flat=True
+            )))
+        instance._pending_counts = deltas
+        return
+    elif action in ('post_remove', 'post_clear'):
+        deltas = instance.__dict__.pop('_pending_counts', {})
+    else:
+        return
+    adjust_counts(counted, deltas)
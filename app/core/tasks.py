@@ -0,0 +1,158 @@
+"""
+Background tasks queued in the database
+
+A function decorated with @task gains a delay() that stores the call as a
+core.models.Task row in the caller's transaction, so a worker only sees
+the task once the data it works on is committed. Workers, see
+manage.py run_tasks, claim due tasks with SELECT ... FOR UPDATE SKIP
+LOCKED, so any number of them share the queue without waiting on each
+other, and lease them for TASKS['LEASE'] seconds: the task of a worker
+that died is claimed again once its lease runs out. Each task runs in its
+own transaction; a failure is retried with exponential backoff until
+TASKS['MAX_ATTEMPTS'], then kept as failed with its traceback. Finished
+tasks are deleted. With TASKS['EAGER'] a delay() runs the call at once,
+as the tests want.
+"""
+import json
+import logging
+import traceback
+from datetime import timedelta
+from typing import List
+
+from django.conf import settings
+from django.db import close_old_connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from core.models import Task
+
+logger = logging.getLogger(__name__)
+
+
+def task(func):
+    """
+    Register a function as a task, queued with func.delay(*args, **kwargs);
+    the arguments must be JSON serializable
+    """
+    func.task_name = f'{func.__module__}.{func.__qualname__}'
+
+    def delay(*args, **kwargs):
+        return enqueue(func.task_name, *args, **kwargs)
+
+    func.delay = delay
+    return func
+
+
+def get_task(name: str):
+    """
+    Return the function registered under a task name
+    """
+    func = import_string(name)
+    if getattr(func, 'task_name', None) != name:
+        raise ImportError(f'{name} is not a task')
+    return func
+
+
+def enqueue(name: str, *args, **kwargs):
+    """
+    Queue a call of a task and return its row, or run it now and return
+    None in eager mode
+    """
+    if settings.TASKS['EAGER']:
+        # the arguments take the same JSON round trip as queued ones
+        args, kwargs = json.loads(json.dumps([args, kwargs]))
+        get_task(name)(*args, **kwargs)
+        return None
+    return Task.objects.create(name=name, args=list(args), kwargs=kwargs)
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """
+    Return how long a task waits after its nth failed attempt
+    """
+    config = settings.TASKS
+    return timedelta(seconds=min(
+        config['RETRY_BACKOFF'] * 2 ** (attempts - 1), config['MAX_BACKOFF']
+    ))
+
+
+def claim_tasks(limit: int) -> List[Task]:
+    """
+    Lease up to `limit` due tasks, the oldest first, skipping the rows
+    other workers are claiming
+    """
+    db = router.db_for_write(Task)
+    now = timezone.now()
+    with transaction.atomic(using=db):
+        tasks = list(Task.objects.using(db).select_for_update(
+            skip_locked=True
+        ).filter(
+            status__in=(Task.QUEUED, Task.RUNNING), run_at__lte=now
+        ).order_by('run_at', 'id')[:limit])
+        lease = now + timedelta(seconds=settings.TASKS['LEASE'])
+        Task.objects.using(db).filter(pk__in=[t.pk for t in tasks]).update(
+            status=Task.RUNNING, attempts=F('attempts') + 1, run_at=lease
+        )
+    for claimed in tasks:
+        claimed.status = Task.RUNNING
+        claimed.attempts += 1
+        claimed.run_at = lease
+    return tasks
+
+
+def run_task(claimed: Task) -> bool:
+    """
+    Run a claimed task, then delete it, queue its retry or mark it failed;
+    return whether it succeeded
+    """
+    db = router.db_for_write(Task)
+    rows = Task.objects.using(db).filter(pk=claimed.pk)
+    try:
+        if claimed.attempts > settings.TASKS['MAX_ATTEMPTS']:
+            raise RuntimeError('Lease expired on the last attempt')
+        func = get_task(claimed.name)
+        with transaction.atomic(using=db):
+            func(*claimed.args, **claimed.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        if claimed.attempts >= settings.TASKS['MAX_ATTEMPTS']:
+            logger.error('Task %s %s failed for good after %s attempts',
+                         claimed.pk, claimed.name, claimed.attempts)
+            rows.update(status=Task.FAILED, last_error=error)
+        else:
+            logger.warning('Task %s %s failed, retrying', claimed.pk,
+                           claimed.name)
+            rows.update(status=Task.QUEUED, last_error=error,
+                        run_at=timezone.now() +
+                        retry_delay(claimed.attempts))
+        return False
+
+    rows.delete()
+    return True
+
+
+def run_in_worker(claimed: Task) -> bool:
+    """
+    Run a task on a worker thread, which owns its connections
+    """
+    close_old_connections()
+    try:
+        return run_task(claimed)
+    finally:
+        close_old_connections()
+
+
+def run_pending(limit: int = None) -> int:
+    """
+    Run due tasks one by one in the calling thread until none is left, or
+    `limit` have run, and return how many ran
+    """
+    count = 0
+    while limit is None or count < limit:
+        claimed = claim_tasks(1)
+        if not claimed:
+            break
+        run_task(claimed[0])
+        count += 1
+    return count
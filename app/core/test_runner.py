@@ -0,0 +1,25 @@
+"""
+Test runner for the project
+"""
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Run the tests without rate limits, so no test is throttled by the
+    requests of the ones before it; core.tests.test_throttling sets its
+    own rates
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.unthrottled = override_settings(
+            THROTTLE=dict(settings.THROTTLE, RATES={})
+        )
+        self.unthrottled.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.unthrottled.disable()
+        super().teardown_test_environment(**kwargs)
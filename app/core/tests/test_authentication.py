@@ -0,0 +1,134 @@
+"""
+Test case for core.authentication
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import TokenCache, get_token_cache
+
+PROFILE_URL = reverse('user:profile')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """
+    Test authenticating with cached tokens
+    """
+
+    def setUp(self) -> None:
+        """
+        Create a user with a token and a client sending it
+        """
+        get_token_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            'mail@mail.com',
+            'password1',
+            name='John Doe'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_warm_cache_runs_no_auth_queries(self):
+        """
+        Test a cached token authenticates without touching the database
+        """
+        res = self.client.get(PROFILE_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(PROFILE_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_invalid_token_rejected(self):
+        """
+        Test an unknown token is rejected
+        """
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+        res = self.client.get(PROFILE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_rejected(self):
+        """
+        Test deleting a token invalidates its cache entry
+        """
+        self.client.get(PROFILE_URL)
+        self.token.delete()
+
+        res = self.client.get(PROFILE_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        """
+        Test deactivating a user invalidates the cached token
+        """
+        self.client.get(PROFILE_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        res = self.client.get(PROFILE_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_profile_update_not_stale(self):
+        """
+        Test a profile update is visible on the next cached request
+        """
+        self.client.get(PROFILE_URL)
+        self.client.patch(PROFILE_URL, {'name': 'Jane Doe'})
+
+        res = self.client.get(PROFILE_URL)
+        self.assertEqual(res.data['name'], 'Jane Doe')
+
+
+class TokenCacheTests(TestCase):
+    """
+    Test the token cache itself
+    """
+
+    def setUp(self) -> None:
+        """
+        Create a user with a token
+        """
+        self.user = get_user_model().objects.create_user(
+            'mail@mail.com',
+            'password1'
+        )
+        self.token = Token.objects.create(user=self.user)
+
+    def test_least_recently_used_evicted(self):
+        """
+        Test the cache never grows past its max size
+        """
+        cache = TokenCache(max_size=2, ttl=60)
+        cache.set('a', self.token)
+        cache.set('b', self.token)
+        cache.get('a')
+        cache.set('c', self.token)
+
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertIsNotNone(cache.get('c'))
+
+    def test_expired_entry_missed(self):
+        """
+        Test entries are not served past their TTL
+        """
+        cache = TokenCache(max_size=2, ttl=0)
+        cache.set('a', self.token)
+
+        self.assertIsNone(cache.get('a'))
+
+    def test_delete_user(self):
+        """
+        Test dropping every token of a user
+        """
+        cache = TokenCache(max_size=2, ttl=60)
+        cache.set('a', self.token)
+        cache.delete_user(self.user.pk)
+
+        self.assertIsNone(cache.get('a'))
@@ -0,0 +1,72 @@
+"""
+Test case for core.cloning
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from core.cloning import clone_recipe
+from core.models import Ingredient, Recipe, Tag
+
+
+class CloneRecipeTests(TestCase):
+    """
+    Test copying a recipe to another user
+    """
+
+    def setUp(self) -> None:
+        self.owner = get_user_model().objects.create_user(
+            'owner@mail.com',
+            'password1'
+        )
+        self.user = get_user_model().objects.create_user(
+            'mail@mail.com',
+            'password1'
+        )
+        self.recipe = Recipe.objects.create(
+            user=self.owner, title='Soup', time_minutes=5, price=5.00,
+            currency='USD'
+        )
+        self.recipe.tags.add(Tag.objects.create(user=self.owner,
+                                                name='Vegan'),
+                             Tag.objects.create(user=self.owner,
+                                                name='Quick'))
+        self.recipe.ingredients.add(
+            Ingredient.objects.create(user=self.owner, name='Salt')
+        )
+
+    def test_relations_mapped_to_the_users_own(self):
+        """
+        Test the copy uses the user's tags by name, creating missing ones
+        """
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+
+        pk = clone_recipe(self.recipe, self.user)
+
+        clone = Recipe.objects.get(pk=pk)
+        self.assertEqual(clone.user, self.user)
+        self.assertEqual(clone.title, 'Soup')
+        tags = list(clone.tags.order_by('name'))
+        self.assertEqual([tag.name for tag in tags], ['Quick', 'Vegan'])
+        self.assertTrue(all(tag.user == self.user for tag in tags))
+        self.assertIn(vegan, tags)
+        self.assertEqual(
+            [(i.name, i.user) for i in clone.ingredients.all()],
+            [('Salt', self.user)]
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        vegan.refresh_from_db()
+        self.assertEqual(vegan.recipe_count, 1)
+
+    def test_names_matched_ignoring_case(self):
+        """
+        Test the user's tags are matched to the source's ignoring case
+        """
+        vegan = Tag.objects.create(user=self.user, name='VEGAN')
+
+        pk = clone_recipe(self.recipe, self.user, title='Copy')
+
+        clone = Recipe.objects.get(pk=pk)
+        self.assertEqual(clone.title, 'Copy')
+        self.assertEqual(sorted(clone.tags.values_list('name', flat=True)),
+                         ['Quick', 'VEGAN'])
+        self.assertIn(vegan, clone.tags.all())
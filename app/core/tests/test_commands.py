@@ -1,7 +1,7 @@
 """
 command tests
 """
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 from django.core.management import call_command
 from django.db.utils import OperationalError
 from django.test import TestCase
@@ -13,11 +13,12 @@ class CommandTests(TestCase):
         """
         Test waiting for db when db is available
         """
-        with patch('django.db.utils.ConnectionHandler.__getitem__') \
-                as gi:
-            gi.return_value = True
+        with patch('django.db.backends.base.base.BaseDatabaseWrapper.cursor') \
+                as cursor:
             call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 1)
+            self.assertEqual(cursor.call_count, 1)
+            cursor.return_value.__enter__.return_value.execute \
+                .assert_called_once_with('SELECT 1')
 
     @patch('time.sleep', return_value=True)
     def test_wait_for_db(self, ts):
@@ -25,8 +26,8 @@ class CommandTests(TestCase):
         Test waiting for db with Operational Error for the first
         5 times trying to connect
         """
-        with patch('django.db.utils.ConnectionHandler.__getitem__') \
-                as gi:
-            gi.side_effect = [OperationalError] * 5 + [True]
+        with patch('django.db.backends.base.base.BaseDatabaseWrapper.cursor') \
+                as cursor:
+            cursor.side_effect = [OperationalError] * 5 + [MagicMock()]
             call_command('wait_for_db')
-            self.assertEqual(gi.call_count, 6)
+            self.assertEqual(cursor.call_count, 6)
@@ -0,0 +1,151 @@
+"""
+Test case for core.counters and the rebuild_counters command
+"""
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from core.models import Ingredient, Recipe, Tag
+
+
+def sample_recipe(user, title='Salad'):
+    """
+    Create and return a sample recipe
+    """
+    return Recipe.objects.create(user=user, title=title, time_minutes=5,
+                                 price=5.00, currency='USD')
+
+
+def counts(*objs):
+    """
+    Return the stored recipe_count of each object
+    """
+    return [type(obj).objects.get(pk=obj.pk).recipe_count for obj in objs]
+
+
+class CounterSignalTests(TestCase):
+    """
+    Test the counts follow relation changes made through the ORM
+    """
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'mail@mail.com',
+            'password1'
+        )
+        self.tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        self.tag2 = Tag.objects.create(user=self.user, name='Dessert')
+
+    def test_recipes_counted_against_owner(self):
+        """
+        Test creating and deleting recipes updates the user's count
+        """
+        recipe = sample_recipe(self.user)
+        sample_recipe(self.user, 'Soup')
+        self.assertEqual(counts(self.user), [2])
+
+        recipe.delete()
+        self.assertEqual(counts(self.user), [1])
+
+    def test_add_and_remove_from_recipe(self):
+        """
+        Test the forward side of the relation, removing an unrelated tag
+        changes nothing
+        """
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(self.tag1, self.tag2)
+        recipe.tags.add(self.tag1)
+        self.assertEqual(counts(self.tag1, self.tag2), [1, 1])
+
+        recipe.tags.remove(self.tag1)
+        recipe.tags.remove(self.tag1)
+        self.assertEqual(counts(self.tag1, self.tag2), [0, 1])
+
+        recipe.tags.clear()
+        self.assertEqual(counts(self.tag1, self.tag2), [0, 0])
+
+    def test_add_and_remove_from_tag(self):
+        """
+        Test the reverse side of the relation
+        """
+        recipe1 = sample_recipe(self.user)
+        recipe2 = sample_recipe(self.user, 'Soup')
+        self.tag1.recipe_set.add(recipe1, recipe2)
+        self.assertEqual(counts(self.tag1), [2])
+
+        self.tag1.recipe_set.remove(recipe1)
+        self.assertEqual(counts(self.tag1), [1])
+
+        self.tag1.recipe_set.clear()
+        self.assertEqual(counts(self.tag1), [0])
+
+    def test_set_relations(self):
+        """
+        Test set() only counts what it actually changes
+        """
+        ingredient1 = Ingredient.objects.create(user=self.user, name='Salt')
+        ingredient2 = Ingredient.objects.create(user=self.user, name='Kale')
+        recipe = sample_recipe(self.user)
+        recipe.ingredients.set([ingredient1])
+        recipe.ingredients.set([ingredient1, ingredient2])
+        recipe.ingredients.set([ingredient2])
+
+        self.assertEqual(counts(ingredient1, ingredient2), [0, 1])
+
+    def test_deleting_recipe_uncounts_relations(self):
+        """
+        Test deleting a recipe, even as part of a queryset, decrements its
+        tags
+        """
+        recipe1 = sample_recipe(self.user)
+        recipe2 = sample_recipe(self.user, 'Soup')
+        recipe1.tags.add(self.tag1, self.tag2)
+        recipe2.tags.add(self.tag1)
+
+        Recipe.objects.filter(pk__in=[recipe1.pk, recipe2.pk]).delete()
+
+        self.assertEqual(counts(self.tag1, self.tag2, self.user), [0, 0, 0])
+
+
+class RebuildCountersCommandTests(TestCase):
+    """
+    Test checking and rebuilding the counts
+    """
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'mail@mail.com',
+            'password1'
+        )
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        sample_recipe(self.user).tags.add(self.tag)
+
+    def test_check_passes_when_counts_are_right(self):
+        """
+        Test --check succeeds on maintained counts
+        """
+        out = StringIO()
+        call_command('rebuild_counters', check=True, stdout=out)
+        self.assertIn('Counters are correct', out.getvalue())
+
+    def test_check_reports_and_rebuild_fixes(self):
+        """
+        Test drifted counts are reported by --check and then repaired
+        """
+        Tag.objects.update(recipe_count=7)
+        get_user_model().objects.update(recipe_count=0)
+
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('rebuild_counters', check=True, stdout=out)
+        self.assertIn(f'Tag {self.tag.pk}: recipe_count is 7, expected 1',
+                      out.getvalue())
+        self.assertIn(f'User {self.user.pk}: recipe_count is 0, expected 1',
+                      out.getvalue())
+
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assertEqual(counts(self.tag, self.user), [1, 1])
+        call_command('rebuild_counters', check=True, stdout=StringIO())
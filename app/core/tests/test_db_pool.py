@@ -0,0 +1,204 @@
+"""
+Test case for core.db.pool
+"""
+import sqlite3
+import threading
+import time
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase
+
+from core import metrics
+from core.db.pool import ConnectionPool, PoolTimeout
+from core.models import Task
+
+
+def ping(connection):
+    """
+    Liveness check of a sqlite3 connection
+    """
+    connection.execute('SELECT 1')
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """
+    Test pooling sqlite3 connections
+    """
+
+    def setUp(self) -> None:
+        """
+        count the connections the pool opens
+        """
+        self.opened = []
+
+    def connect(self):
+        """
+        Open a sqlite3 connection usable from any thread
+        """
+        connection = sqlite3.connect(':memory:', check_same_thread=False)
+        self.opened.append(connection)
+        return connection
+
+    def make_pool(self, **kwargs):
+        """
+        Return a pool of sqlite3 connections
+        """
+        return ConnectionPool(connect=self.connect, check=ping,
+                              reset=lambda connection: connection.rollback(),
+                              **kwargs)
+
+    def test_released_connections_are_reused(self):
+        """
+        Test a returned connection is handed out again
+        """
+        pool = self.make_pool(max_size=2)
+        first, _ = pool.acquire()
+        pool.release(first)
+        second, _ = pool.acquire()
+
+        self.assertIs(first, second)
+        self.assertEqual(len(self.opened), 1)
+
+    def test_dead_connections_are_replaced(self):
+        """
+        Test a connection failing its liveness check is discarded on
+        checkout
+        """
+        pool = self.make_pool(max_size=1)
+        first, _ = pool.acquire()
+        pool.release(first)
+        first.close()
+
+        second, _ = pool.acquire()
+
+        self.assertIsNot(first, second)
+        self.assertEqual(pool.size, 1)
+        second.execute('SELECT 1')
+
+    def test_check_after_trusts_recent_connections(self):
+        """
+        Test recently returned connections skip the liveness check
+        """
+        checks = []
+        pool = ConnectionPool(connect=self.connect, check=checks.append,
+                              check_after=60)
+        connection, _ = pool.acquire()
+        pool.release(connection)
+        pool.acquire()
+
+        self.assertEqual(checks, [])
+
+    def test_failed_reset_discards(self):
+        """
+        Test connections that cannot be reset never return to the pool
+        """
+        pool = self.make_pool(max_size=1)
+        connection, _ = pool.acquire()
+        connection.close()
+
+        pool.release(connection)
+
+        self.assertEqual((pool.size, pool.idle), (0, 0))
+
+    def test_full_pool_times_out(self):
+        """
+        Test acquire gives up once no connection frees up in time
+        """
+        pool = self.make_pool(max_size=1, timeout=0.05)
+        pool.acquire()
+
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+
+    def test_waiter_gets_released_connection(self):
+        """
+        Test a caller blocked on a full pool gets the next released
+        connection and reports how long it waited
+        """
+        pool = self.make_pool(max_size=1, timeout=5)
+        connection, _ = pool.acquire()
+        threading.Timer(0.05, pool.release, [connection]).start()
+
+        waited_for, waited = pool.acquire()
+
+        self.assertIs(waited_for, connection)
+        self.assertGreaterEqual(waited, 0.04)
+
+    def test_min_size_and_idle_expiry(self):
+        """
+        Test fill opens min_size connections and idle ones above it close
+        """
+        pool = self.make_pool(min_size=1, max_size=3, max_idle=0.01)
+        pool.fill()
+        self.assertEqual((pool.size, pool.idle), (1, 1))
+
+        first, _ = pool.acquire()
+        second, _ = pool.acquire()
+        pool.release(first)
+        pool.release(second)
+        time.sleep(0.02)
+        pool.acquire()
+
+        self.assertEqual(pool.size, 1)
+
+    def test_connect_failure_frees_slot(self):
+        """
+        Test a failed connect does not leak a slot
+        """
+        pool = ConnectionPool(connect=lambda: 1 / 0, max_size=1)
+
+        for _ in range(2):
+            with self.assertRaises(ZeroDivisionError):
+                pool.acquire()
+        self.assertEqual(pool.size, 0)
+
+    def test_pool_wait_in_request_metrics(self):
+        """
+        Test pool waits are exposed as a request metric
+        """
+        metrics.registry.reset()
+        stats, token = metrics.start_request()
+        stats.pool_wait = 0.25
+        metrics.end_request(token)
+        metrics.registry.observe('recipe:recipe-list', 0.5, stats)
+
+        self.assertEqual(
+            metrics.registry.snapshot('recipe:recipe-list')[
+                'db_pool_wait_seconds'
+            ],
+            (1, 0.25)
+        )
+
+
+@skipUnless(connection.settings_dict['ENGINE'] ==
+            'core.db.backends.postgresql',
+            'the pooled PostgreSQL backend is not in use')
+class PooledBackendTests(TransactionTestCase):
+    """
+    Test the pooled PostgreSQL backend against a real server
+    """
+
+    def test_connection_reused(self):
+        """
+        Test closing hands the connection back for the next one to reuse
+        """
+        connection.ensure_connection()
+        raw = connection.connection
+        connection.close()
+
+        self.assertGreaterEqual(connection.pool.idle, 1)
+        connection.ensure_connection()
+        self.assertIs(connection.connection, raw)
+
+    def test_json_fields_decoded_once(self):
+        """
+        Test pooled connections get Django's connection setup, so JSON
+        columns are not decoded twice
+        """
+        connection.close()
+        task = Task.objects.create(name='x', args=[1, 'two'],
+                                   kwargs={'three': 3})
+        task.refresh_from_db()
+
+        self.assertEqual((task.args, task.kwargs), ([1, 'two'], {'three': 3}))
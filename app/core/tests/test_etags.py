@@ -0,0 +1,159 @@
+"""
+Test case for core.etags
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from core.response_cache import GENERATION_KEY, get_cache, is_shared
+
+TAGS_URL = reverse('recipe:tag-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+PROFILE_URL = reverse('user:profile')
+
+
+class ConditionalGetTests(TestCase):
+    """
+    Test ETags and If-None-Match handling
+    """
+
+    def setUp(self) -> None:
+        """
+        create a user with a recipe for testing conditional requests
+        """
+        self.user = get_user_model().objects.create_user(
+            'mail@mail.com',
+            'password1',
+            name='John Doe'
+        )
+        self.recipe = Recipe.objects.create(user=self.user, title='Salad',
+                                            time_minutes=5, price=5.00,
+                                            currency='USD')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # the tests run in one process, where local memory is shared enough
+        shared = patch('core.etags.is_shared', return_value=True)
+        shared.start()
+        self.addCleanup(shared.stop)
+
+    def test_unchanged_list_not_modified(self):
+        """
+        Test a list whose ETag matches is answered with an empty 304
+        without touching the database
+        """
+        res = self.client.get(RECIPES_URL)
+        etag = res['ETag']
+
+        with self.assertNumQueries(0):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertFalse(res.content)
+
+    def test_write_changes_etag(self):
+        """
+        Test any write to the user's data changes the list ETag
+        """
+        etag = self.client.get(TAGS_URL)['ETag']
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_detail_not_modified(self):
+        """
+        Test conditional GET of a recipe detail
+        """
+        url = reverse('recipe:recipe-detail', args=[self.recipe.id])
+        etag = self.client.get(url)['ETag']
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.patch(url, {'title': 'Green salad'})
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'Green salad')
+
+    def test_etag_depends_on_query(self):
+        """
+        Test different pages and filters carry different ETags
+        """
+        etag = self.client.get(RECIPES_URL)['ETag']
+        res = self.client.get(RECIPES_URL, {'max_time': 10},
+                              HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_etag_depends_on_user(self):
+        """
+        Test another user's list is never answered with 304, even when
+        their generations are equal
+        """
+        other = get_user_model().objects.create_user('other@mail.com',
+                                                     'password1')
+        for user in (self.user, other):
+            get_cache().set(GENERATION_KEY.format(user_id=user.pk), 1,
+                            timeout=None)
+        etag = self.client.get(TAGS_URL)['ETag']
+
+        self.client.force_authenticate(other)
+        res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_profile_not_modified(self):
+        """
+        Test conditional GET of the profile follows profile changes
+        """
+        etag = self.client.get(PROFILE_URL)['ETag']
+        res = self.client.get(PROFILE_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.patch(PROFILE_URL, {'name': 'Jane Doe'})
+        res = self.client.get(PROFILE_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_no_etags_without_shared_cache(self):
+        """
+        Test lists carry no ETag while the generations live in a per
+        process cache, where other processes' writes would not bump them
+        """
+        with patch('core.etags.is_shared', return_value=False):
+            res = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH='*')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(res.has_header('ETag'))
+
+
+class SharedCacheTests(TestCase):
+    """
+    Test telling shared caches from per process ones
+    """
+
+    def test_local_caches_not_shared(self):
+        """
+        Test local memory and dummy caches are per process
+        """
+        self.assertFalse(is_shared())
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache'
+        }}):
+            self.assertFalse(is_shared())
+
+    def test_file_cache_shared(self):
+        """
+        Test a cache other processes read is shared
+        """
+        with override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': '/tmp/recipe-app-test-cache',
+        }}):
+            self.assertTrue(is_shared())
@@ -0,0 +1,134 @@
+"""
+Test case for core.hashers
+"""
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import (PBKDF2PasswordHasher,
+                                         check_password, get_hasher,
+                                         make_password)
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import hashers
+
+try:
+    import argon2
+except ImportError:
+    argon2 = None
+
+TOKEN_URL = reverse('user:token')
+
+PASSWORD_HASHING = {
+    'WORKERS': 1,
+    'ARGON2_TIME_COST': 2,
+    'ARGON2_MEMORY_COST': 1024,
+    'ARGON2_PARALLELISM': 1,
+}
+
+
+@override_settings(PASSWORD_HASHING=PASSWORD_HASHING)
+class PooledHasherTests(TestCase):
+    """
+    Test hashing passwords on the process pool
+    """
+
+    def tearDown(self) -> None:
+        """
+        stop the pool started by the test
+        """
+        hashers.shutdown_executor()
+
+    def test_configured_hashers_verify_on_pool(self):
+        """
+        Test the hashers the settings resolve for the pooled algorithms
+        are the pooled ones, so checking a password uses the pool too
+        """
+        for algorithm in ('pbkdf2_sha256', 'argon2'):
+            self.assertIsInstance(get_hasher(algorithm),
+                                  hashers.PooledHasherMixin)
+
+        encoded = make_password('password1')
+        with patch('core.hashers.run_hasher',
+                   wraps=hashers.run_hasher) as run_hasher:
+            self.assertTrue(check_password('password1', encoded))
+
+        self.assertEqual(run_hasher.call_args[0][1], 'verify')
+
+    @override_settings(PASSWORD_HASHERS=[
+        'core.hashers.PooledPBKDF2PasswordHasher'
+    ])
+    def test_pooled_pbkdf2_round_trip(self):
+        """
+        Test a password hashed on the pool verifies and keeps the
+        pbkdf2_sha256 format
+        """
+        encoded = make_password('password1')
+
+        self.assertTrue(encoded.startswith('pbkdf2_sha256$'))
+        self.assertIsNotNone(hashers.get_executor())
+        self.assertTrue(check_password('password1', encoded))
+        self.assertFalse(check_password('password2', encoded))
+
+    @override_settings(
+        PASSWORD_HASHERS=['core.hashers.PooledPBKDF2PasswordHasher'],
+        PASSWORD_HASHING={**PASSWORD_HASHING, 'WORKERS': 0}
+    )
+    def test_inline_without_workers(self):
+        """
+        Test hashing runs in process when no workers are configured
+        """
+        encoded = make_password('password1')
+
+        self.assertIsNone(hashers.get_executor())
+        self.assertTrue(check_password('password1', encoded))
+
+    @override_settings(PASSWORD_HASHERS=[
+        'core.hashers.PooledPBKDF2PasswordHasher'
+    ])
+    def test_existing_hashes_verify(self):
+        """
+        Test hashes made by Django's own PBKDF2 hasher still verify
+        """
+        encoded = PBKDF2PasswordHasher().encode('password1', 'somesalt')
+
+        self.assertTrue(check_password('password1', encoded))
+
+    @override_settings(PASSWORD_HASHERS=[
+        'core.hashers.PooledPBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    ])
+    def test_login_upgrades_old_hash(self):
+        """
+        Test obtaining a token rehashes a password made by an older hasher
+        """
+        user = get_user_model().objects.create(email='mail@mail.com')
+        user.password = make_password('password1', hasher='pbkdf2_sha1')
+        user.save()
+
+        res = APIClient().post(TOKEN_URL, {'email': 'mail@mail.com',
+                                           'password': 'password1'})
+
+        self.assertEqual(res.status_code, 200)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
+        self.assertTrue(user.check_password('password1'))
+
+    @skipUnless(argon2, 'argon2-cffi is not installed')
+    @override_settings(PASSWORD_HASHERS=[
+        'core.hashers.PooledArgon2PasswordHasher',
+        'core.hashers.PooledPBKDF2PasswordHasher',
+    ])
+    def test_argon2_upgrade(self):
+        """
+        Test a PBKDF2 hash is upgraded to Argon2 with the configured costs
+        """
+        user = get_user_model().objects.create(email='mail@mail.com')
+        user.password = make_password('password1', hasher='pbkdf2_sha256')
+        user.save()
+
+        self.assertTrue(user.check_password('password1'))
+        user.refresh_from_db()
+        self.assertIn('m=1024,t=2,p=1', user.password)
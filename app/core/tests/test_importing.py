@@ -0,0 +1,192 @@
+"""
+Test case for core.importing and the import_recipes command
+"""
+import json
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from core.counters import count_mismatches, counted_models
+from core.importing import RecordError, parse_record
+from core.models import Ingredient, Recipe, RecipeImport, Tag
+
+CSV_CATALOG = (
+    'id,title,link,time_minutes,price,currency,tags,ingredients\n'
+    '7,Jollof rice,,45,12.5,NGN,Spicy|dinner,Rice|Tomato\n'
+    '8,"Pancakes, fluffy",http://x.io,20,4,USD,Breakfast|SPICY|spicy,\n'
+)
+
+
+class ImportRecipesTests(TestCase):
+    """
+    Test importing recipe catalogs
+    """
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'mail@mail.com',
+            'password1'
+        )
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write_file(self, name, content):
+        """
+        Write a catalog to the temporary directory and return its path
+        """
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as catalog:
+            catalog.write(content)
+        return path
+
+    def import_recipes(self, path, *args):
+        """
+        Run the command for the user and return its output
+        """
+        out = StringIO()
+        call_command('import_recipes', path, '--user', self.user.email,
+                     *args, stdout=out)
+        return out.getvalue()
+
+    def test_import_csv(self):
+        """
+        Test recipes are created with their names resolved to the user's
+        tags and ingredients, existing ones reused ignoring case, and the
+        counts kept right
+        """
+        dinner = Tag.objects.create(user=self.user, name='Dinner')
+        self.import_recipes(self.write_file('catalog.csv', CSV_CATALOG))
+
+        jollof, pancakes = Recipe.objects.filter(user=self.user).order_by('id')
+        self.assertEqual((jollof.title, jollof.time_minutes, jollof.price,
+                          jollof.currency, jollof.link),
+                         ('Jollof rice', 45, Decimal('12.50'), 'NGN', ''))
+        self.assertEqual(pancakes.title, 'Pancakes, fluffy')
+        self.assertEqual(pancakes.link, 'http://x.io')
+        self.assertEqual(
+            sorted(jollof.tags.values_list('name', flat=True)),
+            ['Dinner', 'Spicy']
+        )
+        self.assertIn(dinner, jollof.tags.all())
+        self.assertEqual(
+            sorted(pancakes.tags.values_list('name', flat=True)),
+            ['Breakfast', 'Spicy']
+        )
+        self.assertFalse(pancakes.ingredients.exists())
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 2)
+        for model in counted_models():
+            self.assertFalse(count_mismatches(model).exists())
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.recipe_count, 2)
+
+    def test_import_ndjson_in_chunks(self):
+        """
+        Test NDJSON records, with names as strings or objects, loaded a
+        chunk at a time with progress reported
+        """
+        lines = [json.dumps({'title': f'Soup {i}', 'time_minutes': i,
+                             'price': '1.25', 'currency': 'USD',
+                             'tags': [{'id': 99, 'name': 'Soup'}],
+                             'ingredients': ['Water']})
+                 for i in range(5)]
+        path = self.write_file('catalog.ndjson', '\n'.join(lines) + '\n\n')
+
+        out = self.import_recipes(path, '--chunk-size', '2')
+
+        self.assertIn('4 recipes imported', out)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 5)
+        soup = Tag.objects.get(user=self.user)
+        self.assertEqual(soup.recipe_count, 5)
+        self.assertFalse(RecipeImport.objects.exists())
+
+    def test_resume_after_invalid_record(self):
+        """
+        Test an invalid record stops the import after the committed
+        chunks, and --resume carries on from there once it is fixed
+        """
+        records = [
+            f'Stew {i},{i},2.00,NGN,Hot' for i in range(3)
+        ]
+        header = 'title,time_minutes,price,currency,tags\n'
+        path = self.write_file(
+            'catalog.csv', header + '\n'.join(records + ['Bad,x,1,USD,'])
+        )
+
+        with self.assertRaisesMessage(CommandError, 'line 5: time_minutes'):
+            self.import_recipes(path, '--chunk-size', '2')
+        self.assertEqual(Recipe.objects.count(), 2)
+        self.assertEqual(RecipeImport.objects.get(user=self.user).records, 2)
+
+        self.write_file('catalog.csv',
+                        header + '\n'.join(records + ['Good,1,1,USD,Hot']))
+        self.import_recipes(path, '--chunk-size', '2', '--resume')
+
+        self.assertEqual(
+            list(Recipe.objects.order_by('id').values_list('title',
+                                                           flat=True)),
+            ['Stew 0', 'Stew 1', 'Stew 2', 'Good']
+        )
+        self.assertEqual(Tag.objects.get(user=self.user).recipe_count, 4)
+
+    def test_progress_committed_with_its_chunk(self):
+        """
+        Test a chunk that fails to load leaves the progress where the last
+        committed chunk put it, so resuming loads no recipe twice
+        """
+        header = 'title,time_minutes,price,currency\n'
+        path = self.write_file('catalog.csv', header + ''.join(
+            f'Stew {i},{i},2.00,NGN\n' for i in range(4)
+        ))
+
+        with patch('core.importing.update_search_vectors',
+                   side_effect=[None, RuntimeError('crash')]):
+            with self.assertRaises(RuntimeError):
+                self.import_recipes(path, '--chunk-size', '2')
+        self.assertEqual(Recipe.objects.count(), 2)
+        self.assertEqual(RecipeImport.objects.get(user=self.user).records, 2)
+
+        self.import_recipes(path, '--chunk-size', '2', '--resume')
+
+        self.assertEqual(
+            list(Recipe.objects.order_by('id').values_list('title',
+                                                           flat=True)),
+            [f'Stew {i}' for i in range(4)]
+        )
+        self.assertFalse(RecipeImport.objects.exists())
+
+    def test_unknown_user_or_format(self):
+        """
+        Test the command refuses a missing user or an unknown extension
+        """
+        path = self.write_file('catalog.csv', CSV_CATALOG)
+        with self.assertRaises(CommandError):
+            call_command('import_recipes', path, '--user', 'no@mail.com')
+        with self.assertRaises(CommandError):
+            self.import_recipes(self.write_file('catalog.txt', ''))
+
+    def test_parse_record(self):
+        """
+        Test records are validated like the recipe serializer does
+        """
+        record = parse_record(1, {'title': ' Suya ', 'time_minutes': '10',
+                                  'price': 3, 'currency': 'NGN',
+                                  'tags': 'Hot| |Grill'})
+        self.assertEqual((record.title, record.price, record.tags),
+                         ('Suya', Decimal('3.00'), ('Hot', 'Grill')))
+
+        for changes in ({'title': ''}, {'price': '1.005'},
+                        {'price': '10000'}, {'price': 'NaN'},
+                        {'time_minutes': 2 ** 31},
+                        {'currency': 'X' * 11}, {'tags': 5}):
+            data = dict({'title': 'Suya', 'time_minutes': 1, 'price': 1,
+                         'currency': 'NGN'}, **changes)
+            with self.assertRaises(RecordError):
+                parse_record(1, data)
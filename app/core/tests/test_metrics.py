@@ -0,0 +1,156 @@
+"""
+Test case for core.metrics and core.middleware
+"""
+import asyncio
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import metrics
+from core.middleware import UNRESOLVED_ROUTE, RequestMetricsMiddleware
+from core.models import Recipe, Tag
+
+RECIPES_URL = reverse('recipe:recipe-list')
+METRICS_URL = reverse('metrics')
+
+
+def metrics_settings(**changes):
+    """
+    Return override_settings for some METRICS keys
+    """
+    return override_settings(METRICS=dict(settings.METRICS, **changes))
+
+
+class RequestMetricsTests(TestCase):
+    """
+    Test recording per route request metrics
+    """
+
+    def setUp(self) -> None:
+        """
+        create a user for testing the private API resource
+        """
+        self.user = get_user_model().objects.create_user(
+            'mail@mail.com',
+            'password1'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        metrics.registry.reset()
+
+    def test_requests_recorded_per_route(self):
+        """
+        Test requests are grouped by URL name, not by path
+        """
+        recipe = Recipe.objects.create(user=self.user, title='Soup',
+                                       time_minutes=5, price=1)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        self.client.get(RECIPES_URL)
+        self.client.get(reverse('recipe:recipe-detail', args=[recipe.id]))
+        self.client.get(reverse('recipe:recipe-detail', args=[recipe.id]))
+
+        listed = metrics.registry.snapshot('recipe:recipe-list')
+        detail = metrics.registry.snapshot('recipe:recipe-detail')
+        self.assertEqual(listed['request_duration_seconds'][0], 1)
+        self.assertEqual(detail['request_duration_seconds'][0], 2)
+        self.assertGreater(listed['db_queries'][1], 0)
+        self.assertGreater(listed['db_duration_seconds'][1], 0)
+        self.assertGreater(listed['serializer_duration_seconds'][1], 0)
+
+    def test_query_count_matches_queries_run(self):
+        """
+        Test the recorded query count is the number of queries executed
+        """
+        Tag.objects.create(user=self.user, name='Vegan')
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(reverse('recipe:tag-list'))
+
+        count, total = metrics.registry.snapshot('recipe:tag-list')[
+            'db_queries'
+        ]
+        self.assertEqual(count, 1)
+        self.assertGreater(total, 0)
+        self.assertEqual(total, len(captured.captured_queries))
+
+    def test_prometheus_endpoint(self):
+        """
+        Test the metrics endpoint renders recorded histograms
+        """
+        self.client.get(RECIPES_URL)
+        self.user.is_staff = True
+        self.user.save()
+        self.client.force_login(self.user)
+        res = self.client.get(METRICS_URL)
+
+        self.assertEqual(res.status_code, 200)
+        body = res.content.decode()
+        self.assertIn('# TYPE recipe_api_request_duration_seconds histogram',
+                      body)
+        self.assertIn('recipe_api_db_queries_count{route="recipe:recipe-list"}'
+                      ' 1', body)
+        self.assertIn('le="+Inf"', body)
+
+    @metrics_settings(SERVER_TIMING=True)
+    def test_server_timing_header(self):
+        """
+        Test the Server-Timing header is added when enabled
+        """
+        res = self.client.get(RECIPES_URL)
+
+        self.assertIn('db;desc=', res['Server-Timing'])
+        self.assertIn('serializer;dur=', res['Server-Timing'])
+        self.assertIn('total;dur=', res['Server-Timing'])
+
+    @metrics_settings(ENABLED=False, SERVER_TIMING=True)
+    def test_disabled(self):
+        """
+        Test nothing is recorded or exposed when metrics are disabled
+        """
+        res = self.client.get(RECIPES_URL)
+
+        self.assertNotIn('Server-Timing', res)
+        self.assertEqual(metrics.registry.snapshot('recipe:recipe-list'), {})
+        self.assertEqual(self.client.get(METRICS_URL).status_code, 404)
+
+    @metrics_settings(TOKEN='scrape-secret')
+    def test_prometheus_endpoint_access(self):
+        """
+        Test the metrics endpoint is refused to anonymous and non staff
+        users and served to scrapers with the token
+        """
+        self.assertEqual(APIClient().get(METRICS_URL).status_code, 403)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(METRICS_URL).status_code, 403)
+        self.assertEqual(APIClient().get(
+            METRICS_URL, HTTP_AUTHORIZATION='Bearer wrong'
+        ).status_code, 403)
+
+        res = APIClient().get(METRICS_URL,
+                              HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(res.status_code, 200)
+
+    @metrics_settings(SERVER_TIMING=True)
+    def test_async_requests(self):
+        """
+        Test the middleware stays async in front of an async handler and
+        records its requests
+        """
+        async def get_response(request):
+            return HttpResponse()
+
+        middleware = RequestMetricsMiddleware(get_response)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+
+        res = async_to_sync(middleware)(RequestFactory().get('/'))
+
+        self.assertIn('total;dur=', res['Server-Timing'])
+        self.assertEqual(metrics.registry.snapshot(UNRESOLVED_ROUTE)[
+            'request_duration_seconds'
+        ][0], 1)
@@ -0,0 +1,56 @@
+"""
+Test case for the data migrations
+"""
+from importlib import import_module
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+
+from core.models import Recipe, Tag
+
+merge_attr_names = import_module(
+    'core.migrations.0011_merge_duplicate_attr_names'
+)
+unique_attr_names = import_module('core.migrations.0012_unique_attr_names')
+
+
+class MergeDuplicateNamesTests(TestCase):
+    """
+    Test merging the tags and ingredients named alike before the unique
+    indexes are created
+    """
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'mail@mail.com',
+            'password1'
+        )
+        # the test rolls back, the indexes included
+        with connection.cursor() as cursor:
+            for _table, name in unique_attr_names.UNIQUE_INDEXES:
+                cursor.execute(f'DROP INDEX {name}')
+
+    def test_duplicates_merged_into_oldest(self):
+        """
+        Test recipes are moved to the oldest tag of a name and the others
+        deleted, without linking a recipe twice
+        """
+        kept = Tag.objects.create(user=self.user, name='Vegan')
+        duplicate = Tag.objects.create(user=self.user, name='VEGAN')
+        other = Tag.objects.create(user=self.user, name='Dessert')
+        recipes = [Recipe.objects.create(user=self.user, title=title,
+                                         time_minutes=5, price=5.00,
+                                         currency='USD')
+                   for title in ('Salad', 'Soup')]
+        recipes[0].tags.add(kept, duplicate)
+        recipes[1].tags.add(duplicate, other)
+
+        merge_attr_names.merge_duplicates(apps, None)
+
+        self.assertFalse(Tag.objects.filter(pk=duplicate.pk).exists())
+        self.assertEqual(list(recipes[0].tags.all()), [kept])
+        self.assertEqual(list(recipes[1].tags.order_by('id')), [kept, other])
+        kept.refresh_from_db()
+        self.assertEqual(kept.recipe_count, 2)
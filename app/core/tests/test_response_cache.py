@@ -0,0 +1,99 @@
+"""
+Test case for core.response_cache
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import response_cache
+from core.models import Recipe, Tag
+
+TAGS_URL = reverse('recipe:tag-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class ResponseCacheTests(TestCase):
+    """
+    Test caching list responses per user
+    """
+
+    def setUp(self) -> None:
+        """
+        create a user for testing the private API resource
+        """
+        self.user = get_user_model().objects.create_user(
+            'mail@mail.com',
+            'password1'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        response_cache.stats.reset()
+
+    def test_second_list_served_from_cache(self):
+        """
+        Test a repeated list request hits the cache without any query
+        """
+        Tag.objects.create(user=self.user, name='Vegan')
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(TAGS_URL)
+        self.assertEqual(cached['X-Cache'], 'HIT')
+        self.assertEqual(cached.data, res.data)
+        self.assertEqual(response_cache.stats.snapshot(),
+                         {'hits': 1, 'misses': 1})
+
+    def test_query_string_is_part_of_the_key(self):
+        """
+        Test different query strings are cached separately
+        """
+        self.client.get(TAGS_URL)
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+
+    def test_api_write_invalidates(self):
+        """
+        Test creating through the API invalidates the cached list
+        """
+        self.client.get(TAGS_URL)
+        self.client.post(TAGS_URL, {'name': 'Vegan'})
+
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_orm_write_invalidates(self):
+        """
+        Test changes made outside the API invalidate through signals
+        """
+        recipe = Recipe.objects.create(user=self.user, title='Salad',
+                                       time_minutes=5, price=5.00,
+                                       currency='USD')
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(RECIPES_URL)
+
+        recipe.tags.add(tag)
+        res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['results'][0]['tags'], [tag.id])
+
+    def test_cache_is_per_user(self):
+        """
+        Test one user's cached list is never served to another
+        """
+        Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+
+        user2 = get_user_model().objects.create_user(
+            'other@mail.com',
+            'password2'
+        )
+        self.client.force_authenticate(user2)
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['results'], [])
@@ -0,0 +1,104 @@
+"""
+Test case for core.routers
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'], REPLICA_STICKINESS=60)
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Test reads are sent to the replica alias and writes to the primary,
+    replica_1 mirrors the test database so committed rows are visible on
+    both
+    """
+    databases = {'default', 'replica_1'}
+
+    def setUp(self) -> None:
+        """
+        create a user for testing the private API resource
+        """
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'mail@mail.com',
+            'password1'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def request(self, method, url, data=None):
+        """
+        Make a request, returning it with the queries each alias ran
+        """
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections['replica_1']) as replica:
+            res = getattr(self.client, method)(url, data)
+            if hasattr(res, 'streaming_content'):
+                b''.join(res.streaming_content)
+        return res, len(primary), len(replica)
+
+    def test_reads_use_replica(self):
+        """
+        Test list, detail and export reads are served by the replica
+        """
+        recipe = Recipe.objects.create(user=self.user, title='Soup',
+                                       time_minutes=5, price=1)
+        detail = reverse('recipe:recipe-detail', args=[recipe.id])
+
+        for url in (RECIPES_URL, detail, TAGS_URL, INGREDIENTS_URL,
+                    EXPORT_URL):
+            res, primary, replica = self.request('get', url)
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(primary, 0, url)
+            self.assertGreater(replica, 0, url)
+
+    def test_writes_pin_user_to_primary(self):
+        """
+        Test a user's reads after their own write go to the primary
+        """
+        res, primary, replica = self.request('post', TAGS_URL,
+                                             {'name': 'Vegan'})
+        self.assertEqual(res.status_code, 201)
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+        res, primary, replica = self.request('get', TAGS_URL)
+        self.assertEqual(res.data['results'][0]['name'], 'Vegan')
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_pin_is_per_user(self):
+        """
+        Test one user's write does not pin other users
+        """
+        self.request('post', TAGS_URL, {'name': 'Vegan'})
+        other = get_user_model().objects.create_user('other@mail.com',
+                                                     'password1')
+        self.client.force_authenticate(other)
+
+        _res, primary, replica = self.request('get', TAGS_URL)
+
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_configured(self):
+        """
+        Test everything stays on the primary without replicas
+        """
+        _res, primary, replica = self.request('get', RECIPES_URL)
+
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
@@ -0,0 +1,196 @@
+"""
+Test case for core.tasks and the run_tasks command
+"""
+from datetime import timedelta
+from io import StringIO
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from core.models import Task
+from core.tasks import (claim_tasks, retry_delay, run_pending, run_task,
+                        task)
+
+CALLS = []
+
+
+@task
+def record(*args, **kwargs):
+    """
+    Remember the call
+    """
+    CALLS.append((args, kwargs))
+
+
+@task
+def create_user_then_fail(email):
+    """
+    Write to the database, then fail
+    """
+    get_user_model().objects.create_user(email, 'password1')
+    raise ValueError('boom')
+
+
+def task_settings(**changes):
+    """
+    Return override_settings for some TASKS keys
+    """
+    return override_settings(TASKS=dict(settings.TASKS, **changes))
+
+
+class TaskQueueTests(TestCase):
+    """
+    Test queueing, running and retrying tasks
+    """
+
+    def setUp(self) -> None:
+        CALLS.clear()
+
+    def test_delay_queues_the_call(self):
+        """
+        Test delay() stores the call for a worker instead of running it
+        """
+        queued = record.delay(1, 'two', three=[3])
+
+        self.assertEqual(CALLS, [])
+        queued.refresh_from_db()
+        self.assertEqual(queued.name, 'core.tests.test_tasks.record')
+        self.assertEqual((queued.args, queued.kwargs),
+                         ([1, 'two'], {'three': [3]}))
+        self.assertEqual(queued.status, Task.QUEUED)
+
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(CALLS, [((1, 'two'), {'three': [3]})])
+        self.assertFalse(Task.objects.exists())
+
+    @task_settings(EAGER=True)
+    def test_eager_mode(self):
+        """
+        Test eager mode runs the call at once, with JSON arguments
+        """
+        self.assertIsNone(record.delay((1, 2), key='value'))
+
+        self.assertEqual(CALLS, [(([1, 2],), {'key': 'value'})])
+        self.assertFalse(Task.objects.exists())
+
+    def test_failed_task_is_retried_with_backoff(self):
+        """
+        Test a failure rolls the task's writes back and queues a retry
+        after the backoff, until the last attempt marks it failed
+        """
+        queued = create_user_then_fail.delay('mail@mail.com')
+
+        with task_settings(MAX_ATTEMPTS=2, RETRY_BACKOFF=30):
+            before = timezone.now()
+            self.assertEqual(run_pending(), 1)
+            queued.refresh_from_db()
+            self.assertEqual((queued.status, queued.attempts),
+                             (Task.QUEUED, 1))
+            self.assertIn('ValueError: boom', queued.last_error)
+            self.assertGreaterEqual(queued.run_at,
+                                    before + timedelta(seconds=30))
+            self.assertFalse(get_user_model().objects.exists())
+
+            self.assertEqual(run_pending(), 0)
+            Task.objects.update(run_at=timezone.now())
+            run_pending()
+
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Task.FAILED, 2))
+        self.assertEqual(run_pending(), 0)
+
+    def test_retry_delay_doubles_up_to_max(self):
+        """
+        Test the backoff doubles per attempt and is capped
+        """
+        with task_settings(RETRY_BACKOFF=2, MAX_BACKOFF=10):
+            self.assertEqual([retry_delay(n).total_seconds()
+                              for n in range(1, 5)], [2, 4, 8, 10])
+
+    def test_claim_leases_due_tasks(self):
+        """
+        Test claiming takes due tasks oldest first, leases them, and takes
+        a running task again once its lease has expired
+        """
+        now = timezone.now()
+        late = Task.objects.create(name='x', run_at=now - timedelta(hours=1))
+        due = Task.objects.create(name='x', run_at=now)
+        Task.objects.create(name='x', run_at=now + timedelta(hours=1))
+
+        claimed = claim_tasks(5)
+
+        self.assertEqual([t.pk for t in claimed], [late.pk, due.pk])
+        self.assertEqual(claim_tasks(5), [])
+        due.refresh_from_db()
+        self.assertEqual((due.status, due.attempts), (Task.RUNNING, 1))
+        self.assertGreater(due.run_at, now)
+
+        Task.objects.filter(pk=due.pk).update(run_at=now)
+        self.assertEqual([t.pk for t in claim_tasks(5)], [due.pk])
+
+    def test_only_registered_tasks_run(self):
+        """
+        Test a row naming a function that is not a task is not called
+        """
+        Task.objects.create(name='os.getcwd')
+        claimed = claim_tasks(1)[0]
+
+        self.assertFalse(run_task(claimed))
+        claimed.refresh_from_db()
+        self.assertIn('is not a task', claimed.last_error)
+
+
+class RunTasksCommandTests(TestCase):
+    """
+    Test the worker command on the main thread
+    """
+
+    def setUp(self) -> None:
+        CALLS.clear()
+
+    def test_burst_runs_every_due_task(self):
+        """
+        Test a burst worker runs the queue dry and exits
+        """
+        for i in range(3):
+            record.delay(i)
+        create_user_then_fail.delay('mail@mail.com')
+
+        out = StringIO()
+        call_command('run_tasks', '--burst', '--threads', '1', stdout=out)
+
+        self.assertIn('Ran 4 tasks, 1 failed', out.getvalue())
+        self.assertEqual(CALLS, [((i,), {}) for i in range(3)])
+        self.assertEqual(Task.objects.get().status, Task.QUEUED)
+
+
+@skipUnless(connection.features.has_select_for_update_skip_locked,
+            'the database cannot skip locked rows')
+class RunTasksThreadsTests(TransactionTestCase):
+    """
+    Test the worker command's thread pool, whose threads use their own
+    connections
+    """
+
+    def setUp(self) -> None:
+        CALLS.clear()
+
+    def test_burst_on_threads(self):
+        """
+        Test tasks claimed by the main thread all run on the pool
+        """
+        for i in range(10):
+            record.delay(i)
+
+        out = StringIO()
+        call_command('run_tasks', '--burst', '--threads', '3', stdout=out)
+
+        self.assertIn('Ran 10 tasks, 0 failed', out.getvalue())
+        self.assertEqual(sorted(args for args, _kwargs in CALLS),
+                         [(i,) for i in range(10)])
+        self.assertFalse(Task.objects.exists())
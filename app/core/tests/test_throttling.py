@@ -0,0 +1,220 @@
+"""
+Test case for core.throttling
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core.throttling import (CacheWindowStore, LocalWindowStore,
+                             get_throttle_store)
+
+TOKEN_URL = reverse('user:token')
+CREATE_USER_URL = reverse('user:create')
+TAGS_URL = reverse('recipe:tag-list')
+
+THROTTLE = {
+    'RATES': {
+        'token': {'ip': '5/min', 'user': '2/min'},
+        'signup': {'ip': '1/hour'},
+        'recipe_write': {'user': '2/min'},
+    },
+    'MAX_KEYS': 100,
+    'SHARED_CACHE': None,
+}
+
+
+class WindowStoreTests(SimpleTestCase):
+    """
+    Test the sliding window counters
+    """
+
+    def test_limit_within_window(self):
+        """
+        Test requests over the limit are rejected until the window slides
+        """
+        store = LocalWindowStore()
+        self.assertEqual(store.hit('k', 2, 60, now=600), 0)
+        self.assertEqual(store.hit('k', 2, 60, now=610), 0)
+
+        self.assertEqual(store.hit('k', 2, 60, now=620), 40)
+        self.assertEqual(store.hit('other', 2, 60, now=620), 0)
+
+    def test_previous_window_is_weighted(self):
+        """
+        Test the previous window counts in proportion to its overlap
+        """
+        store = LocalWindowStore()
+        for _ in range(4):
+            store.hit('k', 4, 60, now=630)
+
+        # 3/4 of the previous window still overlaps: 4 * 0.75 = 3 < 4
+        self.assertEqual(store.hit('k', 4, 60, now=675), 0)
+        # 3 + 1 is at the limit until the overlap falls below 3/4
+        self.assertGreater(store.hit('k', 4, 60, now=675), 0)
+        self.assertEqual(store.hit('k', 4, 60, now=676), 0)
+        self.assertAlmostEqual(store.hit('k', 4, 60, now=680), 10)
+
+    def test_expired_keys_are_dropped(self):
+        """
+        Test idle keys and keys over max_keys are evicted
+        """
+        store = LocalWindowStore(max_keys=2)
+        store.hit('a', 1, 60, now=0)
+        store.hit('b', 1, 60, now=0)
+        store.hit('c', 1, 60, now=0)
+        self.assertEqual(list(store._entries), ['b', 'c'])
+
+        store.hit('d', 1, 60, now=500)
+        self.assertEqual(list(store._entries), ['d'])
+
+    def test_cache_store(self):
+        """
+        Test the shared store enforces the same limits
+        """
+        caches['default'].clear()
+        store = CacheWindowStore('default')
+        self.assertEqual(store.hit('k', 2, 60, now=600), 0)
+        self.assertEqual(store.hit('k', 2, 60, now=610), 0)
+
+        self.assertEqual(store.hit('k', 2, 60, now=620), 40)
+        self.assertEqual(store.hit('k', 2, 60, now=720), 0)
+
+    def test_hit_all_counts_every_key_or_none(self):
+        """
+        Test a request over one key's limit is not counted under the others
+        """
+        caches['default'].clear()
+        for store in (LocalWindowStore(), CacheWindowStore('default')):
+            self.assertEqual(store.hit('user', 1, 60, now=600), 0)
+            limits = [('ip', 2, 60), ('user', 1, 60)]
+            self.assertEqual(store.hit_all(limits, now=601), 59)
+            self.assertEqual(store.hit_all(limits, now=602), 58)
+
+            self.assertEqual(store.hit('ip', 2, 60, now=603), 0)
+            self.assertEqual(store.hit('ip', 2, 60, now=604), 0)
+            self.assertEqual(store.hit('ip', 2, 60, now=605), 55)
+
+
+@override_settings(THROTTLE=THROTTLE)
+class ThrottledViewsTests(TestCase):
+    """
+    Test throttling the user and recipe endpoints
+    """
+
+    def setUp(self) -> None:
+        """
+        start every test with empty counters and a clock that stands
+        still, so no test straddles a window boundary
+        """
+        self.client = APIClient()
+        get_throttle_store().clear()
+        clock = patch('core.throttling.time')
+        clock.start().time.return_value = 600.0
+        self.addCleanup(clock.stop)
+
+    def tearDown(self) -> None:
+        """
+        leave no counters behind for other tests
+        """
+        get_throttle_store().clear()
+
+    def test_token_throttled_per_account(self):
+        """
+        Test failed logins for one account are limited, others are not
+        """
+        payload = {'email': 'Mail@mail.com', 'password': 'wrong'}
+        for _ in range(2):
+            res = self.client.post(TOKEN_URL, payload)
+            self.assertEqual(res.status_code, 400)
+
+        res = self.client.post(TOKEN_URL, {**payload,
+                                           'email': 'mail@MAIL.com '})
+        self.assertEqual(res.status_code, 429)
+        self.assertIn('Retry-After', res)
+
+        res = self.client.post(TOKEN_URL, {**payload,
+                                           'email': 'other@mail.com'})
+        self.assertEqual(res.status_code, 400)
+
+    def test_token_body_not_an_object(self):
+        """
+        Test a login whose JSON body is not an object is rejected as
+        invalid and still counted against the IP
+        """
+        for body in ([], ['mail@mail.com'], 'mail@mail.com', 1, True):
+            res = self.client.post(TOKEN_URL, body, format='json')
+            self.assertEqual(res.status_code, 400)
+
+        res = self.client.post(TOKEN_URL, [], format='json')
+        self.assertEqual(res.status_code, 429)
+
+    def test_rejected_requests_not_counted(self):
+        """
+        Test logins rejected by the account limit use up none of the IP's
+        """
+        payload = {'email': 'mail@mail.com', 'password': 'wrong'}
+        for status_code in (400, 400, 429, 429, 429):
+            res = self.client.post(TOKEN_URL, payload)
+            self.assertEqual(res.status_code, status_code)
+
+        for index in range(3):
+            res = self.client.post(TOKEN_URL, {'email': f'{index}@mail.com',
+                                               'password': 'wrong'})
+            self.assertEqual(res.status_code, 400)
+        res = self.client.post(TOKEN_URL, {'email': 'new@mail.com',
+                                           'password': 'wrong'})
+        self.assertEqual(res.status_code, 429)
+
+    def test_store_reset_by_new_settings(self):
+        """
+        Test overriding THROTTLE starts a store built from it
+        """
+        store = get_throttle_store()
+        with override_settings(THROTTLE=dict(THROTTLE,
+                                             SHARED_CACHE='default')):
+            self.assertIsInstance(get_throttle_store(), CacheWindowStore)
+        self.assertIsNot(get_throttle_store(), store)
+
+    def test_token_throttled_per_ip(self):
+        """
+        Test an IP trying many accounts is limited
+        """
+        for index in range(5):
+            self.client.post(TOKEN_URL, {'email': f'{index}@mail.com',
+                                         'password': 'wrong'})
+
+        res = self.client.post(TOKEN_URL, {'email': 'new@mail.com',
+                                           'password': 'wrong'})
+        self.assertEqual(res.status_code, 429)
+
+    def test_signup_throttled_per_ip(self):
+        """
+        Test account creation is limited per IP
+        """
+        payload = {'email': 'a@mail.com', 'password': 'password1',
+                   'name': 'Don Joe'}
+        res = self.client.post(CREATE_USER_URL, payload)
+        self.assertEqual(res.status_code, 201)
+
+        res = self.client.post(CREATE_USER_URL, {**payload,
+                                                 'email': 'b@mail.com'})
+        self.assertEqual(res.status_code, 429)
+
+    def test_recipe_writes_throttled_reads_not(self):
+        """
+        Test writes are limited per user while reads are not
+        """
+        user = get_user_model().objects.create_user('mail@mail.com',
+                                                    'password1')
+        self.client.force_authenticate(user)
+        for name in ('Vegan', 'Dessert'):
+            res = self.client.post(TAGS_URL, {'name': name})
+            self.assertEqual(res.status_code, 201)
+
+        res = self.client.post(TAGS_URL, {'name': 'Meat'})
+        self.assertEqual(res.status_code, 429)
+        self.assertEqual(self.client.get(TAGS_URL).status_code, 200)
@@ -0,0 +1,114 @@
+"""
+Test case for core.values and core.renderers
+"""
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase
+from rest_framework.renderers import JSONRenderer
+
+from core import renderers
+from core.models import Ingredient, Recipe, Tag
+from core.renderers import FastJSONRenderer
+from recipe.serializers import (RecipeDetailSerializer, RecipeSerializer,
+                                TagSerializer)
+
+
+class ValuesSerializerTests(TestCase):
+    """
+    Test the .values() path renders exactly like .data
+    """
+
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            'mail@mail.com',
+            'password1'
+        )
+        tags = [Tag.objects.create(user=self.user, name=name)
+                for name in ('Vegan', 'Line\u2028separator', 'Épicé')]
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Soup "quoted"\n', time_minutes=5,
+            price=Decimal('5'), currency='USD', image='recipes/ab/ab.png'
+        )
+        self.recipe.tags.add(*reversed(tags))
+        self.recipe.ingredients.add(ingredient)
+        Recipe.objects.create(user=self.user, title='Plain', time_minutes=1,
+                              price=Decimal('12.5'), currency='NGN')
+        self.queryset = Recipe.objects.order_by('id')
+
+    def assert_identical(self, serializer_class, queryset, context=None):
+        """
+        Check both paths give the same data and the same JSON bytes
+        """
+        context = context or {}
+        expected = serializer_class(queryset, many=True,
+                                    context=context).data
+        data = serializer_class(context=context).values_data(queryset)
+
+        self.assertEqual(data, expected)
+        self.assertEqual(FastJSONRenderer().render(data),
+                         JSONRenderer().render(expected))
+
+    def test_recipe_list(self):
+        """
+        Test relations as ids and prices formatted like DecimalField
+        """
+        self.assert_identical(RecipeSerializer, self.queryset)
+        data = RecipeSerializer().values_data(self.queryset)
+        self.assertEqual([r['price'] for r in data], ['5.00', '12.50'])
+
+    def test_recipe_detail(self):
+        """
+        Test nested relations and file URLs, absolute with a request
+        """
+        request = RequestFactory().get('/')
+        self.assert_identical(RecipeDetailSerializer, self.queryset)
+        self.assert_identical(RecipeDetailSerializer, self.queryset,
+                              {'request': request})
+
+    def test_tags(self):
+        """
+        Test flat serializers
+        """
+        self.assert_identical(TagSerializer, Tag.objects.order_by('id'))
+
+    def test_relations_read_in_one_query_each(self):
+        """
+        Test the number of queries does not grow with the rows
+        """
+        with self.assertNumQueries(3):
+            RecipeDetailSerializer().values_data(self.queryset)
+
+
+class FastJSONRendererTests(TestCase):
+    """
+    Test the orjson renderer matches JSONRenderer
+    """
+
+    def test_falls_back_when_orjson_refuses(self):
+        """
+        Test values orjson cannot encode still render like JSONRenderer
+        """
+        data = {'big': 2 ** 70, 'price': Decimal('1.5'), 'list': (1, 2)}
+        self.assertEqual(FastJSONRenderer().render(data),
+                         JSONRenderer().render(data))
+
+    def test_without_orjson(self):
+        """
+        Test the standard library is used when orjson is not installed
+        """
+        data = {'name': 'Line\u2028separator'}
+        with patch.object(renderers, 'orjson', None):
+            self.assertEqual(FastJSONRenderer().render(data),
+                             JSONRenderer().render(data))
+
+    def test_indented_output(self):
+        """
+        Test an indent requested in the media type is honoured
+        """
+        data = {'name': 'Vegan', 'ids': [1, 2]}
+        media_type = 'application/json; indent=2'
+        self.assertEqual(FastJSONRenderer().render(data, media_type),
+                         JSONRenderer().render(data, media_type))
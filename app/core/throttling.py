@@ -0,0 +1,308 @@
+"""
+Sliding window rate limiting
+
+Each key keeps the request counts of the current and the previous fixed
+window, and the previous count is weighted by how much of it still
+overlaps the sliding window. That approximates a true sliding log in O(1)
+time and memory per key; DRF's own SimpleRateThrottle keeps one timestamp
+per request instead.
+
+Rejected requests are not counted, under any of the keys they were
+checked against, so an exhausted key costs one lookup and stays rejected
+only until the window slides past its earlier requests.
+"""
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import List, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+SHARED_KEY_PREFIX = 'throttle'
+
+
+def parse_rate(rate: str) -> Tuple[int, int]:
+    """
+    Turn a rate such as '10/min' into (requests, window seconds)
+    """
+    requests, period = rate.split('/')
+    return int(requests), PERIODS[period[0]]
+
+
+def check_window(previous: int, current: int, elapsed: float, limit: int,
+                 window: int) -> float:
+    """
+    Return 0 when one more request fits in the sliding window, otherwise
+    the seconds until it will
+
+    Args:
+        previous: requests counted in the previous fixed window
+        current: requests counted in the current fixed window
+        elapsed: seconds since the current fixed window started
+        limit: requests allowed per window
+        window: window length in seconds
+    """
+    if previous * (window - elapsed) / window + current < limit:
+        return 0
+    if current >= limit or not previous:
+        return window - elapsed
+    # the previous window's weight falls below the room that is left, a
+    # request right on that boundary is still rejected
+    return max(window * (1 - (limit - current) / previous) - elapsed,
+               0.001)
+
+
+class LocalWindowStore:
+    """
+    In-process counters, each worker process limits on its own
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, limit: int, window: int,
+            now: float = None) -> float:
+        """
+        Count a request against a key unless it is over the limit
+
+        Returns:
+            0 if the request is allowed, else seconds until one would be
+        """
+        return self.hit_all([(key, limit, window)], now)
+
+    def hit_all(self, limits: List[Tuple[str, int, int]],
+                now: float = None) -> float:
+        """
+        Count a request against every (key, limit, window) if none of the
+        keys is over its limit, otherwise against none
+
+        Returns:
+            0 if the request is allowed, else seconds until one would be
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            wait = 0
+            counts = []
+            for key, limit, window in limits:
+                index, elapsed = divmod(now, window)
+                entry = self._entries.get(key)
+                if entry is None or entry[0] < index - 1:
+                    previous, current = 0, 0
+                elif entry[0] < index:
+                    previous, current = entry[2], 0
+                else:
+                    previous, current = entry[1], entry[2]
+                wait = max(wait, check_window(previous, current, elapsed,
+                                              limit, window))
+                counts.append((key, window, index, previous, current))
+            if wait:
+                return wait
+
+            for key, window, index, previous, current in counts:
+                self._entries[key] = (index, previous, current + 1,
+                                      (index + 2) * window)
+                self._entries.move_to_end(key)
+            self._expire(now)
+            return 0
+
+    def clear(self):
+        """
+        Forget every counter
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def _expire(self, now: float):
+        """
+        Drop the least recently used keys that have expired or overflow
+        max_keys, the lock must be held
+        """
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry[3] > now and len(self._entries) <= self.max_keys:
+                return
+            del self._entries[key]
+
+
+class CacheWindowStore:
+    """
+    Counters kept in a shared cache so every process enforces one limit
+    """
+
+    def __init__(self, alias: str):
+        self.alias = alias
+
+    def hit(self, key: str, limit: int, window: int,
+            now: float = None) -> float:
+        """
+        Count a request against a key unless it is over the limit
+
+        Returns:
+            0 if the request is allowed, else seconds until one would be
+        """
+        return self.hit_all([(key, limit, window)], now)
+
+    def hit_all(self, limits: List[Tuple[str, int, int]],
+                now: float = None) -> float:
+        """
+        Count a request against every (key, limit, window) if none of the
+        keys is over its limit, otherwise against none
+
+        Returns:
+            0 if the request is allowed, else seconds until one would be
+        """
+        now = time.time() if now is None else now
+        windows = []
+        for key, limit, window in limits:
+            index, elapsed = divmod(now, window)
+            windows.append((f'{SHARED_KEY_PREFIX}:{key}:{int(index)}',
+                            f'{SHARED_KEY_PREFIX}:{key}:{int(index) - 1}',
+                            elapsed, limit, window))
+        cache = caches[self.alias]
+        counts = cache.get_many([name for current_key, previous_key, *_rest
+                                 in windows
+                                 for name in (current_key, previous_key)])
+
+        wait = 0
+        for current_key, previous_key, elapsed, limit, window in windows:
+            wait = max(wait, check_window(counts.get(previous_key, 0),
+                                          counts.get(current_key, 0),
+                                          elapsed, limit, window))
+        if wait:
+            return wait
+
+        for current_key, _previous_key, _elapsed, _limit, window in windows:
+            if not cache.add(current_key, 1, timeout=window * 2):
+                try:
+                    cache.incr(current_key)
+                except ValueError:
+                    cache.set(current_key, 1, timeout=window * 2)
+        return 0
+
+    def clear(self):
+        """
+        Shared counters simply expire
+        """
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_throttle_store():
+    """
+    Return the process wide counter store, configured from
+    settings.THROTTLE
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                alias = settings.THROTTLE.get('SHARED_CACHE')
+                _store = (CacheWindowStore(alias) if alias else
+                          LocalWindowStore(settings.THROTTLE['MAX_KEYS']))
+    return _store
+
+
+@receiver(setting_changed)
+def reset_throttle_store(setting, **kwargs):
+    """
+    Start a new store when settings.THROTTLE is overridden
+    """
+    global _store
+    if setting == 'THROTTLE':
+        with _store_lock:
+            _store = None
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    Limit requests per client IP and per user with the rates configured
+    for the throttle's scope in settings.THROTTLE['RATES']
+    """
+    scope = None
+    safe_methods_exempt = False
+
+    def get_user_ident(self, request):
+        """
+        Return what identifies the user a request acts as, or None
+        """
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return None
+
+    def allow_request(self, request, view):
+        """
+        Count the request against its IP and user only if both have room
+        left, so a request rejected by one limit costs nothing under the
+        other
+        """
+        self.wait_seconds = 0
+        if self.safe_methods_exempt and request.method in SAFE_METHODS:
+            return True
+
+        rates = settings.THROTTLE['RATES'].get(self.scope, {})
+        limits = []
+        for kind in ('ip', 'user'):
+            rate = rates.get(kind)
+            if rate is None:
+                continue
+            ident = (self.get_ident(request) if kind == 'ip' else
+                     self.get_user_ident(request))
+            if ident is None:
+                continue
+            limits.append((f'{self.scope}:{kind}:{ident}',
+                           *parse_rate(rate)))
+        if not limits:
+            return True
+        self.wait_seconds = get_throttle_store().hit_all(limits)
+        return not self.wait_seconds
+
+    def wait(self):
+        """
+        Seconds the client should wait, sent as Retry-After
+        """
+        return self.wait_seconds
+
+
+class TokenRateThrottle(SlidingWindowThrottle):
+    """
+    Throttle login attempts per IP and per account tried
+    """
+    scope = 'token'
+
+    def get_user_ident(self, request):
+        """
+        Logins are anonymous, limit by the email they try instead; a body
+        that is not an object is left to the IP limit
+        """
+        if not isinstance(request.data, Mapping):
+            return None
+        email = request.data.get('email')
+        if not isinstance(email, str):
+            return None
+        return email.strip().lower()
+
+
+class SignupRateThrottle(SlidingWindowThrottle):
+    """
+    Throttle account creation per IP
+    """
+    scope = 'signup'
+
+
+class RecipeWriteRateThrottle(SlidingWindowThrottle):
+    """
+    Throttle writes to recipes, tags and ingredients per user
+    """
+    scope = 'recipe_write'
+    safe_methods_exempt = True
@@ -0,0 +1,49 @@
+"""
+Operational endpoints
+"""
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views.static import serve
+
+from core import metrics
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def has_metrics_token(request) -> bool:
+    """
+    Return whether the request carries the configured metrics token
+    """
+    token = settings.METRICS['TOKEN']
+    scheme, _, credentials = request.META.get(
+        'HTTP_AUTHORIZATION', ''
+    ).partition(' ')
+    return bool(token and scheme.lower() == 'bearer'
+                and constant_time_compare(credentials, token))
+
+
+def metrics_view(request):
+    """
+    Expose the request metrics of this process in the Prometheus text
+    format, to staff users and to scrapers sending METRICS['TOKEN'] as a
+    bearer token
+    """
+    config = settings.METRICS
+    if not config['ENABLED']:
+        raise Http404()
+    if not (request.user.is_staff or has_metrics_token(request)):
+        raise PermissionDenied()
+    return HttpResponse(metrics.registry.render(),
+                        content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+def serve_immutable(request, path, document_root=None):
+    """
+    Serve a content addressed media file that may be cached forever, for
+    the development server; in production the web server does this
+    """
+    response = serve(request, path, document_root=document_root)
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
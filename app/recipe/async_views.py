@@ -0,0 +1,43 @@
+"""
+Async views for the read heavy recipe endpoints
+
+Each view awaits the regular DRF view on the bounded database pool from
+core.async_db, so authentication, caching, ETags, filtering, pagination
+and rendering behave exactly as on the sync endpoints while the event
+loop is free to hold thousands of idle client connections.
+"""
+import functools
+
+from core.async_db import run_in_db_pool
+from recipe import views
+
+
+def _render(view, request, *args, **kwargs):
+    """
+    Run a DRF view and render its response on the calling thread
+    """
+    response = view(request, *args, **kwargs)
+    if hasattr(response, 'render'):
+        response.render()
+    return response
+
+
+def async_read_view(view):
+    """
+    Wrap a sync DRF view in a coroutine that runs it on the database pool
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        return await run_in_db_pool(_render, view, request, *args, **kwargs)
+
+    return wrapper
+
+
+recipe_list = async_read_view(views.RecipeViewSet.as_view({'get': 'list'}))
+recipe_detail = async_read_view(
+    views.RecipeViewSet.as_view({'get': 'retrieve'})
+)
+tag_list = async_read_view(views.TagViewSet.as_view({'get': 'list'}))
+ingredient_list = async_read_view(
+    views.IngredientViewSet.as_view({'get': 'list'})
+)
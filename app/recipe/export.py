@@ -0,0 +1,95 @@
+"""
+Streaming export of a user's recipes
+"""
+import csv
+import tempfile
+
+from core.renderers import dumps
+from recipe.serializers import RecipeDetailSerializer
+
+CSV_HEADER = ('id', 'title', 'link', 'time_minutes', 'price', 'currency',
+              'tags', 'ingredients')
+CSV_LIST_SEPARATOR = '|'
+# bytes of a spooled export kept in memory before it moves to disk
+SPOOL_MAX_MEMORY = 1024 * 1024
+
+
+class Echo:
+    """
+    File-like object that returns what is written, so csv.writer output
+    can be yielded straight into the response
+    """
+
+    def write(self, value):
+        """
+        Return the written value instead of buffering it
+        """
+        return value
+
+
+def iter_recipe_chunks(queryset, chunk_size: int):
+    """
+    Read recipes through a server side cursor as .values() rows and yield
+    the representation of each chunk, tags and ingredients included
+    """
+    serializer = RecipeDetailSerializer()
+    chunk = []
+    rows = serializer.values_queryset(queryset).iterator(chunk_size=chunk_size)
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield serializer.rows_representation(chunk)
+            chunk = []
+    if chunk:
+        yield serializer.rows_representation(chunk)
+
+
+def iter_ndjson(queryset, chunk_size: int):
+    """
+    Yield one JSON document per recipe, newline delimited
+    """
+    for chunk in iter_recipe_chunks(queryset, chunk_size):
+        yield b''.join(dumps(recipe) + b'\n' for recipe in chunk)
+
+
+def iter_csv(queryset, chunk_size: int):
+    """
+    Yield CSV rows, tags and ingredients are joined by name
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for chunk in iter_recipe_chunks(queryset, chunk_size):
+        yield ''.join(writer.writerow(row) for row in (
+            (
+                recipe['id'], recipe['title'], recipe['link'],
+                recipe['time_minutes'], recipe['price'], recipe['currency'],
+                CSV_LIST_SEPARATOR.join(tag['name'] for tag in recipe['tags']),
+                CSV_LIST_SEPARATOR.join(
+                    ingredient['name'] for ingredient in recipe['ingredients']
+                ),
+            ) for recipe in chunk
+        ))
+
+
+def spool(content):
+    """
+    Write a whole export to a temporary file, in memory while it is
+    small, and return the file rewound. ASGI servers iterate streaming
+    content on the event loop, where the generators cannot query the
+    database, so there the export is produced by the view instead
+    """
+    file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    try:
+        for part in content:
+            file.write(part.encode() if isinstance(part, str) else part)
+    except BaseException:
+        file.close()
+        raise
+    file.seek(0)
+    return file
+
+
+EXPORT_FORMATS = {
+    'ndjson': (iter_ndjson, 'application/x-ndjson'),
+    'csv': (iter_csv, 'text/csv'),
+}
@@ -0,0 +1,37 @@
+"""
+Pagination classes for the recipe resources
+"""
+from rest_framework.pagination import CursorPagination
+
+
+class BaseRecipeCursorPagination(CursorPagination):
+    """
+    Keyset pagination shared by the recipe resources, so deep pages cost
+    the same index range scan as the first one
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class RecipeCursorPagination(BaseRecipeCursorPagination):
+    """
+    Cursor pagination for recipes, backed by the (user, id) index, or by
+    search rank when the queryset comes from a full-text search
+    """
+    ordering = '-id'
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Order search results by relevance first
+        """
+        if 'rank' in queryset.query.annotations:
+            return ('-rank', '-id')
+        return super().get_ordering(request, queryset, view)
+
+
+class RecipeAttrCursorPagination(BaseRecipeCursorPagination):
+    """
+    Cursor pagination for tags and ingredients, backed by the
+    (user, name, id) index
+    """
+    ordering = ('-name', '-id')
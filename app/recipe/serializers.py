@@ -1,20 +1,196 @@
 """
 Serializers for the recipe resources
 """
+from collections import Counter
+
+from django.conf import settings
+from django.db.models.functions import Lower
+from django.utils.text import capfirst
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 
-from core.models import Tag, Ingredient, Recipe
+from core.bulk import bulk_insert, name_key
+from core.counters import adjust_counts, rebuild_counts, related_counts
+from core.images import image_extension, schedule_thumbnail, store_image
+from core.metrics import TimedSerializerMixin
+from core.models import Tag, Ingredient, Recipe, User
+from core.search import recipe_ids_using, update_search_vectors
+from core.values import ValuesSerializerMixin
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    List serializer that validates a batch in one pass and writes it with
+    bulk queries.
+
+    To update, pass the queryset of objects the caller may change as the
+    instance; every item must then carry the `id` of the object it changes.
+    """
+
+    def to_internal_value(self, data):
+        """
+        Validate every item, then run the checks that need the whole batch
+        """
+        ret = super().to_internal_value(data)
+        if self.instance is not None:
+            for attrs, item in zip(ret, data):
+                attrs['id'] = item.get('id')
+
+        errors = self.validate_items(ret)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return ret
+
+    def validate_items(self, items):
+        """
+        Return a list with an error dict for each item, empty when valid
+        """
+        errors = [{} for _item in items]
+        if self.instance is None:
+            return errors
+
+        ids = [attrs['id'] for attrs in items]
+        found = set(self.instance.filter(
+            id__in=[pk for pk in ids if isinstance(pk, int)]
+        ).values_list('id', flat=True))
+        seen = set()
+        for error, pk in zip(errors, ids):
+            if pk not in found:
+                error['id'] = [_('Object does not exist.')]
+            elif pk in seen:
+                error['id'] = [_('Duplicate object in batch.')]
+            seen.add(pk)
+        return errors
+
+    def create(self, validated_data):
+        """
+        Create every object with a single bulk insert
+        """
+        model = self.child.Meta.model
+        return bulk_insert(model, [model(**attrs) for attrs in validated_data])
+
+    def update(self, instance, validated_data):
+        """
+        Update every object with a single bulk update
+        """
+        objs = instance.in_bulk([attrs['id'] for attrs in validated_data])
+        fields = set()
+        for attrs in validated_data:
+            obj = objs[attrs.pop('id')]
+            for attr, value in attrs.items():
+                setattr(obj, attr, value)
+                fields.add(attr)
+
+        objs = list(objs.values())
+        if fields:
+            self.child.Meta.model.objects.bulk_update(objs, fields)
+        return objs
+
+
+def name_taken_error(model):
+    """
+    Return the error for a name the user already has
+    """
+    return _('{model} with this name already exists.').format(
+        model=capfirst(model._meta.verbose_name)
+    )
+
+
+def names_taken(model, user, names, exclude_ids=()):
+    """
+    Return the keys of the given names the user already has, ignoring the
+    objects with the given ids
+    """
+    return set(model.objects.filter(user=user).annotate(
+        key=Lower('name')
+    ).filter(key__in=[name_key(name) for name in names]).exclude(
+        id__in=exclude_ids
+    ).values_list('key', flat=True))
+
+
+class RecipeAttrBulkListSerializer(BulkListSerializer):
+    """
+    Bulk writes for tags and ingredients
+    """
+
+    def validate_items(self, items):
+        """
+        Check no name is taken, by the user's other objects or by another
+        item of the batch, with one query for the whole batch
+        """
+        errors = super().validate_items(items)
+        model = self.child.Meta.model
+        named = [(error, attrs) for error, attrs in zip(errors, items)
+                 if 'name' in attrs]
+        # objects renamed by the batch give up their current name
+        taken = names_taken(
+            model, self.context['request'].user,
+            [attrs['name'] for _error, attrs in named],
+            exclude_ids=[attrs.get('id') for _error, attrs in named
+                         if isinstance(attrs.get('id'), int)]
+        )
+        for error, attrs in named:
+            key = name_key(attrs['name'])
+            if key in taken:
+                error['name'] = [name_taken_error(model)]
+            taken.add(key)
+        return errors
+
+    def update(self, instance, validated_data):
+        """
+        Update the objects, then reindex the recipes using them since
+        bulk updates send no signals
+        """
+        objs = super().update(instance, validated_data)
+        update_search_vectors(recipe_ids_using(
+            self.child.Meta.model, [obj.id for obj in objs]
+        ))
+        return objs
+
+
+class UniqueNameMixin:
+    """
+    Reject a name the user already has for another tag or ingredient,
+    ignoring case
+    """
+
+    def validate_name(self, name):
+        """
+        Check the name against the user's other objects
+        """
+        if self.parent is not None:
+            # batches are checked as a whole by RecipeAttrBulkListSerializer
+            return name
+        model = self.Meta.model
+        exclude_ids = [self.instance.pk] if self.instance is not None else []
+        if names_taken(model, self.context['request'].user, [name],
+                       exclude_ids):
+            raise serializers.ValidationError(name_taken_error(model))
+        return name
+
+
+class ResolveNamesSerializer(serializers.Serializer):
+    """
+    Serializer for a batch of tag or ingredient names to resolve
+    """
+    names = serializers.ListField(
+        child=serializers.CharField(max_length=255),
+        allow_empty=False,
+        max_length=settings.BULK_MAX_ITEMS,
+    )
 
 
 class BaseMetaForTagAndIngredients:
     """
     Base Meta for both tags and Ingredients
     """
-    fields = ('id', 'name')
-    read_only_fields = ('id',)
+    fields = ('id', 'name', 'recipe_count')
+    read_only_fields = ('id', 'recipe_count')
+    list_serializer_class = RecipeAttrBulkListSerializer
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, ValuesSerializerMixin,
+                    UniqueNameMixin, serializers.ModelSerializer):
     """
     Serializer for tag objects
     """
@@ -26,7 +202,8 @@ class TagSerializer(serializers.ModelSerializer):
         model = Tag
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, ValuesSerializerMixin,
+                           UniqueNameMixin, serializers.ModelSerializer):
     """
     Serializer for ingredients object
     """
@@ -38,10 +215,40 @@ class IngredientSerializer(serializers.ModelSerializer):
         model = Ingredient
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """
+    Limit a serializer to the field names in its `fields` context and
+    render the relations named in its `expand` context nested, as
+    RecipeViewSet sets them from the query parameters of reads
+    """
+    # relation name: serializer rendering it nested when expanded
+    expandable_fields = {}
+
+    def get_fields(self):
+        """
+        Swap in the expanded relations and drop the unwanted fields
+        """
+        fields = super().get_fields()
+        for name in self.context.get('expand', ()):
+            fields[name] = self.expandable_fields[name](many=True,
+                                                        read_only=True)
+        wanted = self.context.get('fields')
+        if wanted is not None:
+            for name in list(fields):
+                if name not in wanted:
+                    del fields[name]
+        return fields
+
+
+class RecipeSerializer(TimedSerializerMixin, ValuesSerializerMixin,
+                       SparseFieldsMixin, serializers.ModelSerializer):
     """
     Serialize a recipe
     """
+    expandable_fields = {
+        'ingredients': IngredientSerializer,
+        'tags': TagSerializer,
+    }
 
     ingredients = serializers.PrimaryKeyRelatedField(
         many=True,
@@ -69,3 +276,179 @@ class RecipeDetailSerializer(RecipeSerializer):
     """
     ingredients = IngredientSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ('image', 'thumbnail')
+        read_only_fields = ('id', 'image', 'thumbnail')
+
+
+class RecipeImageSerializer(serializers.ModelSerializer):
+    """
+    Serializer for uploading an image to a recipe
+    """
+
+    class Meta:
+        model = Recipe
+        fields = ('id', 'image', 'thumbnail')
+        read_only_fields = ('id', 'thumbnail')
+        extra_kwargs = {'image': {'required': True}}
+
+    def validate_image(self, image):
+        """
+        Accept only content that is a supported image
+        """
+        if image_extension(image) is None:
+            raise serializers.ValidationError(
+                _('Upload a JPEG, PNG, GIF or WebP image.')
+            )
+        return image
+
+    def update(self, instance, validated_data):
+        """
+        Store the image under its content address and queue its thumbnail
+        """
+        instance.image.name = store_image(validated_data['image'])
+        instance.thumbnail = ''
+        instance.save(update_fields=['image', 'thumbnail'])
+        schedule_thumbnail(instance)
+        return instance
+
+
+class CurrencyStatsSerializer(serializers.Serializer):
+    """
+    Serialize the prices of a user's recipes in one currency
+    """
+    currency = serializers.CharField()
+    recipes = serializers.IntegerField()
+    average_price = serializers.DecimalField(max_digits=6, decimal_places=2)
+    min_price = serializers.DecimalField(max_digits=6, decimal_places=2)
+    max_price = serializers.DecimalField(max_digits=6, decimal_places=2)
+
+
+class RecipeStatsSerializer(serializers.Serializer):
+    """
+    Serialize the summary computed by recipe.stats.recipe_stats
+    """
+    recipes = serializers.IntegerField()
+    average_time_minutes = serializers.FloatField(allow_null=True)
+    min_time_minutes = serializers.IntegerField(allow_null=True)
+    max_time_minutes = serializers.IntegerField(allow_null=True)
+    currencies = CurrencyStatsSerializer(many=True)
+    top_tags = TagSerializer(many=True)
+    top_ingredients = IngredientSerializer(many=True)
+
+
+class RecipeCloneSerializer(serializers.Serializer):
+    """
+    Serializer for the options of a recipe copy
+    """
+    title = serializers.CharField(max_length=255, required=False)
+
+
+class RecipeBulkListSerializer(BulkListSerializer):
+    """
+    Bulk writes for recipes, including their tags and ingredients
+    """
+    relations = ('tags', 'ingredients')
+
+    def validate_items(self, items):
+        """
+        Check every referenced tag and ingredient belongs to the user, with
+        one query per relation for the whole batch
+        """
+        errors = super().validate_items(items)
+        user = self.context['request'].user
+
+        for relation in self.relations:
+            model = Recipe._meta.get_field(relation).related_model
+            wanted = {pk for attrs in items for pk in attrs.get(relation, ())}
+            owned = set(model.objects.filter(
+                user=user, id__in=wanted
+            ).values_list('id', flat=True))
+            for error, attrs in zip(errors, items):
+                missing = [pk for pk in attrs.get(relation, ())
+                           if pk not in owned]
+                if missing:
+                    error[relation] = [
+                        _('Invalid pk "{pk}" - object does not exist.').format(
+                            pk=pk
+                        ) for pk in missing
+                    ]
+        return errors
+
+    def create(self, validated_data):
+        """
+        Create the recipes, then bulk insert their through table rows
+        """
+        relations = [self.pop_relations(attrs) for attrs in validated_data]
+        recipes = super().create(validated_data)
+        # recounted rather than adjusted, bulk_insert saves one by one
+        # (sending post_save) on backends without bulk returning
+        rebuild_counts(User, {recipe.user_id for recipe in recipes})
+        self.set_relations(recipes, relations)
+        update_search_vectors([recipe.id for recipe in recipes])
+        return recipes
+
+    def update(self, instance, validated_data):
+        """
+        Update the recipes, replacing the relations that were sent
+        """
+        relations = {attrs['id']: self.pop_relations(attrs)
+                     for attrs in validated_data}
+        recipes = super().update(instance, validated_data)
+        self.set_relations(recipes, [relations[r.id] for r in recipes])
+        update_search_vectors([recipe.id for recipe in recipes])
+        return recipes
+
+    def pop_relations(self, attrs):
+        """
+        Remove the relation id lists from the validated attributes
+        """
+        return {relation: attrs.pop(relation)
+                for relation in self.relations if relation in attrs}
+
+    def set_relations(self, recipes, relations):
+        """
+        Replace the through rows of every relation with one DELETE and
+        one bulk INSERT per relation, adjusting the recipe counts since
+        neither sends signals
+        """
+        for relation in self.relations:
+            model = Recipe._meta.get_field(relation).related_model
+            through = getattr(Recipe, relation).through
+            column = Recipe._meta.get_field(relation).m2m_reverse_name()
+            changed = [(recipe, ids[relation])
+                       for recipe, ids in zip(recipes, relations)
+                       if relation in ids]
+            if not changed:
+                continue
+            rows = [through(recipe_id=recipe.id, **{column: pk})
+                    for recipe, ids in changed for pk in dict.fromkeys(ids)]
+            deltas = Counter(getattr(row, column) for row in rows)
+            if self.instance is not None:
+                recipe_ids = [recipe.id for recipe, _ids in changed]
+                deltas.subtract(related_counts(model, recipe_ids))
+                through.objects.filter(recipe_id__in=recipe_ids).delete()
+            through.objects.bulk_create(rows)
+            adjust_counts(model, deltas)
+
+
+class RecipeBulkSerializer(RecipeSerializer):
+    """
+    Serialize a recipe in a bulk write, relations are given as id lists
+    and validated for the whole batch by RecipeBulkListSerializer
+    """
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False
+    )
+    tags = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False
+    )
+
+    class Meta(RecipeSerializer.Meta):
+        """
+        Meta object for Recipe bulk serializer
+        """
+        list_serializer_class = RecipeBulkListSerializer
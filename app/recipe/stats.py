@@ -0,0 +1,43 @@
+"""
+Summary statistics of a user's recipes
+
+Everything is aggregated by the database: one query for the totals, one
+GROUP BY currency for the prices, and the most used tags and ingredients
+are read from their maintained recipe_count columns (see core.counters)
+rather than by grouping the through tables, so no query grows with the
+number of recipe links. RecipeViewSet caches the result per user.
+"""
+from django.db.models import Avg, Count, Max, Min
+
+from core.models import Ingredient, Recipe, Tag
+
+# tags and ingredients listed by how many recipes use them
+TOP_RELATED = 10
+
+
+def recipe_stats(user, top: int = TOP_RELATED) -> dict:
+    """
+    Return the totals, price ranges per currency and most used tags and
+    ingredients of a user's recipes, for RecipeStatsSerializer
+    """
+    recipes = Recipe.objects.filter(user=user).order_by()
+    stats = recipes.aggregate(
+        recipes=Count('id'),
+        average_time_minutes=Avg('time_minutes'),
+        min_time_minutes=Min('time_minutes'),
+        max_time_minutes=Max('time_minutes'),
+    )
+    if stats['average_time_minutes'] is not None:
+        stats['average_time_minutes'] = round(stats['average_time_minutes'],
+                                              2)
+    stats['currencies'] = list(recipes.values('currency').annotate(
+        recipes=Count('id'),
+        average_price=Avg('price'),
+        min_price=Min('price'),
+        max_price=Max('price'),
+    ).order_by('-recipes', 'currency'))
+    for name, model in (('top_tags', Tag), ('top_ingredients', Ingredient)):
+        stats[name] = list(model.objects.filter(
+            user=user, recipe_count__gt=0
+        ).order_by('-recipe_count', 'name')[:top])
+    return stats
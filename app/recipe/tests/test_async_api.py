@@ -0,0 +1,78 @@
+"""
+Test for the async read endpoints in Recipe API
+"""
+from django.contrib.auth import get_user_model
+from django.test import TransactionTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe.serializers import RecipeDetailSerializer
+
+ASYNC_RECIPES_URL = reverse('recipe:async-recipe-list')
+ASYNC_TAGS_URL = reverse('recipe:async-tag-list')
+
+
+class AsyncRecipeApiTest(TransactionTestCase):
+    """
+    Test the async read path; a TransactionTestCase because the views read
+    through their own pool connections, which cannot see data left
+    uncommitted by a TestCase
+    """
+
+    def setUp(self) -> None:
+        """
+        create a user with a tagged recipe
+        """
+        self.user = get_user_model().objects.create_user(
+            'mail@mail.com',
+            'password1'
+        )
+        self.recipe = Recipe.objects.create(user=self.user, title='Salad',
+                                            time_minutes=5, price=5.00,
+                                            currency='USD')
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.recipe.tags.add(self.tag)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_auth_required(self):
+        """
+        Test the async endpoints authenticate like the sync ones
+        """
+        res = APIClient().get(ASYNC_RECIPES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_async_recipe_list_matches_sync(self):
+        """
+        Test the async recipe list returns the sync representation
+        """
+        res = self.client.get(ASYNC_RECIPES_URL)
+        sync_res = self.client.get(reverse('recipe:recipe-list'))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), sync_res.json())
+
+    def test_async_recipe_detail(self):
+        """
+        Test the async recipe detail nests tags and ingredients
+        """
+        url = reverse('recipe:async-recipe-detail', args=[self.recipe.id])
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['tags'],
+                         RecipeDetailSerializer(self.recipe).data['tags'])
+
+    def test_async_tag_list(self):
+        """
+        Test the async tag list
+        """
+        res = self.client.get(ASYNC_TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['results'],
+                         [{'id': self.tag.id, 'name': self.tag.name,
+                           'recipe_count': 1}])
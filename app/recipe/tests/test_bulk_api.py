@@ -0,0 +1,313 @@
+"""
+Test for the bulk endpoints in Recipe API
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from core.search import search_recipes
+from recipe.serializers import names_taken as check_names
+
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def recipe_payload(title, **kwargs):
+    """
+    Return a payload for a single recipe
+    """
+    payload = {
+        'title': title,
+        'time_minutes': 10,
+        'price': '5.00',
+        'currency': 'USD',
+    }
+    payload.update(kwargs)
+    return payload
+
+
+class PrivateBulkApiTest(TestCase):
+    """
+    Test the bulk endpoints for an authenticated user
+    """
+
+    def setUp(self) -> None:
+        """
+        create a user for testing the private API resource
+        """
+        self.user = get_user_model().objects.create_user(
+            'mail@mail.com',
+            'password1'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_tags(self):
+        """
+        Test creating several tags in one request
+        """
+        payload = [{'name': 'Vegan'}, {'name': 'Dessert'}]
+        res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([tag['name'] for tag in res.data],
+                         ['Vegan', 'Dessert'])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_create_reports_errors_per_item(self):
+        """
+        Test an invalid item rejects the whole batch with per item errors
+        """
+        payload = [{'name': 'Vegan'}, {'name': ''}]
+        res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('name', res.data[1])
+        self.assertFalse(Tag.objects.exists())
+
+    def test_bulk_requires_a_list(self):
+        """
+        Test the bulk endpoint rejects a single object
+        """
+        res = self.client.post(TAGS_BULK_URL, {'name': 'Vegan'},
+                               format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_update_tags(self):
+        """
+        Test renaming several tags in one request
+        """
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Dessert')
+        payload = [{'id': tag1.id, 'name': 'Vegetarian'},
+                   {'id': tag2.id, 'name': 'Sweet'}]
+        res = self.client.patch(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        tag1.refresh_from_db()
+        tag2.refresh_from_db()
+        self.assertEqual(tag1.name, 'Vegetarian')
+        self.assertEqual(tag2.name, 'Sweet')
+
+    def test_bulk_names_must_be_free(self):
+        """
+        Test names taken by the user or repeated in the batch are rejected
+        per item, ignoring case
+        """
+        Tag.objects.create(user=self.user, name='Vegan')
+        payload = [{'name': 'vegan'}, {'name': 'Sweet'}, {'name': 'SWEET'}]
+        res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', res.data[0])
+        self.assertEqual(res.data[1], {})
+        self.assertIn('name', res.data[2])
+
+    def test_bulk_name_taken_concurrently(self):
+        """
+        Test a name another request creates after the batch was checked is
+        reported per item instead of failing the request
+        """
+        Tag.objects.create(user=self.user, name='Vegan')
+        checks = []
+
+        def names_taken(*args, **kwargs):
+            # the first check runs before the other request's commit
+            checks.append(args)
+            return check_names(*args, **kwargs) if len(checks) > 1 else set()
+
+        payload = [{'name': 'Sweet'}, {'name': 'vegan'}]
+        with patch('recipe.serializers.names_taken',
+                   side_effect=names_taken):
+            res = self.client.post(TAGS_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('name', res.data[1])
+        self.assertEqual(list(Tag.objects.values_list('name', flat=True)),
+                         ['Vegan'])
+
+    def test_bulk_rename_changing_case(self):
+        """
+        Test a tag may be renamed to its own name in another case
+        """
+        tag = Tag.objects.create(user=self.user, name='vegan')
+        res = self.client.patch(TAGS_BULK_URL,
+                                [{'id': tag.id, 'name': 'Vegan'}],
+                                format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Vegan')
+
+    def test_bulk_update_other_users_tag_fails(self):
+        """
+        Test a tag owned by another user cannot be changed in bulk
+        """
+        user2 = get_user_model().objects.create_user(
+            'other@mail.com',
+            'password2'
+        )
+        tag = Tag.objects.create(user=user2, name='Vegan')
+        res = self.client.patch(TAGS_BULK_URL,
+                                [{'id': tag.id, 'name': 'Mine'}],
+                                format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('id', res.data[0])
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Vegan')
+
+    def test_bulk_delete_tags(self):
+        """
+        Test deleting several tags in one request
+        """
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Dessert')
+        Tag.objects.create(user=self.user, name='Spicy')
+        res = self.client.delete(TAGS_BULK_URL, [tag1.id, tag2.id],
+                                 format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(list(Tag.objects.values_list('name', flat=True)),
+                         ['Spicy'])
+
+    def test_bulk_delete_tags_reindexes_in_fixed_queries(self):
+        """
+        Test recipes losing tags deleted in bulk are reindexed, with as many
+        queries for more tags
+        """
+        recipe = Recipe.objects.create(user=self.user, **recipe_payload('A'))
+
+        def delete(count):
+            tags = [Tag.objects.create(user=self.user, name=f'Tag {i}')
+                    for i in range(count)]
+            recipe.tags.add(*tags)
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.delete(TAGS_BULK_URL,
+                                         [tag.id for tag in tags],
+                                         format='json')
+            self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+            return len(queries)
+
+        self.assertEqual(delete(2), delete(6))
+        self.assertFalse(search_recipes(Recipe.objects.all(), 'tag'))
+
+    def test_bulk_create_recipes_with_relations(self):
+        """
+        Test creating recipes with tags and ingredients in one request
+        """
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        payload = [
+            recipe_payload('Salad', tags=[tag.id],
+                           ingredients=[ingredient.id]),
+            recipe_payload('Soup', tags=[tag.id]),
+        ]
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([r['title'] for r in res.data], ['Salad', 'Soup'])
+        self.assertEqual(res.data[0]['tags'], [tag.id])
+        self.assertEqual(res.data[0]['ingredients'], [ingredient.id])
+        self.assertEqual(res.data[1]['ingredients'], [])
+        self.assertEqual(tag.recipe_set.count(), 2)
+        tag.refresh_from_db()
+        ingredient.refresh_from_db()
+        self.user.refresh_from_db()
+        self.assertEqual(tag.recipe_count, 2)
+        self.assertEqual(ingredient.recipe_count, 1)
+        self.assertEqual(self.user.recipe_count, 2)
+
+    def test_bulk_create_recipes_rejects_other_users_tags(self):
+        """
+        Test the tags of another user cannot be attached in bulk
+        """
+        user2 = get_user_model().objects.create_user(
+            'other@mail.com',
+            'password2'
+        )
+        tag = Tag.objects.create(user=user2, name='Vegan')
+        payload = [recipe_payload('Salad'),
+                   recipe_payload('Soup', tags=[tag.id])]
+        res = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('tags', res.data[1])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_update_recipes_replaces_relations(self):
+        """
+        Test a bulk update replaces only the relations that were sent
+        """
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Dessert')
+        recipe1 = Recipe.objects.create(user=self.user, **recipe_payload('A'))
+        recipe2 = Recipe.objects.create(user=self.user, **recipe_payload('B'))
+        recipe1.tags.add(tag1)
+        recipe2.tags.add(tag1)
+
+        payload = [{'id': recipe1.id, 'tags': [tag2.id]},
+                   {'id': recipe2.id, 'title': 'Renamed'}]
+        res = self.client.patch(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipe2.refresh_from_db()
+        self.assertEqual(recipe2.title, 'Renamed')
+        self.assertEqual(list(recipe1.tags.all()), [tag2])
+        self.assertEqual(list(recipe2.tags.all()), [tag1])
+        tag1.refresh_from_db()
+        tag2.refresh_from_db()
+        self.assertEqual((tag1.recipe_count, tag2.recipe_count), (1, 1))
+
+    def test_bulk_delete_recipes(self):
+        """
+        Test deleting recipes in bulk, unknown ids reject the batch
+        """
+        recipe = Recipe.objects.create(user=self.user, **recipe_payload('A'))
+        res = self.client.delete(RECIPES_BULK_URL, [recipe.id, 0],
+                                 format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Recipe.objects.exists())
+
+        res = self.client.delete(RECIPES_BULK_URL, [recipe.id],
+                                 format='json')
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_delete_recipes_updates_counts_in_fixed_queries(self):
+        """
+        Test the counts of the owner, tags and ingredients of recipes
+        deleted in bulk are kept, with as many queries for more recipes
+        """
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+
+        def delete(count):
+            recipes = []
+            for i in range(count):
+                recipe = Recipe.objects.create(user=self.user,
+                                               **recipe_payload(str(i)))
+                recipe.tags.add(tag)
+                recipe.ingredients.add(ingredient)
+                recipes.append(recipe.id)
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.delete(RECIPES_BULK_URL, recipes,
+                                         format='json')
+            self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+            return len(queries)
+
+        self.assertEqual(delete(2), delete(6))
+        for obj in (self.user, tag, ingredient):
+            obj.refresh_from_db()
+            self.assertEqual(obj.recipe_count, 0)
@@ -1,16 +1,56 @@
 """
 Test for Recipe resource in Recipe API
 """
+import base64
+import csv
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest import skipUnless
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import AsyncClient, TestCase, override_settings
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
+from core import images, search
 from core.models import Recipe, Tag, Ingredient
-from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+from recipe.serializers import (RecipeSerializer, RecipeDetailSerializer,
+                                TagSerializer)
 
 RECIPES_URL = reverse('recipe:recipe-list')
+EXPORT_URL = reverse('recipe:recipe-export')
+STATS_URL = reverse('recipe:recipe-stats')
+
+
+# a 1x1 transparent PNG
+PNG_BYTES = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYA'
+    'AjCB0C8AAAAASUVORK5CYII='
+)
+
+
+def image_upload_url(recipe_id):
+    """
+    Return the image upload url of a recipe
+    """
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def clone_url(recipe_id):
+    """
+    Return the clone url of a recipe
+    """
+    return reverse('recipe:recipe-clone', args=[recipe_id])
 
 
 def detail_url(recipe_id):
@@ -97,7 +137,7 @@ class PrivateRecipeApiTest(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_recipe_limited_to_user(self):
         """
@@ -115,8 +155,8 @@ class PrivateRecipeApiTest(TestCase):
         serializer = RecipeSerializer(recipes, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_view_recipe_detail(self):
         """
@@ -237,3 +277,683 @@ class PrivateRecipeApiTest(TestCase):
         self.assertEqual(recipe.currency, payload['currency'])
         tags = recipe.tags.all()
         self.assertEqual(len(tags), 0)
+
+    def create_recipes_with_relations(self, count):
+        """
+        Helper function to create recipes, each with a tag and an ingredient
+        """
+        start = Recipe.objects.count()
+        for i in range(start, start + count):
+            recipe = sample_recipe(user=self.user, title=f'Recipe {i}')
+            recipe.tags.add(sample_tags(user=self.user, name=f'Tag {i}'))
+            recipe.ingredients.add(
+                sample_ingredients(user=self.user, name=f'Ingredient {i}')
+            )
+
+    def test_list_recipes_query_count_is_constant(self):
+        """
+        Test listing recipes runs a fixed number of queries however many
+        recipes the user has
+        """
+        self.create_recipes_with_relations(2)
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(len(res.data['results']), 2)
+
+        self.create_recipes_with_relations(10)
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(len(res.data['results']), 12)
+        self.assertEqual(len(res.data['results'][0]['tags']), 1)
+        self.assertEqual(len(res.data['results'][0]['ingredients']), 1)
+
+    def test_retrieve_recipe_query_count(self):
+        """
+        Test the recipe detail prefetches its nested tags and ingredients
+        """
+        recipe = sample_recipe(user=self.user)
+        for i in range(5):
+            recipe.tags.add(sample_tags(user=self.user, name=f'Tag {i}'))
+            recipe.ingredients.add(
+                sample_ingredients(user=self.user, name=f'Ingredient {i}')
+            )
+
+        with self.assertNumQueries(3):
+            res = self.client.get(detail_url(recipe_id=recipe.id))
+        self.assertEqual(len(res.data['tags']), 5)
+        self.assertEqual(len(res.data['ingredients']), 5)
+
+    def test_recipes_are_cursor_paginated(self):
+        """
+        Test walking every page of the recipe list with the cursor links
+        """
+        for i in range(5):
+            sample_recipe(user=self.user, title=f'Recipe {i}')
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(res.data['previous'])
+
+        seen = [recipe['id'] for recipe in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            self.assertLessEqual(len(res.data['results']), 2)
+            seen.extend(recipe['id'] for recipe in res.data['results'])
+
+        expected = Recipe.objects.filter(
+            user=self.user
+        ).order_by('-id').values_list('id', flat=True)
+        self.assertEqual(seen, list(expected))
+
+    def test_export_recipes_ndjson(self):
+        """
+        Test exporting every recipe as NDJSON with nested relations
+        """
+        self.create_recipes_with_relations(3)
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        recipes = [json.loads(line) for line in lines]
+        self.assertEqual([r['title'] for r in recipes],
+                         ['Recipe 0', 'Recipe 1', 'Recipe 2'])
+        self.assertEqual(recipes[0]['tags'][0]['name'], 'Tag 0')
+        self.assertEqual(recipes[0]['price'], '500.00')
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_export_recipes_csv(self):
+        """
+        Test exporting recipes as CSV across several chunks
+        """
+        self.create_recipes_with_relations(3)
+        res = self.client.get(EXPORT_URL, {'type': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        content = b''.join(res.streaming_content).decode()
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[0][:2], ['id', 'title'])
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[3][1], 'Recipe 2')
+        self.assertEqual(rows[3][6:], ['Tag 2', 'Ingredient 2'])
+
+    @override_settings(EXPORT_CHUNK_SIZE=2)
+    def test_export_recipes_under_asgi(self):
+        """
+        Test the export reads the database before an ASGI server starts
+        sending it from the event loop, where queries are not allowed
+        """
+        self.create_recipes_with_relations(3)
+        token = Token.objects.create(user=self.user)
+
+        async def export():
+            res = await AsyncClient().get(
+                f'{EXPORT_URL}?type=csv', AUTHORIZATION=f'Token {token.key}'
+            )
+            return res, b''.join(res.streaming_content)
+
+        res, content = async_to_sync(export)()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'text/csv')
+        rows = list(csv.reader(io.StringIO(content.decode())))
+        self.assertEqual([row[1] for row in rows],
+                         ['title', 'Recipe 0', 'Recipe 1', 'Recipe 2'])
+
+    def test_export_invalid_type(self):
+        """
+        Test an unknown export type is rejected
+        """
+        res = self.client.get(EXPORT_URL, {'type': 'xml'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_recipes_by_tags(self):
+        """
+        Test returning recipes with any of the given tags
+        """
+        recipe1 = sample_recipe(user=self.user, title='Thai curry')
+        recipe2 = sample_recipe(user=self.user, title='Tahini')
+        recipe3 = sample_recipe(user=self.user, title='Fish and chips')
+        tag1 = sample_tags(user=self.user, name='Vegan')
+        tag2 = sample_tags(user=self.user, name='Vegetarian')
+        recipe1.tags.add(tag1)
+        recipe2.tags.add(tag2)
+
+        res = self.client.get(RECIPES_URL, {'tags': f'{tag1.id},{tag2.id}'})
+
+        titles = [recipe['title'] for recipe in res.data['results']]
+        self.assertIn(recipe1.title, titles)
+        self.assertIn(recipe2.title, titles)
+        self.assertNotIn(recipe3.title, titles)
+
+    def test_filter_recipes_matching_all_tags(self):
+        """
+        Test returning only recipes with every one of the given tags
+        """
+        recipe1 = sample_recipe(user=self.user, title='Thai curry')
+        recipe2 = sample_recipe(user=self.user, title='Tahini')
+        tag1 = sample_tags(user=self.user, name='Vegan')
+        tag2 = sample_tags(user=self.user, name='Spicy')
+        recipe1.tags.add(tag1, tag2)
+        recipe2.tags.add(tag1)
+
+        res = self.client.get(RECIPES_URL, {
+            'tags': f'{tag1.id},{tag2.id}',
+            'match': 'all',
+        })
+
+        titles = [recipe['title'] for recipe in res.data['results']]
+        self.assertEqual(titles, [recipe1.title])
+
+    def test_filter_recipes_by_ingredients(self):
+        """
+        Test returning recipes with specific ingredients
+        """
+        recipe1 = sample_recipe(user=self.user, title='Beans on toast')
+        recipe2 = sample_recipe(user=self.user, title='Chicken')
+        ingredient = sample_ingredients(user=self.user, name='Beans')
+        recipe1.ingredients.add(ingredient)
+
+        res = self.client.get(RECIPES_URL, {'ingredients': ingredient.id})
+
+        titles = [recipe['title'] for recipe in res.data['results']]
+        self.assertIn(recipe1.title, titles)
+        self.assertNotIn(recipe2.title, titles)
+
+    def test_filter_recipes_by_time_and_price(self):
+        """
+        Test the max_time and max_price filters
+        """
+        sample_recipe(user=self.user, title='Quick', time_minutes=10,
+                      price=5.00)
+        sample_recipe(user=self.user, title='Slow', time_minutes=90,
+                      price=5.00)
+        sample_recipe(user=self.user, title='Pricey', time_minutes=10,
+                      price=50.00)
+
+        res = self.client.get(RECIPES_URL, {'max_time': 30,
+                                            'max_price': '10.00'})
+
+        titles = [recipe['title'] for recipe in res.data['results']]
+        self.assertEqual(titles, ['Quick'])
+
+    def test_filter_recipes_invalid_params(self):
+        """
+        Test malformed filter parameters are rejected
+        """
+        for params in ({'tags': 'a,b'}, {'max_time': 'soon'},
+                       {'match': 'some'}, {'max_price': 'NaN'},
+                       {'max_price': 'Infinity'}, {'max_price': '-inf'},
+                       {'max_price': 'sNaN'}):
+            res = self.client.get(RECIPES_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_recipes(self):
+        """
+        Test searching recipes by title, tag and ingredient names
+        """
+        recipe1 = sample_recipe(user=self.user, title='Jollof rice')
+        recipe2 = sample_recipe(user=self.user, title='Pancakes')
+        recipe3 = sample_recipe(user=self.user, title='Fried plantain')
+        recipe2.tags.add(sample_tags(user=self.user, name='Breakfast'))
+        recipe3.ingredients.add(sample_ingredients(user=self.user,
+                                                   name='Rice flour'))
+
+        res = self.client.get(RECIPES_URL, {'search': 'rice'})
+        titles = {recipe['title'] for recipe in res.data['results']}
+        self.assertEqual(titles, {recipe1.title, recipe3.title})
+
+        res = self.client.get(RECIPES_URL, {'search': 'breakfast'})
+        titles = [recipe['title'] for recipe in res.data['results']]
+        self.assertEqual(titles, [recipe2.title])
+
+    def test_created_recipe_reindexed_once(self):
+        """
+        Test creating a recipe with tags and ingredients builds its search
+        document once, with every name in it
+        """
+        payload = {
+            'title': 'Pancakes',
+            'time_minutes': 20,
+            'price': 3.00,
+            'currency': 'USD',
+            'tags': [sample_tags(user=self.user, name='Breakfast').id],
+            'ingredients': [sample_ingredients(user=self.user,
+                                               name='Flour').id],
+        }
+        with patch('core.search.update_search_vectors',
+                   wraps=search.update_search_vectors) as update:
+            res = self.client.post(RECIPES_URL, payload)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        update.assert_called_once_with({res.data['id']})
+        for word in ('pancakes', 'breakfast', 'flour'):
+            res = self.client.get(RECIPES_URL, {'search': word})
+            self.assertEqual(len(res.data['results']), 1)
+
+    def test_search_follows_renamed_tags(self):
+        """
+        Test the search document is refreshed when a tag is renamed or
+        removed
+        """
+        recipe = sample_recipe(user=self.user, title='Pancakes')
+        tag = sample_tags(user=self.user, name='Breakfast')
+        recipe.tags.add(tag)
+
+        tag.name = 'Brunch'
+        tag.save()
+        res = self.client.get(RECIPES_URL, {'search': 'brunch'})
+        self.assertEqual(len(res.data['results']), 1)
+
+        tag.delete()
+        res = self.client.get(RECIPES_URL, {'search': 'brunch'})
+        self.assertEqual(len(res.data['results']), 0)
+
+    def test_list_sparse_fields(self):
+        """
+        Test asking for some fields returns only those, without reading
+        the relations, and pages still follow the cursor
+        """
+        self.create_recipes_with_relations(3)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, {'fields': 'title,price',
+                                                'page_size': 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'],
+                         [{'title': 'Recipe 2', 'price': '500.00'},
+                          {'title': 'Recipe 1', 'price': '500.00'}])
+
+        res = self.client.get(res.data['next'])
+        self.assertEqual(res.data['results'], [{'title': 'Recipe 0',
+                                                'price': '500.00'}])
+
+    def test_list_expand_relations(self):
+        """
+        Test expanded relations are nested in the list with one query each
+        """
+        self.create_recipes_with_relations(3)
+        recipe = Recipe.objects.get(title='Recipe 1')
+
+        with self.assertNumQueries(2):
+            res = self.client.get(RECIPES_URL, {'fields': 'id,tags',
+                                                'expand': 'tags'})
+        data = {item['id']: item for item in res.data['results']}
+        self.assertEqual(
+            data[recipe.id],
+            {'id': recipe.id,
+             'tags': TagSerializer(recipe.tags.all(), many=True).data}
+        )
+
+        res = self.client.get(RECIPES_URL, {'expand': 'tags,ingredients'})
+        serializer = RecipeDetailSerializer(
+            Recipe.objects.order_by('-id'), many=True
+        )
+        for item, expected in zip(res.data['results'], serializer.data):
+            self.assertEqual(item['tags'], expected['tags'])
+            self.assertEqual(item['ingredients'], expected['ingredients'])
+
+    def test_retrieve_sparse_fields(self):
+        """
+        Test the detail renders only the fields asked for and prefetches
+        only their relations
+        """
+        recipe = sample_recipe(user=self.user)
+        recipe.tags.add(sample_tags(user=self.user))
+        recipe.ingredients.add(sample_ingredients(user=self.user))
+
+        with self.assertNumQueries(2):
+            res = self.client.get(detail_url(recipe.id),
+                                  {'fields': 'title,tags'})
+        self.assertEqual(
+            res.data,
+            {'title': recipe.title,
+             'tags': TagSerializer(recipe.tags.all(), many=True).data}
+        )
+
+    def test_sparse_fields_invalid(self):
+        """
+        Test unknown fields or relations are rejected
+        """
+        for params in ({'fields': 'title,secret'}, {'expand': 'user'}):
+            res = self.client.get(RECIPES_URL, params)
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertIn(list(params)[0], res.data)
+
+    def test_sparse_fields_ignored_by_writes(self):
+        """
+        Test writes respond with the whole recipe whatever the query
+        """
+        res = self.client.post(f'{RECIPES_URL}?fields=title', {
+            'title': 'Chocolate cake',
+            'time_minutes': 30,
+            'price': 5.00,
+            'currency': 'USD',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertIn('price', res.data)
+
+
+class RecipeCloneTests(TestCase):
+    """
+    Test copying recipes
+    """
+
+    def setUp(self) -> None:
+        """
+        authenticate a user owning a recipe with tags and ingredients
+        """
+        self.user = get_user_model().objects.create_user(
+            'mail@mail.com',
+            'password1'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tag = sample_tags(user=self.user)
+        self.ingredient = sample_ingredients(user=self.user)
+        self.recipe = sample_recipe(user=self.user, link='https://x.y',
+                                    image='recipes/ab/ab.png')
+        self.recipe.tags.add(self.tag)
+        self.recipe.ingredients.add(self.ingredient)
+
+    def test_clone_recipe(self):
+        """
+        Test the copy has the same fields and relations under a new id
+        """
+        res = self.client.post(clone_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        clone = Recipe.objects.get(id=res.data['id'])
+        self.assertNotEqual(clone.id, self.recipe.id)
+        original = RecipeDetailSerializer(self.recipe).data
+        copied = RecipeDetailSerializer(clone).data
+        original.pop('id')
+        copied.pop('id')
+        self.assertEqual(copied, original)
+        self.assertEqual(res.data['title'], self.recipe.title)
+        self.assertEqual(res.data['tags'][0]['id'], self.tag.id)
+
+    def test_clone_with_title_is_searchable(self):
+        """
+        Test a copy can be renamed and is found by its new title
+        """
+        res = self.client.post(clone_url(self.recipe.id),
+                               {'title': 'Weekend copy'})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['title'], 'Weekend copy')
+        res = self.client.get(RECIPES_URL, {'search': 'weekend'})
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_clone_updates_counts(self):
+        """
+        Test the copy is counted against the user, tags and ingredients
+        """
+        self.client.post(clone_url(self.recipe.id))
+
+        self.user.refresh_from_db()
+        self.tag.refresh_from_db()
+        self.ingredient.refresh_from_db()
+        self.assertEqual(self.user.recipe_count, 2)
+        self.assertEqual(self.tag.recipe_count, 2)
+        self.assertEqual(self.ingredient.recipe_count, 2)
+
+    def test_clone_other_users_recipe(self):
+        """
+        Test another user's recipe cannot be cloned
+        """
+        other_user = get_user_model().objects.create_user('other@mail.com',
+                                                          'password1')
+        recipe = sample_recipe(user=other_user)
+
+        res = self.client.post(clone_url(recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 1)
+
+
+class RecipeStatsTests(TestCase):
+    """
+    Test the summary of a user's recipes
+    """
+
+    def setUp(self) -> None:
+        """
+        authenticate a user owning recipes in two currencies
+        """
+        self.user = get_user_model().objects.create_user(
+            'mail@mail.com',
+            'password1'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        vegan = sample_tags(user=self.user, name='Vegan')
+        dessert = sample_tags(user=self.user, name='Dessert')
+        sample_tags(user=self.user, name='Unused')
+        salt = sample_ingredients(user=self.user, name='Salt')
+
+        recipe = sample_recipe(user=self.user, time_minutes=10, price=5,
+                               currency='USD')
+        recipe.tags.add(vegan, dessert)
+        recipe.ingredients.add(salt)
+        sample_recipe(user=self.user, time_minutes=20, price=7.5,
+                      currency='USD').tags.add(vegan)
+        sample_recipe(user=self.user, time_minutes=60, price=1500)
+        other = get_user_model().objects.create_user('other@mail.com',
+                                                     'password2')
+        sample_recipe(user=other, time_minutes=999, price=1)
+        shared = patch('core.etags.is_shared', return_value=True)
+        shared.start()
+        self.addCleanup(shared.stop)
+
+    def test_recipe_stats(self):
+        """
+        Test totals, prices per currency and the most used tags and
+        ingredients of the user's recipes only
+        """
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['recipes'], 3)
+        self.assertEqual(res.data['average_time_minutes'], 30.0)
+        self.assertEqual((res.data['min_time_minutes'],
+                          res.data['max_time_minutes']), (10, 60))
+        self.assertEqual(
+            [dict(currency) for currency in res.data['currencies']],
+            [{'currency': 'USD', 'recipes': 2, 'average_price': '6.25',
+              'min_price': '5.00', 'max_price': '7.50'},
+             {'currency': 'NGN', 'recipes': 1, 'average_price': '1500.00',
+              'min_price': '1500.00', 'max_price': '1500.00'}]
+        )
+        self.assertEqual(
+            [(tag['name'], tag['recipe_count'])
+             for tag in res.data['top_tags']],
+            [('Vegan', 2), ('Dessert', 1)]
+        )
+        self.assertEqual([i['name'] for i in res.data['top_ingredients']],
+                         ['Salt'])
+
+    def test_stats_rendered_by_json_renderer(self):
+        """
+        Test the float averages are encoded by the standard library, which
+        FastJSONRenderer does not match for floats
+        """
+        res = self.client.get(STATS_URL)
+
+        self.assertIs(type(res.accepted_renderer), JSONRenderer)
+        self.assertIn(b'"average_time_minutes":30.0', res.content)
+
+    def test_stats_cached_until_write(self):
+        """
+        Test the summary is served from the cache, with an ETag, until
+        the user writes
+        """
+        res = self.client.get(STATS_URL)
+        self.assertEqual(res['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            res = self.client.get(STATS_URL)
+        self.assertEqual(res['X-Cache'], 'HIT')
+        res = self.client.get(STATS_URL, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.post(RECIPES_URL, {'title': 'Toast', 'time_minutes': 2,
+                                       'price': 1, 'currency': 'GBP'})
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res['X-Cache'], 'MISS')
+        self.assertEqual(res.data['recipes'], 4)
+
+    def test_stats_without_recipes(self):
+        """
+        Test a user without recipes gets an empty summary
+        """
+        user = get_user_model().objects.create_user('new@mail.com',
+                                                    'password3')
+        self.client.force_authenticate(user)
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data['recipes'], 0)
+        self.assertIsNone(res.data['average_time_minutes'])
+        self.assertEqual(res.data['currencies'], [])
+        self.assertEqual(res.data['top_tags'], [])
+
+
+class RecipeImageUploadTests(TestCase):
+    """
+    Test uploading recipe images
+    """
+
+    def setUp(self) -> None:
+        """
+        authenticate a user and store uploads in a throwaway directory
+        """
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        self.user = get_user_model().objects.create_user(
+            'mail@mail.com',
+            'password1'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = sample_recipe(user=self.user)
+
+    def tearDown(self) -> None:
+        """
+        remove the uploaded files
+        """
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def upload(self, recipe, content, name='image.png'):
+        """
+        Upload content as a recipe's image
+        """
+        upload = io.BytesIO(content)
+        upload.name = name
+        return self.client.post(image_upload_url(recipe.id),
+                                {'image': upload}, format='multipart')
+
+    def test_upload_image_content_addressed(self):
+        """
+        Test an uploaded image is stored under its SHA-256
+        """
+        res = self.upload(self.recipe, PNG_BYTES, name='../holiday.jpg')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        digest = hashlib.sha256(PNG_BYTES).hexdigest()
+        self.assertEqual(self.recipe.image.name,
+                         f'recipes/{digest[:2]}/{digest}.png')
+        self.assertTrue(res.data['image'].endswith(self.recipe.image.name))
+        self.assertTrue(os.path.exists(self.recipe.image.path))
+
+    def test_identical_uploads_share_a_file(self):
+        """
+        Test the same image uploaded twice is stored once
+        """
+        other = sample_recipe(user=self.user, title='Other')
+        self.upload(self.recipe, PNG_BYTES)
+        self.upload(other, PNG_BYTES)
+
+        self.recipe.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.recipe.image.name, other.image.name)
+        folder = os.path.dirname(self.recipe.image.path)
+        self.assertEqual(len(os.listdir(folder)), 1)
+
+    def test_upload_racing_a_stored_copy(self):
+        """
+        Test an upload whose file appears between the existence check and
+        the write keeps the content addressed name and the stored copy
+        """
+        self.upload(self.recipe, PNG_BYTES)
+        self.recipe.refresh_from_db()
+        name = self.recipe.image.name
+        other = sample_recipe(user=self.user, title='Other')
+
+        with patch('core.images.os.path.exists', return_value=False):
+            res = self.upload(other, PNG_BYTES)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        other.refresh_from_db()
+        self.assertEqual(other.image.name, name)
+        self.assertEqual(os.listdir(os.path.dirname(other.image.path)),
+                         [os.path.basename(name)])
+
+    def test_upload_image_bad_request(self):
+        """
+        Test content that is not an image is rejected
+        """
+        res = self.upload(self.recipe, b'not an image', name='image.png')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    def test_upload_image_too_large(self):
+        """
+        Test images over the size limit are rejected
+        """
+        limits = {**settings.IMAGE_UPLOAD, 'MAX_SIZE': 16}
+        with override_settings(IMAGE_UPLOAD=limits):
+            res = self.upload(self.recipe, PNG_BYTES)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
+
+    def test_upload_image_other_users_recipe(self):
+        """
+        Test images cannot be uploaded to another user's recipe
+        """
+        other_user = get_user_model().objects.create_user('other@mail.com',
+                                                          'password1')
+        recipe = sample_recipe(user=other_user)
+
+        res = self.upload(recipe, PNG_BYTES)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    @skipUnless(images.Image, 'Pillow is not installed')
+    def test_generate_thumbnail(self):
+        """
+        Test the thumbnail is made from the stored image and recorded
+        """
+        self.upload(self.recipe, PNG_BYTES)
+        self.recipe.refresh_from_db()
+
+        images.generate_thumbnail(self.recipe.id, self.recipe.image.name)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.thumbnail.name,
+                         images.thumbnail_name(self.recipe.image.name))
+        with self.recipe.thumbnail.open() as thumbnail:
+            self.assertEqual(thumbnail.read(3), b'\xff\xd8\xff')
+
+        res = self.client.get(detail_url(self.recipe.id))
+        self.assertTrue(res.data['thumbnail'].endswith(
+            self.recipe.thumbnail.name
+        ))
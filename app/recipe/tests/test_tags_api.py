@@ -7,10 +7,11 @@ from django.test import TestCase
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Tag
+from core.models import Tag, Recipe
 from recipe.serializers import TagSerializer
 
 TAGS_URL = reverse('recipe:tag-list')
+RESOLVE_URL = reverse('recipe:tag-resolve')
 
 
 class PublicTagsApiTest(TestCase):
@@ -62,7 +63,7 @@ class PrivateTagsApiTest(TestCase):
         serializer = TagSerializer(tags, many=True)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_tag_limited_to_user(self):
         """
@@ -78,8 +79,30 @@ class PrivateTagsApiTest(TestCase):
         res = self.client.get(TAGS_URL)
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
+
+    def test_tags_show_recipe_count(self):
+        """
+        Test each tag shows how many recipes use it
+        """
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        Tag.objects.create(user=self.user, name='Lunch')
+        recipe = Recipe.objects.create(
+            title='Coriander eggs on toast',
+            time_minutes=10,
+            price=5.00,
+            currency='USD',
+            user=self.user
+        )
+        recipe.tags.add(tag)
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(
+            [(t['name'], t['recipe_count']) for t in res.data['results']],
+            [('Lunch', 0), ('Breakfast', 1)]
+        )
 
     def test_create_tags_successful(self):
         """
@@ -95,6 +118,64 @@ class PrivateTagsApiTest(TestCase):
 
         self.assertTrue(exists)
 
+    def test_create_tag_name_taken(self):
+        """
+        Test a tag cannot be created under a name the user has, ignoring
+        case, while other users may use it
+        """
+        user2 = get_user_model().objects.create_user(
+            'other@mail.com',
+            'password2'
+        )
+        Tag.objects.create(user=user2, name='Dessert')
+        Tag.objects.create(user=self.user, name='Vegan')
+
+        res = self.client.post(TAGS_URL, {'name': 'VEGAN'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', res.data)
+
+        res = self.client.post(TAGS_URL, {'name': 'Dessert'})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_resolve_names(self):
+        """
+        Test names resolve to the user's tags, creating the missing ones,
+        in the order given and once per distinct name
+        """
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        user2 = get_user_model().objects.create_user(
+            'other@mail.com',
+            'password2'
+        )
+        Tag.objects.create(user=user2, name='Dessert')
+
+        res = self.client.post(
+            RESOLVE_URL, {'names': ['Dessert', 'vegan', 'DESSERT', 'Vegan']},
+            format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([tag['name'] for tag in res.data],
+                         ['Dessert', 'Vegan'])
+        self.assertEqual(res.data[1]['id'], vegan.id)
+        dessert = Tag.objects.get(user=self.user, name='Dessert')
+        self.assertEqual(res.data[0]['id'], dessert.id)
+
+        again = self.client.post(RESOLVE_URL, {'names': ['dessert']},
+                                 format='json')
+        self.assertEqual(again.data, [res.data[0]])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_resolve_names_invalid(self):
+        """
+        Test an empty batch or a blank name is rejected
+        """
+        for names in ([], ['Vegan', '']):
+            res = self.client.post(RESOLVE_URL, {'names': names},
+                                   format='json')
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Tag.objects.exists())
+
     def test_create_tag_invalid(self):
         """
         Test creating a new tag with invalid payload
@@ -103,3 +184,41 @@ class PrivateTagsApiTest(TestCase):
         res = self.client.post(TAGS_URL, payload)
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_tags_are_cursor_paginated(self):
+        """
+        Test tags are paginated by name and the cursor resumes after the
+        last tag of the previous page
+        """
+        for name in ('Apple', 'Banana', 'Cherry'):
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {'page_size': 2})
+        names = [tag['name'] for tag in res.data['results']]
+        self.assertEqual(names, ['Cherry', 'Banana'])
+
+        res = self.client.get(res.data['next'])
+        names = [tag['name'] for tag in res.data['results']]
+        self.assertEqual(names, ['Apple'])
+        self.assertIsNone(res.data['next'])
+
+    def test_retrieve_tags_assigned_to_recipes(self):
+        """
+        Test filtering tags by those assigned to recipes
+        """
+        tag1 = Tag.objects.create(user=self.user, name='Breakfast')
+        tag2 = Tag.objects.create(user=self.user, name='Lunch')
+        recipe = Recipe.objects.create(
+            title='Coriander eggs on toast',
+            time_minutes=10,
+            price=5.00,
+            currency='USD',
+            user=self.user
+        )
+        recipe.tags.add(tag1)
+
+        res = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        names = [tag['name'] for tag in res.data['results']]
+        self.assertIn(tag1.name, names)
+        self.assertNotIn(tag2.name, names)
@@ -4,7 +4,7 @@ Urls to be registered for Tags
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from recipe import views
+from recipe import async_views, views
 
 router = DefaultRouter()
 router.register('tags', views.TagViewSet)
@@ -14,5 +14,12 @@ router.register('recipes', views.RecipeViewSet)
 app_name = 'recipe'
 
 urlpatterns = [
+    path('async/recipes/', async_views.recipe_list,
+         name='async-recipe-list'),
+    path('async/recipes/<int:pk>/', async_views.recipe_detail,
+         name='async-recipe-detail'),
+    path('async/tags/', async_views.tag_list, name='async-tag-list'),
+    path('async/ingredients/', async_views.ingredient_list,
+         name='async-ingredient-list'),
     path('', include(router.urls))
 ]
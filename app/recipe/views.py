@@ -1,34 +1,264 @@
 """
 Views for Tags
 """
-from rest_framework import viewsets, mixins
-from rest_framework.authentication import TokenAuthentication
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Exists, OuterRef, Prefetch
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils.translation import gettext_lazy as _
+from rest_framework import viewsets, mixins, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
+from core.authentication import CachedTokenAuthentication
+from core.bulk import bulk_delete, name_key, resolve_names
+from core.cloning import clone_recipe
+from core.etags import ConditionalGetMixin
+from core.images import HashingUploadHandler
 from core.models import Tag, Ingredient, Recipe
+from core.renderers import FastJSONRenderer
+from core.response_cache import CachedListMixin, cached_response
+from core.routers import ReplicaReadMixin, replica_reads
+from core.search import reindexing_once, search_recipes
+from core.throttling import RecipeWriteRateThrottle
+from core.values import ValuesListMixin
 from recipe import serializers
+from recipe.export import EXPORT_FORMATS, spool
+from recipe.pagination import (RecipeAttrCursorPagination,
+                               RecipeCursorPagination)
+from recipe.stats import recipe_stats
+
+
+def recipes_related_to(relation, ids, match_all=False):
+    """
+    Return the ids of recipes related to any, or all, of the given tag or
+    ingredient ids, read from the relation's through table only
+    Args:
+        relation: 'tags' or 'ingredients'
+        ids: the tag or ingredient ids to match
+        match_all: require every id instead of any of them
+
+    Returns:
+        a values queryset usable as an id__in subquery
+    """
+    field = Recipe._meta.get_field(relation)
+    column = field.m2m_reverse_name()
+    rows = field.remote_field.through.objects.filter(**{f'{column}__in': ids})
+    if not match_all:
+        return rows.values('recipe_id')
 
+    return rows.values('recipe_id').annotate(
+        matched=Count(column)
+    ).filter(matched=len(set(ids))).values('recipe_id')
 
-class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+
+def query_param_ids(request, name):
+    """
+    Convert a comma separated query parameter to a list of integers
+    """
+    value = request.query_params.get(name)
+    if not value:
+        return []
+    try:
+        return [int(pk) for pk in value.split(',')]
+    except ValueError:
+        raise ValidationError({name: [
+            _('Expected a comma separated list of ids.')
+        ]})
+
+
+def query_param_number(request, name, convert):
+    """
+    Convert a numeric query parameter, None when it is absent; NaN and
+    infinities are rejected
+    """
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+    try:
+        number = convert(value)
+    except (ValueError, InvalidOperation):
+        number = None
+    if number is None or (isinstance(number, Decimal) and
+                          not number.is_finite()):
+        raise ValidationError({name: [_('A valid number is required.')]})
+    return number
+
+
+def query_param_names(request, name):
+    """
+    Split a comma separated query parameter into names, None when it is
+    absent or empty
+    """
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+class BulkModelMixin:
+    """
+    Create, update or delete a JSON array of objects in one transaction
+    """
+
+    @action(detail=False, methods=['post', 'patch', 'delete'])
+    def bulk(self, request):
+        """
+        POST creates, PATCH updates and DELETE removes every item of the
+        array; if any item is invalid nothing is written and the errors
+        are reported per item
+        """
+        items = request.data
+        if not isinstance(items, list):
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                _('Expected a list of items.')
+            ]})
+        if len(items) > settings.BULK_MAX_ITEMS:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [
+                _('Ensure there are no more than {max} items.').format(
+                    max=settings.BULK_MAX_ITEMS
+                )
+            ]})
+
+        try:
+            return self.perform_bulk(request, items)
+        except IntegrityError:
+            # a concurrent request took a name after the batch was checked,
+            # checking again reports it per item like any other taken name
+            return self.perform_bulk(request, items)
+
+    def perform_bulk(self, request, items):
+        """
+        Validate and write the batch in one transaction
+        """
+        with transaction.atomic(), reindexing_once():
+            if request.method == 'DELETE':
+                self.perform_bulk_destroy(items)
+                return Response(status=status.HTTP_204_NO_CONTENT)
+
+            if request.method == 'POST':
+                serializer = self.get_serializer(data=items, many=True)
+                serializer.is_valid(raise_exception=True)
+                objs = serializer.save(user=request.user)
+                code = status.HTTP_201_CREATED
+            else:
+                serializer = self.get_serializer(self.get_queryset(),
+                                                 data=items, many=True,
+                                                 partial=True)
+                serializer.is_valid(raise_exception=True)
+                objs = serializer.save()
+                code = status.HTTP_200_OK
+
+        return Response(self.get_bulk_response_data(objs), status=code)
+
+    def perform_bulk_destroy(self, ids):
+        """
+        Delete the objects with the given ids, all of which must exist
+        """
+        queryset = self.get_queryset().filter(
+            id__in=[pk for pk in ids if isinstance(pk, int)]
+        )
+        found = set(queryset.values_list('id', flat=True))
+        errors = [{} if pk in found else {'id': [_('Object does not exist.')]}
+                  for pk in ids]
+        if any(errors):
+            raise ValidationError(errors)
+
+        bulk_delete(queryset, found)
+
+    def get_bulk_response_data(self, objs):
+        """
+        Return the representation of the objects written in bulk
+        """
+        return self.get_serializer(objs, many=True).data
+
+
+class BaseRecipeAttrViewSet(ReplicaReadMixin,
+                            ConditionalGetMixin,
+                            CachedListMixin,
+                            ValuesListMixin,
+                            BulkModelMixin,
+                            viewsets.GenericViewSet,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
     """
     base ViewSet for user owned recipe attributes
     """
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    throttle_classes = (RecipeWriteRateThrottle,)
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
+    pagination_class = RecipeAttrCursorPagination
+    recipe_relation = None
 
     def get_queryset(self):
         """
-        return objects for the current authenticated user only
+        return objects for the current authenticated user only, limited
+        to those used by a recipe when `assigned_only` is set
+        """
+        queryset = self.queryset.filter(user=self.request.user).order_by(
+            '-name', '-id'
+        )
+        if query_param_number(self.request, 'assigned_only', int):
+            field = Recipe._meta.get_field(self.recipe_relation)
+            queryset = queryset.filter(Exists(
+                field.remote_field.through.objects.filter(**{
+                    field.m2m_reverse_name(): OuterRef('pk')
+                })
+            ))
+
+        return queryset
+
+    def get_serializer_class(self):
+        """
+        Return appropriate serializer class
         """
-        return self.queryset.filter(user=self.request.user).order_by('-name')
+        if self.action == 'resolve':
+            return serializers.ResolveNamesSerializer
+
+        return self.serializer_class
 
     def perform_create(self, serializer):
         """
         Create a new object
         """
-        serializer.save(user=self.request.user)
+        try:
+            with transaction.atomic():
+                serializer.save(user=self.request.user)
+        except IntegrityError:
+            # a concurrent request created the same name after validation
+            raise ValidationError({'name': [
+                serializers.name_taken_error(self.queryset.model)
+            ]})
+
+    @action(detail=False, methods=['post'])
+    def resolve(self, request):
+        """
+        Return the objects with the given `names`, matched ignoring case,
+        creating the missing ones; the response follows the order of the
+        names, one object per distinct name
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        names = serializer.validated_data['names']
+        model = self.queryset.model
+        ids = resolve_names(model, request.user, names)
+
+        objs = {obj['id']: obj for obj in self.serializer_class(
+            context=self.get_serializer_context()
+        ).values_data(model.objects.filter(id__in=ids.values()))}
+        data = []
+        for pk in dict.fromkeys(ids.get(name_key(name)) for name in names):
+            if pk in objs:
+                data.append(objs[pk])
+        return Response(data)
 
 
 class TagViewSet(BaseRecipeAttrViewSet):
@@ -37,6 +267,7 @@ class TagViewSet(BaseRecipeAttrViewSet):
     """
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    recipe_relation = 'tags'
 
 
 class IngredientViewSet(BaseRecipeAttrViewSet):
@@ -45,22 +276,129 @@ class IngredientViewSet(BaseRecipeAttrViewSet):
     """
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    recipe_relation = 'ingredients'
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin,
+                    ConditionalGetMixin,
+                    CachedListMixin,
+                    ValuesListMixin,
+                    BulkModelMixin,
+                    viewsets.ModelViewSet):
     """
     Manage recipe in a database
     """
     serializer_class = serializers.RecipeSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    throttle_classes = (RecipeWriteRateThrottle,)
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
+    pagination_class = RecipeCursorPagination
+    etag_actions = ('list', 'retrieve', 'stats')
 
     def get_queryset(self):
         """
-        retrieve the recipes for the authenticated user
+        retrieve the recipes for the authenticated user, prefetching the
+        relations the serializer for the current action will read
+        """
+        queryset = self.queryset.filter(user=self.request.user).defer(
+            'search_vector'
+        ).order_by('-id')
+
+        if self.action in ('list', 'export'):
+            # read as .values() rows, see core.values
+            return self.filter_recipes(queryset)
+        if self.action == 'retrieve':
+            fields = self.get_fieldset()[0]
+            relations = {'tags': Tag, 'ingredients': Ingredient}
+            if fields is not None:
+                relations = {name: model for name, model in relations.items()
+                             if name in fields}
+                queryset = queryset.only('id', *(
+                    set(fields) - {'tags', 'ingredients'}
+                ))
+            # in id order, like the relations of listed recipes
+            return queryset.prefetch_related(*(
+                Prefetch(name, queryset=model.objects.order_by('id'))
+                for name, model in relations.items()
+            ))
+
+        return queryset
+
+    def get_fieldset(self):
+        """
+        Return the fields asked for by the `fields` query parameter, None
+        for all of them, and the relations to nest asked for by `expand`;
+        only reads take them. The list reads only the columns and
+        relations of the fields it renders, see core.values
+        """
+        if self.action not in ('list', 'retrieve'):
+            return None, []
+        serializer_class = self.get_serializer_class()
+
+        expand = query_param_names(self.request, 'expand') or []
+        expandable = serializer_class.expandable_fields
+        if not set(expand) <= set(expandable):
+            raise ValidationError({'expand': [
+                _('Must be any of: {names}.').format(
+                    names=', '.join(expandable)
+                )
+            ]})
+
+        fields = query_param_names(self.request, 'fields')
+        if fields is not None:
+            unknown = set(fields) - set(serializer_class.Meta.fields)
+            if unknown:
+                raise ValidationError({'fields': [
+                    _('Unknown fields: {names}.').format(
+                        names=', '.join(sorted(unknown))
+                    )
+                ]})
+        return fields, expand
+
+    def get_serializer_context(self):
+        """
+        Pass the sparse fieldset of reads to the serializer
         """
-        return self.queryset.filter(user=self.request.user)
+        context = super().get_serializer_context()
+        fields, expand = self.get_fieldset()
+        if fields is not None:
+            context['fields'] = fields
+        if expand:
+            context['expand'] = expand
+        return context
+
+    def filter_recipes(self, queryset):
+        """
+        Apply the `search`, `tags`, `ingredients`, `match`, `max_time`
+        and `max_price` query parameters
+        """
+        search = self.request.query_params.get('search', '').strip()
+        if search:
+            queryset = search_recipes(queryset, search)
+
+        match = self.request.query_params.get('match', 'any')
+        if match not in ('any', 'all'):
+            raise ValidationError({'match': [
+                _('Must be one of: any, all.')
+            ]})
+
+        for relation in ('tags', 'ingredients'):
+            ids = query_param_ids(self.request, relation)
+            if ids:
+                queryset = queryset.filter(id__in=recipes_related_to(
+                    relation, ids, match_all=match == 'all'
+                ))
+
+        max_time = query_param_number(self.request, 'max_time', int)
+        if max_time is not None:
+            queryset = queryset.filter(time_minutes__lte=max_time)
+        max_price = query_param_number(self.request, 'max_price', Decimal)
+        if max_price is not None:
+            queryset = queryset.filter(price__lte=max_price)
+
+        return queryset
 
     def get_serializer_class(self):
         """
@@ -68,11 +406,121 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """
         if self.action == 'retrieve':
             return serializers.RecipeDetailSerializer
+        if self.action == 'bulk':
+            return serializers.RecipeBulkSerializer
+        if self.action == 'upload_image':
+            return serializers.RecipeImageSerializer
+        if self.action == 'clone':
+            return serializers.RecipeCloneSerializer
+        if self.action == 'stats':
+            return serializers.RecipeStatsSerializer
 
         return self.serializer_class
 
+    def get_bulk_response_data(self, objs):
+        """
+        Re-read the recipes written in bulk with their relation ids
+        """
+        queryset = self.get_queryset().filter(
+            id__in=[obj.id for obj in objs]
+        ).order_by('id')
+        return serializers.RecipeSerializer(
+            context=self.get_serializer_context()
+        ).values_data(queryset)
+
+    @action(detail=True, methods=['post'], url_path='upload-image')
+    def upload_image(self, request, pk=None):
+        """
+        Store an image for a recipe, streamed to disk as it arrives; the
+        response does not wait for the thumbnail
+        """
+        recipe = self.get_object()
+        handler = HashingUploadHandler(request)
+        request.upload_handlers = [handler]
+        serializer = self.get_serializer(recipe, data=request.data)
+        if getattr(handler, 'size', 0) > settings.IMAGE_UPLOAD['MAX_SIZE']:
+            raise ValidationError({'image': [
+                _('Ensure the image is at most %(max)s bytes.') % {
+                    'max': settings.IMAGE_UPLOAD['MAX_SIZE']
+                }
+            ]})
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'])
+    def clone(self, request, pk=None):
+        """
+        Copy a recipe with its tags and ingredients, optionally under a new
+        `title`, and return the copy
+        """
+        recipe = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        clone_id = clone_recipe(recipe, request.user,
+                                **serializer.validated_data)
+        data = serializers.RecipeDetailSerializer(
+            context=self.get_serializer_context()
+        ).values_data(Recipe.objects.filter(pk=clone_id))
+        return Response(data[0], status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['get'],
+            renderer_classes=api_settings.DEFAULT_RENDERER_CLASSES)
+    def stats(self, request):
+        """
+        Summarize the user's recipes: totals, cooking times, prices per
+        currency and the most used tags and ingredients, cached until the
+        user next writes. The averages are floats, which FastJSONRenderer
+        does not encode like JSONRenderer
+        """
+        def get_response():
+            serializer = self.get_serializer(recipe_stats(request.user))
+            return Response(serializer.data)
+
+        return cached_response(request, f'{type(self).__name__}.stats',
+                               get_response)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream every recipe of the user, with nested tags and ingredients,
+        as NDJSON (default) or CSV chosen by the `type` query parameter;
+        under ASGI the export is spooled before the response is sent
+        """
+        export_type = request.query_params.get('type', 'ndjson')
+        if export_type not in EXPORT_FORMATS:
+            raise ValidationError({'type': [
+                _('Must be one of: {types}.').format(
+                    types=', '.join(EXPORT_FORMATS)
+                )
+            ]})
+
+        generate, content_type = EXPORT_FORMATS[export_type]
+        queryset = self.get_queryset().order_by('id')
+        content = generate(queryset, settings.EXPORT_CHUNK_SIZE)
+        if isinstance(request._request, ASGIRequest):
+            response = FileResponse(spool(content), content_type=content_type)
+        else:
+            if self.use_replica:
+                # the content is produced after the view has returned
+                content = replica_reads(content)
+            response = StreamingHttpResponse(content,
+                                             content_type=content_type)
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{export_type}"'
+        )
+        return response
+
     def perform_create(self, serializer):
         """
-        Create a new Recipe
+        Create a new Recipe, reindexed once with its tags and ingredients
+        """
+        with transaction.atomic(), reindexing_once():
+            serializer.save(user=self.request.user)
+
+    def perform_update(self, serializer):
+        """
+        Update a Recipe, reindexed once with its tags and ingredients
         """
-        serializer.save(user=self.request.user)
+        with transaction.atomic(), reindexing_once():
+            serializer.save()
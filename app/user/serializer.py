@@ -5,8 +5,10 @@ from django.contrib.auth import get_user_model, authenticate
 from django.utils.translation import ugettext_lazy as _
 from rest_framework import serializers
 
+from core.metrics import TimedSerializerMixin
 
-class UserSerializer(serializers.ModelSerializer):
+
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for the users object
     """
@@ -28,16 +30,22 @@ class UserSerializer(serializers.ModelSerializer):
 
     def update(self, instance, validated_data):
         """
-        Update a user, setting the password correctly
+        Update a user, setting the password correctly; only the changed
+        columns are saved, as the instance may be a cached request.user
+        whose recipe_count is stale
         """
         password = validated_data.pop('password', None)
-        user = super().update(instance=instance, validated_data=validated_data)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        update_fields = list(validated_data)
 
         if password:
-            user.set_password(raw_password=password)
-            user.save()
+            instance.set_password(raw_password=password)
+            update_fields.append('password')
 
-        return user
+        if update_fields:
+            instance.save(update_fields=update_fields)
+        return instance
 
 
 class AuthTokenSerializer(serializers.Serializer):
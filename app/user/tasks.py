@@ -0,0 +1,25 @@
+"""
+Background tasks for users, see core.tasks
+"""
+from django.contrib.auth import get_user_model
+from django.core.mail import send_mail
+from django.utils.translation import gettext as _
+
+from core.tasks import task
+
+
+@task
+def send_welcome_email(user_id: int):
+    """
+    Greet a new user by email, unless the account is gone already
+    """
+    user = get_user_model().objects.filter(pk=user_id).first()
+    if user is None:
+        return
+    send_mail(
+        _('Welcome to the recipe app'),
+        _('Hi {name},\n\nyour account {email} is ready, start adding your '
+          'recipes.').format(name=user.name or user.email, email=user.email),
+        None,
+        [user.email],
+    )
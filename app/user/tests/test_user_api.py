@@ -1,6 +1,7 @@
 """
 User Api test
 """
+from django.core import mail
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
@@ -8,6 +9,9 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.models import Recipe, Task
+from core.tasks import run_pending
+
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
 PROFILE_URL = reverse('user:profile')
@@ -46,6 +50,25 @@ class PublicUserApiTest(TestCase):
         self.assertTrue(user.check_password(self.payload['password']))
         self.assertNotIn('password', res.data)
 
+    def test_create_user_queues_welcome_email(self):
+        """
+        Test the welcome email is queued with the new user, not sent in
+        the request, and sent once the task runs
+        """
+        res = self.client.post(CREATE_USER_URL, self.payload)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(mail.outbox), 0)
+        user = get_user_model().objects.get(email=self.payload['email'])
+        self.assertTrue(Task.objects.filter(
+            name='user.tasks.send_welcome_email', args=[user.pk]
+        ).exists())
+
+        run_pending()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, [self.payload['email']])
+        self.assertIn(self.payload['name'], mail.outbox[0].body)
+
     def test_user_exists(self):
         """
         Test creating a user that already exists fails
@@ -165,3 +188,18 @@ class PrivateUserApiTest(TestCase):
         self.assertEqual(self.user.name, payload['name'])
         self.assertTrue(self.user.check_password(payload['password']))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_update_profile_keeps_recipe_count(self):
+        """
+        Test saving a stale request.user does not write its old recipe
+        count back
+        """
+        Recipe.objects.create(user=self.user, title='Soup',
+                              time_minutes=5, price=1)
+
+        res = self.client.patch(PROFILE_URL, {'name': 'Jane Doe'})
+        self.user.refresh_from_db()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.user.name, 'Jane Doe')
+        self.assertEqual(self.user.recipe_count, 1)
@@ -1,11 +1,15 @@
 """
 Views for User
 """
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 
+from core.authentication import CachedTokenAuthentication
+from core.etags import ConditionalGetMixin, make_etag
+from core.throttling import SignupRateThrottle, TokenRateThrottle
 from user.serializer import UserSerializer, AuthTokenSerializer
+from user.tasks import send_welcome_email
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -13,6 +17,14 @@ class CreateUserView(generics.CreateAPIView):
     Create a new user
     """
     serializer_class = UserSerializer
+    throttle_classes = (SignupRateThrottle,)
+
+    def perform_create(self, serializer):
+        """
+        Create the user and queue their welcome email
+        """
+        user = serializer.save()
+        send_welcome_email.delay(user.pk)
 
 
 class CreateTokenView(ObtainAuthToken):
@@ -21,16 +33,25 @@ class CreateTokenView(ObtainAuthToken):
     """
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    throttle_classes = (TokenRateThrottle,)
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(ConditionalGetMixin, generics.RetrieveUpdateAPIView):
     """
     Manage the Authenticated User
     """
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
+    def get_etag(self, request):
+        """
+        The profile is small enough to hash the fields it shows directly
+        """
+        user = request.user
+        return make_etag(user.pk, user.email, user.name,
+                         request.accepted_renderer.format)
+
     def get_object(self):
         """
         Retrieve and return authenticated user